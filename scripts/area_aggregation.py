@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Biodiversity statistics for a drawn polygon or the current viewport
+
+Wraps gbif_consultas.aggregate_area_stats() (area_aggregation.sql), which
+apportions mpio_queries statistics by the share of each municipality's area
+inside the polygon. Results are cached in the shared cache under a hash of
+the normalized geometry and the GBIF data version, so the same area drawn
+again (or the same viewport requested by another user) is not recomputed.
+
+Normalization makes equivalent inputs hash alike: coordinates rounded to
+PRECISION decimals, repeated vertices dropped, rings rotated to start at their
+smallest vertex and oriented per RFC 7946, and Polygon/MultiPolygon (or a
+Feature wrapping them) folded into a sorted MultiPolygon.
+
+    GET /api/areas/aggregate?bbox=xmin,ymin,xmax,ymax[&tipo=]
+    POST /api/areas/aggregate   {"geometry": {...GeoJSON...}, "tipo": ...}
+
+Usage from the command line:
+    cd visor-geografico-I2D-backend
+    python ../scripts/area_aggregation.py -75.7,6.1,-75.4,6.4 [tipo]
+"""
+import hashlib
+import json
+import math
+import sys
+
+PRECISION = 6
+MAX_VERTICES = 20000
+CACHE_TIMEOUT = 24 * 3600
+STAT_FIELDS = ('registers', 'species', 'exoticas', 'endemicas')
+
+
+def bbox_polygon(bbox):
+    """GeoJSON Polygon for xmin,ymin,xmax,ymax (string or sequence)"""
+    if isinstance(bbox, str):
+        bbox = bbox.split(',')
+    try:
+        xmin, ymin, xmax, ymax = (float(v) for v in bbox)
+    except (TypeError, ValueError):
+        raise ValueError('bbox must be xmin,ymin,xmax,ymax')
+    if not all(map(math.isfinite, (xmin, ymin, xmax, ymax))):
+        raise ValueError('bbox values must be finite numbers')
+    if xmin >= xmax or ymin >= ymax:
+        raise ValueError('bbox must be xmin,ymin,xmax,ymax with xmin < xmax and ymin < ymax')
+    return {'type': 'Polygon',
+            'coordinates': [[[xmin, ymin], [xmax, ymin], [xmax, ymax], [xmin, ymax], [xmin, ymin]]]}
+
+
+def _signed_area(ring):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:]))
+
+
+def _normalize_ring(ring, exterior):
+    points = []
+    for point in ring:
+        x, y = (round(float(v), PRECISION) for v in point[:2])
+        if not (math.isfinite(x) and math.isfinite(y)):
+            raise ValueError('Coordinates must be finite numbers')
+        if not points or points[-1] != [x, y]:
+            points.append([x, y])
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if len(set(map(tuple, points))) < 3:
+        raise ValueError('Polygon rings need at least 3 distinct vertices')
+
+    start = points.index(min(points))
+    points = points[start:] + points[:start]
+    points.append(points[0])
+    # RFC 7946: exterior rings counterclockwise, holes clockwise
+    if (_signed_area(points) > 0) != exterior:
+        points.reverse()
+    return points
+
+
+def normalize_geometry(geojson):
+    """Canonical MultiPolygon for a GeoJSON Polygon, MultiPolygon or Feature"""
+    if not isinstance(geojson, dict):
+        raise ValueError('geometry must be a GeoJSON object')
+    if geojson.get('type') == 'Feature':
+        geojson = geojson.get('geometry') or {}
+
+    kind = geojson.get('type')
+    coordinates = geojson.get('coordinates')
+    if kind == 'Polygon':
+        polygons = [coordinates]
+    elif kind == 'MultiPolygon':
+        polygons = coordinates
+    else:
+        raise ValueError('geometry must be a Polygon or MultiPolygon')
+
+    try:
+        normalized = sorted(
+            [_normalize_ring(polygon[0], True)]
+            + sorted(_normalize_ring(hole, False) for hole in polygon[1:])
+            for polygon in polygons if polygon
+        )
+    except (TypeError, IndexError):
+        raise ValueError('Invalid GeoJSON coordinates')
+    if not normalized:
+        raise ValueError('geometry is empty')
+    if sum(len(ring) for polygon in normalized for ring in polygon) > MAX_VERTICES:
+        raise ValueError(f'geometry has more than {MAX_VERTICES} vertices')
+    return {'type': 'MultiPolygon', 'coordinates': normalized}
+
+
+def geometry_hash(geometry):
+    """Stable hash of a normalized geometry"""
+    return hashlib.sha1(json.dumps(geometry, separators=(',', ':')).encode()).hexdigest()
+
+
+def query_stats(geometry, tipo=None):
+    """Run the aggregation in PostGIS; {tipo: {municipios, registers, ...}}"""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            SELECT tipo, municipios, {", ".join(STAT_FIELDS)}
+            FROM gbif_consultas.aggregate_area_stats(ST_SetSRID(ST_GeomFromGeoJSON(%s), 4326), %s)
+        ''', [json.dumps(geometry), tipo])
+        return {
+            row_tipo: {'municipios': municipios, **dict(zip(STAT_FIELDS, values))}
+            for row_tipo, municipios, *values in cursor.fetchall()
+        }
+
+
+def aggregate(geojson, tipo=None):
+    """Cached statistics for a GeoJSON area; returns (result, hit)"""
+    from project_cache import get_cache
+    from tile_cache import data_version
+
+    geometry = normalize_geometry(geojson)
+    digest = geometry_hash(geometry)
+    key = f'area-aggregate:{data_version()}:{tipo or "all"}:{digest}'
+
+    cache = get_cache()
+    result = cache.get(key)
+    if result is not None:
+        return result, True
+
+    result = {'hash': digest, 'tipos': query_stats(geometry, tipo)}
+    cache.set(key, result, timeout=CACHE_TIMEOUT)
+    return result, False
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print('Usage: python area_aggregation.py xmin,ymin,xmax,ymax [tipo]')
+        return 1
+
+    from django_env import setup_django
+    setup_django()
+
+    try:
+        result, hit = aggregate(bbox_polygon(sys.argv[1]), sys.argv[2] if len(sys.argv) == 3 else None)
+    except ValueError as e:
+        print(f'❌ {e}')
+        return 1
+    print(f'{"♻️  cached" if hit else "🧮 computed"} ({result["hash"][:12]})')
+    print(json.dumps(result['tipos'], indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+-- ============================================================================
+-- Biodiversity Statistics for an Arbitrary Polygon or Bounding Box
+-- Visor I2D Humboldt Project
+-- PostgreSQL 16 + PostGIS 3.4
+-- ============================================================================
+-- gbif_consultas.aggregate_area_stats(geom, tipo) sums mpio_queries statistics
+-- over the municipalities intersecting a drawn area or viewport. Partially
+-- covered municipalities contribute in proportion to the share of their area
+-- inside the polygon (area-weighted apportioning); fully covered ones skip
+-- the intersection. species/endemicas/exoticas are apportioned the same way,
+-- so for those the result is an estimate, not a distinct count.
+--
+-- mpio_queries repeats each municipality geometry once per tipo, so weights
+-- are computed once per codigo (GIST prefilter on geom && area) and then
+-- joined back to the per-tipo rows.
+--
+-- Used by GET|POST /api/areas/aggregate (scripts/gis_api.py, cached by
+-- scripts/area_aggregation.py)
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < area_aggregation.sql
+
+\echo '========================================='
+\echo 'Installing area aggregation function'
+\echo '========================================='
+
+CREATE OR REPLACE FUNCTION gbif_consultas.aggregate_area_stats(p_geom geometry, p_tipo text DEFAULT NULL)
+RETURNS TABLE (tipo text, municipios integer, registers bigint, species bigint,
+               exoticas bigint, endemicas bigint) AS $$
+    WITH area AS (
+        SELECT ST_MakeValid(ST_Transform(p_geom, 4326)) AS g
+    ),
+    weights AS (
+        SELECT m.codigo,
+               CASE WHEN ST_CoveredBy(m.geom, a.g) THEN 1.0
+                    ELSE ST_Area(ST_Intersection(m.geom, a.g)) / NULLIF(ST_Area(m.geom), 0)
+               END AS weight
+        FROM (
+            SELECT DISTINCT ON (q.codigo) q.codigo, q.geom
+            FROM gbif_consultas.mpio_queries q, area a
+            WHERE q.geom && a.g AND q.tipo IS NOT NULL AND q.codigo IS NOT NULL
+            ORDER BY q.codigo
+        ) m, area a
+        WHERE ST_Intersects(m.geom, a.g)
+    )
+    SELECT q.tipo,
+           count(DISTINCT q.codigo)::integer,
+           round(sum(q.registers * w.weight))::bigint,
+           round(sum(q.species * w.weight))::bigint,
+           round(sum(q.exoticas * w.weight))::bigint,
+           round(sum(q.endemicas * w.weight))::bigint
+    FROM weights w
+    JOIN gbif_consultas.mpio_queries q ON q.codigo = w.codigo
+    WHERE w.weight > 0 AND q.tipo IS NOT NULL AND (p_tipo IS NULL OR q.tipo = p_tipo)
+    GROUP BY q.tipo
+    ORDER BY q.tipo;
+$$ LANGUAGE sql STABLE;
+
+\echo '✓ Area aggregation function installed'
+\echo ''
+\echo 'Test with (Valle de Aburrá bbox):'
+\echo '  EXPLAIN ANALYZE SELECT * FROM gbif_consultas.aggregate_area_stats(ST_MakeEnvelope(-75.7, 6.1, -75.4, 6.4, 4326));'
@@ -0,0 +1,83 @@
+-- ============================================================================
+-- Precomputed Centroids and Bounding Boxes per Area
+-- Visor I2D Humboldt Project
+-- PostgreSQL 16 + PostGIS 3.4
+-- ============================================================================
+-- capas_base.area_extents keeps one row per (source, codigo) with the
+-- centroid, a label point guaranteed inside the polygon and the bbox in
+-- EPSG:4326, so zooming to an area never loads its polygon. Sources:
+-- mpio_politico, dpto_politico, mpio_queries and dpto_queries (these repeat
+-- the geometry once per tipo; the first row per codigo is used).
+--
+-- Used by GET /api/areas/{codigo}/extent (scripts/gis_api.py)
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < area_extents.sql
+-- Refresh with: python ../scripts/refresh_area_extents.py
+
+\echo '========================================='
+\echo 'Installing area extents'
+\echo '========================================='
+
+CREATE TABLE IF NOT EXISTS capas_base.area_extents (
+    source varchar(20) NOT NULL,
+    codigo varchar(5) NOT NULL,
+    nombre varchar(254),
+    centroid geometry(Point, 4326) NOT NULL,
+    label_point geometry(Point, 4326) NOT NULL,
+    xmin double precision NOT NULL,
+    ymin double precision NOT NULL,
+    xmax double precision NOT NULL,
+    ymax double precision NOT NULL,
+    refreshed_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (source, codigo)
+);
+
+CREATE INDEX IF NOT EXISTS idx_area_extents_codigo ON capas_base.area_extents (codigo);
+CREATE INDEX IF NOT EXISTS idx_area_extents_centroid ON capas_base.area_extents USING GIST (centroid);
+
+-- Rebuild one source (or all when NULL); returns rows written
+CREATE OR REPLACE FUNCTION capas_base.refresh_area_extents(p_source text DEFAULT NULL)
+RETURNS integer AS $$
+DECLARE
+    src RECORD;
+    inserted integer;
+    total integer := 0;
+BEGIN
+    FOR src IN
+        SELECT * FROM (VALUES
+            ('mpio_politico', 'capas_base.mpio_politico'),
+            ('dpto_politico', 'capas_base.dpto_politico'),
+            ('mpio_queries', 'gbif_consultas.mpio_queries'),
+            ('dpto_queries', 'gbif_consultas.dpto_queries')
+        ) AS s(name, table_name)
+        WHERE p_source IS NULL OR s.name = p_source
+    LOOP
+        DELETE FROM capas_base.area_extents WHERE source = src.name;
+
+        EXECUTE format($q$
+            INSERT INTO capas_base.area_extents
+                (source, codigo, nombre, centroid, label_point, xmin, ymin, xmax, ymax)
+            SELECT %1$L, codigo, nombre, ST_Centroid(g), ST_PointOnSurface(g),
+                   ST_XMin(g), ST_YMin(g), ST_XMax(g), ST_YMax(g)
+            FROM (
+                SELECT DISTINCT ON (codigo) codigo, nombre, ST_Transform(geom, 4326) AS g
+                FROM %2$s
+                WHERE geom IS NOT NULL AND codigo IS NOT NULL
+                ORDER BY codigo
+            ) areas
+            WHERE NOT ST_IsEmpty(g)
+        $q$, src.name, src.table_name);
+
+        GET DIAGNOSTICS inserted = ROW_COUNT;
+        total := total + inserted;
+    END LOOP;
+
+    ANALYZE capas_base.area_extents;
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+\echo '✓ Area extents installed'
+\echo ''
+\echo 'Fill with:'
+\echo '  SELECT capas_base.refresh_area_extents();'
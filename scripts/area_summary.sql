@@ -0,0 +1,289 @@
+-- ============================================================================
+-- Materialized Biodiversity Summary per Area
+-- Visor I2D Humboldt Project
+-- PostgreSQL 16 + PostGIS 3.4
+-- ============================================================================
+-- gbif_consultas.area_summary pre-joins dpto/mpio_queries with
+-- dpto/mpio_amenazas: one row per (nivel, codigo, tipo) with registers,
+-- species, exoticas, endemicas and amenazadas, so per-area statistics are a
+-- single primary key lookup instead of two aggregations over the source
+-- tables.
+--
+-- refresh_area_summary() is incremental: triggers on the four source tables
+-- record the (nivel, codigo) of every inserted, updated or deleted row in
+-- gbif_consultas.area_summary_dirty, and a refresh only recomputes those
+-- areas, rewriting rows whose values changed (compared by hash) and deleting
+-- the ones that vanished. A TRUNCATE marks the whole level. A new GBIF load
+-- in gbif_info.download_date with nothing marked (data loaded with triggers
+-- disabled) falls back to comparing every area, as does --force.
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < area_summary.sql
+-- Refresh with: python ../scripts/refresh_area_summary.py [--force]
+
+\echo '========================================='
+\echo 'Installing area summary tables'
+\echo '========================================='
+
+-- ============================================================================
+-- 1. TABLES
+-- ============================================================================
+\echo '1. Creating tables...'
+
+CREATE TABLE IF NOT EXISTS gbif_consultas.area_summary (
+    nivel varchar(4) NOT NULL CHECK (nivel IN ('dpto', 'mpio')),
+    codigo varchar(5) NOT NULL,
+    tipo text NOT NULL,
+    nombre varchar(254),
+    registers bigint,
+    species bigint,
+    exoticas bigint,
+    endemicas bigint,
+    amenazadas bigint,
+    source_hash text NOT NULL,
+    refreshed_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (nivel, codigo, tipo)
+);
+
+-- Single row: the GBIF load the summary was last built from
+CREATE TABLE IF NOT EXISTS gbif_consultas.area_summary_state (
+    id smallint PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    download_date date,
+    refreshed_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Areas whose source rows changed since the last refresh; codigo '*' marks a whole level
+CREATE TABLE IF NOT EXISTS gbif_consultas.area_summary_dirty (
+    nivel varchar(4) NOT NULL,
+    codigo varchar(5) NOT NULL,
+    marked_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (nivel, codigo)
+);
+
+\echo '✓ Tables created'
+\echo ''
+
+-- ============================================================================
+-- 2. SOURCE VIEW
+-- ============================================================================
+\echo '2. Creating source view...'
+
+-- Summary rows of the given dpto and mpio codigos (NULL: all, empty array: none)
+CREATE OR REPLACE FUNCTION gbif_consultas.area_summary_rows(p_dpto text[], p_mpio text[])
+RETURNS TABLE (nivel text, codigo varchar, tipo text, nombre varchar,
+               registers bigint, species bigint, exoticas bigint, endemicas bigint,
+               amenazadas bigint, source_hash text) AS $$
+WITH queries AS (
+    SELECT 'dpto' AS nivel, codigo, tipo, max(nombre) AS nombre,
+           sum(registers) AS registers, sum(species) AS species,
+           sum(exoticas) AS exoticas, sum(endemicas) AS endemicas
+    FROM gbif_consultas.dpto_queries
+    WHERE tipo IS NOT NULL AND codigo IS NOT NULL AND (p_dpto IS NULL OR codigo = ANY(p_dpto))
+    GROUP BY codigo, tipo
+    UNION ALL
+    SELECT 'mpio', codigo, tipo, max(nombre),
+           sum(registers), sum(species), sum(exoticas), sum(endemicas)
+    FROM gbif_consultas.mpio_queries
+    WHERE tipo IS NOT NULL AND codigo IS NOT NULL AND (p_mpio IS NULL OR codigo = ANY(p_mpio))
+    GROUP BY codigo, tipo
+),
+amenazas AS (
+    SELECT 'dpto' AS nivel, codigo, tipo::text AS tipo, max(nombre) AS nombre,
+           sum(amenazadas) AS amenazadas
+    FROM gbif_consultas.dpto_amenazas
+    WHERE tipo IS NOT NULL AND codigo IS NOT NULL AND (p_dpto IS NULL OR codigo = ANY(p_dpto))
+    GROUP BY codigo, tipo
+    UNION ALL
+    SELECT 'mpio', codigo, tipo::text, max(nombre), sum(amenazadas)
+    FROM gbif_consultas.mpio_amenazas
+    WHERE tipo IS NOT NULL AND codigo IS NOT NULL AND (p_mpio IS NULL OR codigo = ANY(p_mpio))
+    GROUP BY codigo, tipo
+)
+SELECT nivel, codigo, tipo, nombre, registers, species, exoticas, endemicas, amenazadas,
+       md5(concat_ws('|', nombre, registers, species, exoticas, endemicas, amenazadas)) AS source_hash
+FROM (
+    SELECT COALESCE(q.nivel, a.nivel)::text AS nivel,
+           COALESCE(q.codigo, a.codigo)::varchar AS codigo,
+           COALESCE(q.tipo, a.tipo)::text AS tipo,
+           COALESCE(q.nombre, a.nombre)::varchar AS nombre,
+           q.registers::bigint AS registers, q.species::bigint AS species,
+           q.exoticas::bigint AS exoticas, q.endemicas::bigint AS endemicas,
+           a.amenazadas::bigint AS amenazadas
+    FROM queries q
+    FULL JOIN amenazas a ON a.nivel = q.nivel AND a.codigo = q.codigo AND a.tipo = q.tipo
+) joined;
+$$ LANGUAGE sql STABLE;
+
+-- Every area; dropped first because earlier versions had different column types
+DROP VIEW IF EXISTS gbif_consultas.area_summary_source;
+CREATE VIEW gbif_consultas.area_summary_source AS
+SELECT * FROM gbif_consultas.area_summary_rows(NULL, NULL);
+
+\echo '✓ Source view created'
+\echo ''
+
+-- ============================================================================
+-- 3. CHANGE TRACKING
+-- ============================================================================
+\echo '3. Creating change tracking triggers...'
+
+-- Statement-level with transition tables: one INSERT per statement, not per row
+CREATE OR REPLACE FUNCTION gbif_consultas.mark_area_summary_dirty() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        INSERT INTO gbif_consultas.area_summary_dirty (nivel, codigo)
+        VALUES (TG_ARGV[0], '*')
+        ON CONFLICT DO NOTHING;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO gbif_consultas.area_summary_dirty (nivel, codigo)
+        SELECT DISTINCT TG_ARGV[0], codigo FROM new_rows WHERE codigo IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO gbif_consultas.area_summary_dirty (nivel, codigo)
+        SELECT DISTINCT TG_ARGV[0], codigo FROM old_rows WHERE codigo IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow a single event per trigger, hence four triggers per table
+DO $$
+DECLARE
+    source RECORD;
+BEGIN
+    FOR source IN
+        SELECT * FROM (VALUES
+            ('dpto_queries', 'dpto'), ('mpio_queries', 'mpio'),
+            ('dpto_amenazas', 'dpto'), ('mpio_amenazas', 'mpio')
+        ) AS t(table_name, nivel)
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_area_summary_ins ON gbif_consultas.%I', source.table_name);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_area_summary_upd ON gbif_consultas.%I', source.table_name);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_area_summary_del ON gbif_consultas.%I', source.table_name);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_area_summary_trunc ON gbif_consultas.%I', source.table_name);
+        EXECUTE format('CREATE TRIGGER trg_area_summary_ins AFTER INSERT ON gbif_consultas.%I '
+                       'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT '
+                       'EXECUTE FUNCTION gbif_consultas.mark_area_summary_dirty(%L)',
+                       source.table_name, source.nivel);
+        EXECUTE format('CREATE TRIGGER trg_area_summary_upd AFTER UPDATE ON gbif_consultas.%I '
+                       'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT '
+                       'EXECUTE FUNCTION gbif_consultas.mark_area_summary_dirty(%L)',
+                       source.table_name, source.nivel);
+        EXECUTE format('CREATE TRIGGER trg_area_summary_del AFTER DELETE ON gbif_consultas.%I '
+                       'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT '
+                       'EXECUTE FUNCTION gbif_consultas.mark_area_summary_dirty(%L)',
+                       source.table_name, source.nivel);
+        EXECUTE format('CREATE TRIGGER trg_area_summary_trunc AFTER TRUNCATE ON gbif_consultas.%I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION gbif_consultas.mark_area_summary_dirty(%L)',
+                       source.table_name, source.nivel);
+    END LOOP;
+END;
+$$;
+
+\echo '✓ Change tracking triggers created'
+\echo ''
+
+-- ============================================================================
+-- 4. INCREMENTAL REFRESH
+-- ============================================================================
+\echo '4. Creating refresh function...'
+
+-- The OUT columns changed (areas, full_refresh); CREATE OR REPLACE can't change them
+DROP FUNCTION IF EXISTS gbif_consultas.refresh_area_summary(boolean);
+
+CREATE OR REPLACE FUNCTION gbif_consultas.refresh_area_summary(p_force boolean DEFAULT false,
+    OUT changed integer, OUT removed integer, OUT download_date date,
+    OUT areas integer, OUT full_refresh boolean)
+AS $$
+DECLARE
+    last_loaded date;
+    dpto_codigos text[];
+    mpio_codigos text[];
+BEGIN
+    changed := 0;
+    removed := 0;
+    areas := 0;
+
+    -- Serialize concurrent refreshes
+    PERFORM pg_advisory_xact_lock(hashtext('gbif_consultas.area_summary'));
+
+    SELECT max(i.download_date) INTO download_date FROM gbif_consultas.gbif_info i;
+    SELECT s.download_date INTO last_loaded FROM gbif_consultas.area_summary_state s WHERE s.id = 1;
+
+    -- Take the marked areas; anything marked after this statement waits for the next refresh
+    WITH taken AS (
+        DELETE FROM gbif_consultas.area_summary_dirty RETURNING nivel, codigo
+    )
+    SELECT COALESCE(array_agg(codigo) FILTER (WHERE nivel = 'dpto'), '{}'),
+           COALESCE(array_agg(codigo) FILTER (WHERE nivel = 'mpio'), '{}'),
+           count(*)
+    INTO dpto_codigos, mpio_codigos, areas
+    FROM taken;
+
+    full_refresh := p_force
+        OR NOT EXISTS (SELECT 1 FROM gbif_consultas.area_summary)
+        OR (areas = 0 AND last_loaded IS DISTINCT FROM download_date);
+
+    IF full_refresh THEN
+        dpto_codigos := NULL;
+        mpio_codigos := NULL;
+        areas := NULL;
+    ELSIF areas = 0 THEN
+        RETURN;
+    ELSE
+        -- A TRUNCATE marks the whole level
+        IF '*' = ANY(dpto_codigos) THEN dpto_codigos := NULL; END IF;
+        IF '*' = ANY(mpio_codigos) THEN mpio_codigos := NULL; END IF;
+    END IF;
+
+    WITH source AS MATERIALIZED (
+        SELECT * FROM gbif_consultas.area_summary_rows(dpto_codigos, mpio_codigos)
+    ),
+    upserted AS (
+        INSERT INTO gbif_consultas.area_summary AS t
+            (nivel, codigo, tipo, nombre, registers, species, exoticas, endemicas, amenazadas, source_hash)
+        SELECT s.nivel, s.codigo, s.tipo, s.nombre, s.registers, s.species, s.exoticas, s.endemicas,
+               s.amenazadas, s.source_hash
+        FROM source s
+        ON CONFLICT (nivel, codigo, tipo) DO UPDATE SET
+            nombre = EXCLUDED.nombre,
+            registers = EXCLUDED.registers,
+            species = EXCLUDED.species,
+            exoticas = EXCLUDED.exoticas,
+            endemicas = EXCLUDED.endemicas,
+            amenazadas = EXCLUDED.amenazadas,
+            source_hash = EXCLUDED.source_hash,
+            refreshed_at = now()
+        WHERE t.source_hash IS DISTINCT FROM EXCLUDED.source_hash
+        RETURNING 1
+    ),
+    deleted AS (
+        DELETE FROM gbif_consultas.area_summary t
+        WHERE ((t.nivel = 'dpto' AND (dpto_codigos IS NULL OR t.codigo = ANY(dpto_codigos)))
+            OR (t.nivel = 'mpio' AND (mpio_codigos IS NULL OR t.codigo = ANY(mpio_codigos))))
+          AND NOT EXISTS (
+              SELECT 1 FROM source s
+              WHERE s.nivel = t.nivel AND s.codigo = t.codigo AND s.tipo = t.tipo
+          )
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM upserted), (SELECT count(*) FROM deleted)
+    INTO changed, removed;
+
+    INSERT INTO gbif_consultas.area_summary_state (id, download_date, refreshed_at)
+    VALUES (1, download_date, now())
+    ON CONFLICT (id) DO UPDATE SET download_date = EXCLUDED.download_date, refreshed_at = now();
+
+    IF changed + removed > 0 THEN
+        ANALYZE gbif_consultas.area_summary;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+\echo '✓ Refresh function created'
+\echo ''
+\echo 'Fill with:'
+\echo '  SELECT * FROM gbif_consultas.refresh_area_summary(true);'
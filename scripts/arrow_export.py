@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Columnar (Parquet / Arrow IPC) export of the GBIF statistics tables
+
+PostgreSQL streams the export query with COPY ... TO STDOUT (CSV) through a
+pipe into pyarrow's streaming CSV reader, so rows go from the database into
+Arrow record batches without building a Python object per row. Each batch is
+written out as soon as it is parsed (one Parquet row group / IPC message per
+batch). Geometry is exported as WKB: PostgreSQL sends it hex-encoded and each
+batch's hex column is decoded in a single pass over its data buffer.
+
+    GET /api/export/{dataset}.parquet   application/vnd.apache.parquet
+    GET /api/export/{dataset}.arrow     application/vnd.apache.arrow.stream
+
+Requires the pyarrow package; without it these formats answer 501.
+
+Usage from the command line:
+    cd visor-geografico-I2D-backend
+    python ../scripts/arrow_export.py mpio_queries mpio_queries.parquet [--codigos 05001] [--tipo ...]
+
+Loading:
+    pandas.read_parquet('mpio_queries.parquet')
+    pyarrow.ipc.open_stream(open('mpio_queries.arrow', 'rb')).read_all()
+"""
+import argparse
+import binascii
+import os
+import sys
+import threading
+
+ARROW_FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+INTEGER_COLUMNS = ('registers', 'species', 'exoticas', 'endemicas', 'amenazadas')
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+def available():
+    return pa is not None
+
+
+def hex_to_binary(column):
+    """Decode a hex-encoded string column into a binary column without per-row objects"""
+    if isinstance(column, pa.ChunkedArray):
+        return pa.chunked_array([hex_to_binary(chunk) for chunk in column.chunks], type=pa.binary())
+    offsets = pa.Array.from_buffers(pa.int32(), len(column) + 1, [None, column.buffers()[1]],
+                                    offset=column.offset)
+    start, end = offsets[0].as_py(), offsets[-1].as_py()
+    data = binascii.unhexlify(memoryview(column.buffers()[2])[start:end])
+    binary_offsets = pc.divide(pc.subtract(offsets, start), 2).cast(pa.int32())
+    decoded = pa.Array.from_buffers(pa.binary(), len(column),
+                                    [None, binary_offsets.buffers()[1], pa.py_buffer(data)])
+    if column.null_count:
+        decoded = pc.if_else(column.is_valid(), decoded, pa.scalar(None, pa.binary()))
+    return decoded
+
+
+def copy_query(dataset, codigos=None, tipo=None):
+    """COPY statement for a dataset export, with geometry as hex WKB"""
+    from django.db import connection
+    import gbif_export
+
+    sql, params, columns = gbif_export.export_query(dataset, codigos, tipo, 'hexwkb')
+    with connection.cursor() as cursor:
+        sql = cursor.mogrify(sql, params).decode('utf-8')
+    return f'COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)', columns
+
+
+def iter_record_batches(dataset, codigos=None, tipo=None):
+    """Arrow record batches straight from a COPY stream"""
+    from django.db import connection
+
+    copy_sql, columns = copy_query(dataset, codigos, tipo)
+    connection.ensure_connection()
+    raw_connection = connection.connection
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def produce():
+        try:
+            with os.fdopen(write_fd, 'wb') as sink, raw_connection.cursor() as cursor:
+                cursor.copy_expert(copy_sql, sink)
+        except Exception as e:
+            errors.append(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    column_types = {name: pa.string() for name in columns}
+    column_types.update({name: pa.int64() for name in columns if name in INTEGER_COLUMNS})
+    try:
+        with os.fdopen(read_fd, 'rb') as source:
+            reader = pa_csv.open_csv(
+                source,
+                read_options=pa_csv.ReadOptions(block_size=READ_BLOCK_SIZE, use_threads=False),
+                convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True,
+                                                      quoted_strings_can_be_null=False),
+            )
+            for batch in reader:
+                geom_index = batch.schema.get_field_index('geom')
+                arrays = list(batch.columns)
+                arrays[geom_index] = hex_to_binary(arrays[geom_index])
+                names = list(batch.schema.names)
+                yield pa.RecordBatch.from_arrays(arrays, names=names)
+    finally:
+        producer.join()
+    if errors:
+        raise errors[0]
+
+
+def schema_metadata(dataset):
+    return {b'dataset': dataset.encode(), b'geometry_column': b'geom', b'geometry_encoding': b'WKB',
+            b'crs': b'EPSG:4326'}
+
+
+class _Chunks:
+    """Write-only sink collecting bytes between yields"""
+
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def _open_writer(fmt, sink, schema):
+    if fmt == 'parquet':
+        return pq.ParquetWriter(sink, schema, compression='zstd')
+    return pa.ipc.new_stream(sink, schema)
+
+
+def empty_schema(dataset):
+    import gbif_export
+
+    _, columns = gbif_export.DATASETS[dataset]
+    fields = [pa.field(name, pa.int64() if name in INTEGER_COLUMNS else pa.string()) for name in columns]
+    return pa.schema(fields + [pa.field('geom', pa.binary())], metadata=schema_metadata(dataset))
+
+
+def write_batches(dataset, fmt, sink, codigos=None, tipo=None):
+    """Write each record batch to sink as it arrives, yielding the running row count"""
+    writer = None
+    rows = 0
+    try:
+        for batch in iter_record_batches(dataset, codigos, tipo):
+            if writer is None:
+                schema = batch.schema.with_metadata(schema_metadata(dataset))
+                writer = _open_writer(fmt, sink, schema)
+            writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+            rows += batch.num_rows
+            yield rows
+        if writer is None:
+            # No rows: still a valid, empty file
+            writer = _open_writer(fmt, sink, empty_schema(dataset))
+    finally:
+        if writer is not None:
+            writer.close()
+    yield rows
+
+
+def write_arrow(dataset, fmt, path, codigos=None, tipo=None):
+    """Write a Parquet / Arrow IPC file; returns the row count"""
+    rows = 0
+    for rows in write_batches(dataset, fmt, path, codigos, tipo):
+        pass
+    return rows
+
+
+def iter_arrow(dataset, fmt, codigos=None, tipo=None):
+    """Chunks of bytes of a Parquet / Arrow IPC stream, one per record batch"""
+    sink = _Chunks()
+    output = pa.PythonFile(sink, mode='w')
+    for _ in write_batches(dataset, fmt, output, codigos, tipo):
+        data = sink.drain()
+        if data:
+            yield data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a GBIF statistics table as Parquet or Arrow IPC')
+    parser.add_argument('dataset')
+    parser.add_argument('output', help='file ending in .parquet or .arrow')
+    parser.add_argument('--codigos', nargs='*')
+    parser.add_argument('--tipo')
+    args = parser.parse_args()
+
+    if not available():
+        print('❌ pyarrow is not installed (pip install pyarrow)')
+        return 1
+    fmt = 'parquet' if args.output.endswith('.parquet') else 'arrow'
+
+    from django_env import setup_django
+    setup_django()
+
+    rows = write_arrow(args.dataset, fmt, args.output, args.codigos, args.tipo)
+    print(f'✅ {args.output}: {rows} rows, {os.path.getsize(args.output)} bytes')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+In-process autocomplete index for municipalities and departments
+
+The ~1,100 municipalities and 33 departments fit comfortably in memory, so
+each Gunicorn worker keeps a sorted array of normalized name keys and answers
+search-as-you-type with a binary search, without touching PostgreSQL. Every
+result carries the centroid and bbox so the map can zoom straight away.
+
+Keys are the accent-free, lower-cased name and every word suffix of it
+("san jose del guaviare", "jose del guaviare", "del guaviare", "guaviare"),
+so any word of a name can be typed first. "municipio, departamento" narrows
+the results to departments starting with the part after the comma.
+
+The index reloads itself when capas_base.mpio_politico / dpto_politico
+change: at most every CHECK_SECONDS a request compares the tables' write
+counters in pg_stat_user_tables with the ones seen at load time.
+
+    GET /api/autocomplete?q=medel[&limit=10]     (gis_api.py)
+
+Warm it at worker start from an AppConfig.ready():
+
+    import autocomplete
+    autocomplete.get_index()
+
+Usage from the command line:
+    cd visor-geografico-I2D-backend
+    python ../scripts/autocomplete.py "san jose, caldas"
+"""
+import bisect
+import json
+import sys
+import threading
+import time
+import unicodedata
+
+CHECK_SECONDS = 60
+DEFAULT_LIMIT = 10
+SOURCE_TABLES = ('mpio_politico', 'dpto_politico')
+
+
+def normalize(text):
+    """Lower-case, accent-free, single-spaced"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().replace(',', ' ').split())
+
+
+def name_keys(name):
+    words = normalize(name).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class AutocompleteIndex:
+    """Sorted array of (key, word_position, entry_index) answering prefix queries"""
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        keys = []
+        for index, entry in enumerate(self.entries):
+            for position, key in enumerate(name_keys(entry['nombre'])):
+                keys.append((key, position, index))
+        keys.sort()
+        self.keys = [key for key, _, _ in keys]
+        self.refs = [(position, index) for _, position, index in keys]
+        self.dpto_names = [normalize(entry.get('dpto_nombre') or entry['nombre']) for entry in self.entries]
+
+    def search(self, q, limit=DEFAULT_LIMIT):
+        name_part, _, dpto_part = q.partition(',')
+        prefix = normalize(name_part)
+        dpto_prefix = normalize(dpto_part)
+        if not prefix:
+            return []
+
+        matches = {}
+        start = bisect.bisect_left(self.keys, prefix)
+        for i in range(start, len(self.keys)):
+            key = self.keys[i]
+            if not key.startswith(prefix):
+                break
+            position, index = self.refs[i]
+            if dpto_prefix and not any(k.startswith(dpto_prefix) for k in name_keys(self.dpto_names[index])):
+                continue
+            exact = key == prefix and position == 0
+            rank = (0 if exact else 1, position > 0, self.entries[index]['tipo'] != 'departamento',
+                    len(self.entries[index]['nombre']), self.entries[index]['nombre'])
+            if index not in matches or rank < matches[index]:
+                matches[index] = rank
+
+        ordered = sorted(matches, key=matches.get)[:limit]
+        return [self.entries[index] for index in ordered]
+
+
+def load_entries():
+    """Municipalities and departments with centroid and bbox (lon/lat)"""
+    from django.db import connection
+
+    sql = '''
+        SELECT 'municipio', codigo, nombre, dpto_nombre,
+               ST_X(c), ST_Y(c), ST_XMin(b), ST_YMin(b), ST_XMax(b), ST_YMax(b)
+        FROM (
+            SELECT codigo, nombre, dpto_nombre,
+                   ST_PointOnSurface(ST_Transform(geom, 4326)) AS c, ST_Transform(geom, 4326)::box2d AS b
+            FROM capas_base.mpio_politico WHERE geom IS NOT NULL
+        ) m
+        UNION ALL
+        SELECT 'departamento', codigo, nombre, NULL,
+               ST_X(c), ST_Y(c), ST_XMin(b), ST_YMin(b), ST_XMax(b), ST_YMax(b)
+        FROM (
+            SELECT codigo, nombre,
+                   ST_PointOnSurface(ST_Transform(geom, 4326)) AS c, ST_Transform(geom, 4326)::box2d AS b
+            FROM capas_base.dpto_politico WHERE geom IS NOT NULL
+        ) d
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+    return [
+        {
+            'tipo': tipo, 'codigo': codigo, 'nombre': nombre, 'dpto_nombre': dpto_nombre,
+            'centroid': [round(x, 6), round(y, 6)],
+            'bbox': [round(v, 6) for v in bbox],
+        }
+        for tipo, codigo, nombre, dpto_nombre, x, y, *bbox in rows
+    ]
+
+
+def source_signature():
+    """Write counters of the source tables; changes whenever a row is inserted, updated or deleted"""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT relname, n_tup_ins + n_tup_upd + n_tup_del, n_live_tup
+            FROM pg_stat_user_tables
+            WHERE schemaname = 'capas_base' AND relname = ANY(%s)
+            ORDER BY relname
+        ''', [list(SOURCE_TABLES)])
+        return tuple(cursor.fetchall())
+
+
+_lock = threading.Lock()
+_state = {'index': None, 'signature': None, 'checked': 0.0}
+
+
+def get_index():
+    """The current index, (re)built on first use and when the source tables change"""
+    now = time.monotonic()
+    if _state['index'] is not None and now - _state['checked'] < CHECK_SECONDS:
+        return _state['index']
+
+    with _lock:
+        if _state['index'] is not None and now - _state['checked'] < CHECK_SECONDS:
+            return _state['index']
+        signature = source_signature()
+        if _state['index'] is None or signature != _state['signature']:
+            _state['index'] = AutocompleteIndex(load_entries())
+            _state['signature'] = signature
+        _state['checked'] = now
+        return _state['index']
+
+
+def search(q, limit=DEFAULT_LIMIT):
+    return get_index().search(q, limit)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print('Usage: python autocomplete.py "<query>"')
+        return 1
+
+    from django_env import setup_django
+    setup_django()
+
+    started = time.perf_counter()
+    index = get_index()
+    print(f'📚 {len(index.entries)} entries, {len(index.keys)} keys loaded in {time.perf_counter() - started:.2f}s')
+    started = time.perf_counter()
+    results = index.search(sys.argv[1])
+    print(f'🔎 {len(results)} results in {(time.perf_counter() - started) * 1000:.2f} ms')
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Compare geometry payload size and client parse time across output options
+
+Builds the same layer (mpio_politico by default) as the current
+full-precision GeoJSON and with the options of GET /api/features: fewer
+decimal places, a simplification level and TopoJSON at two quantizations.
+For each it reports raw and gzipped bytes (level 6, as nginx), server build
+time and json.loads time (a stand-in for JSON.parse in the browser).
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/benchmark_geometry_payloads.py [dataset] [--zoom 8] [--repeat 3] [--json results.json]
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+
+GZIP_LEVEL = 6
+
+
+def variants(dataset, level):
+    """(name, build) pairs; build() returns the payload bytes"""
+    import geojson_features
+
+    def geojson(precision, level=0):
+        return lambda: ''.join(geojson_features.iter_features(dataset, precision=precision, level=level)).encode()
+
+    def topojson(quantization, level=0):
+        return lambda: json.dumps(geojson_features.build_topojson(dataset, quantization=quantization, level=level),
+                                  separators=(',', ':')).encode()
+
+    return [
+        ('geojson, 15 decimals (current)', geojson(15)),
+        ('geojson, 6 decimals', geojson(6)),
+        ('geojson, 5 decimals', geojson(5)),
+        ('geojson, 4 decimals', geojson(4)),
+        (f'geojson, 5 decimals, level {level}', geojson(5, level)),
+        ('topojson, q=1e5', topojson(100000)),
+        ('topojson, q=1e4', topojson(10000)),
+        (f'topojson, q=1e5, level {level}', topojson(100000, level)),
+    ]
+
+
+def measure(build, repeat):
+    """Best-of-repeat build and parse times, with the payload sizes"""
+    build_times, parse_times = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = build()
+        build_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        json.loads(payload)
+        parse_times.append(time.perf_counter() - started)
+    return {
+        'bytes': len(payload),
+        'gzip_bytes': len(gzip.compress(payload, GZIP_LEVEL)),
+        'build_ms': round(min(build_times) * 1000, 1),
+        'parse_ms': round(min(parse_times) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark geometry payload options')
+    parser.add_argument('dataset', nargs='?', default='mpio_politico')
+    parser.add_argument('--zoom', type=int, default=8, help='zoom used to pick the simplification level')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    import geojson_features
+    from gis_api import simplification_level
+
+    if args.dataset not in geojson_features.DATASETS:
+        print(f'❌ Unknown dataset: {args.dataset}')
+        return 1
+
+    level = simplification_level(zoom=args.zoom)
+    print(f'📏 {args.dataset} (simplification level {level} for zoom {args.zoom}, best of {args.repeat})')
+    print(f'{"variant":<36} {"bytes":>12} {"gzip":>10} {"ratio":>7} {"build ms":>9} {"parse ms":>9}')
+
+    results = []
+    baseline = None
+    for name, build in variants(args.dataset, level):
+        result = {'variant': name, **measure(build, args.repeat)}
+        baseline = baseline or result['bytes']
+        result['ratio'] = round(baseline / result['bytes'], 1)
+        results.append(result)
+        print(f'{name:<36} {result["bytes"]:>12,} {result["gzip_bytes"]:>10,} {result["ratio"]:>6}x '
+              f'{result["build_ms"]:>9} {result["parse_ms"]:>9}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'dataset': args.dataset, 'zoom': args.zoom, 'level': level, 'results': results}, f, indent=2)
+        print(f'💾 Results written to {args.json}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -15,6 +15,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'i2dbackend.settings')
 django.setup()
 
 from applications.projects.models import Project, LayerGroup, Layer
+from import_project_structure import import_structure
 
 def create_ecoreservas_structure():
     """Create the complete ecoreservas project structure"""
@@ -511,53 +512,9 @@ def create_ecoreservas_structure():
         }
     }
     
-    def create_group_recursive(name, config, parent_group=None):
-        """Recursively create groups and subgroups"""
-        group, created = LayerGroup.objects.get_or_create(
-            proyecto=project,
-            nombre=name,
-            parent_group=parent_group,
-            defaults={
-                'orden': config.get('orden', 0),
-                'fold_state': 'close'
-            }
-        )
-        
-        if created:
-            print(f"Created group: {name}")
-        else:
-            print(f"Using existing group: {name}")
-        
-        # Create layers if they exist
-        if 'layers' in config:
-            for layer_config in config['layers']:
-                layer, layer_created = Layer.objects.get_or_create(
-                    grupo=group,
-                    nombre_geoserver=layer_config['nombre_geoserver'],
-                    defaults={
-                        'nombre_display': layer_config['nombre_display'],
-                        'store_geoserver': layer_config['store_geoserver'],
-                        'estado_inicial': layer_config['estado_inicial'],
-                        'metadata_id': layer_config.get('metadata_id'),
-                        'orden': layer_config['orden']
-                    }
-                )
-                
-                if layer_created:
-                    print(f"  Created layer: {layer_config['nombre_display']}")
-                else:
-                    print(f"  Using existing layer: {layer_config['nombre_display']}")
-        
-        # Create subgroups recursively
-        if 'subgroups' in config:
-            for subgroup_name, subgroup_config in config['subgroups'].items():
-                create_group_recursive(subgroup_name, subgroup_config, group)
-        
-        return group
-    
-    # Create the structure
-    for group_name, group_config in structure.items():
-        create_group_recursive(group_name, group_config)
+    # Diff against the database and apply in bulk inside one transaction
+    diff = import_structure({'nombre_corto': project.nombre_corto}, structure, update=False)
+    print(f"\n{diff.summary()}")
     
     print("\n✅ Ecoreservas structure created successfully!")
     print(f"Total groups: {LayerGroup.objects.filter(proyecto=project).count()}")
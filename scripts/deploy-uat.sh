@@ -91,8 +91,20 @@ $DOCKER_COMPOSE -f docker-compose.uat.yml exec -T backend python manage.py migra
 echo -e "${YELLOW}Step 7: Collecting static files...${NC}"
 $DOCKER_COMPOSE -f docker-compose.uat.yml exec -T backend python manage.py collectstatic --noinput
 
+# Load project structures exported with scripts/project_ndjson.py
+if ls scripts/data_backups/projects/*.ndjson > /dev/null 2>&1; then
+    echo -e "${YELLOW}Step 8: Loading project structures (NDJSON)...${NC}"
+    BACKEND_CONTAINER=$($DOCKER_COMPOSE -f docker-compose.uat.yml ps -q backend)
+    docker cp scripts/. "$BACKEND_CONTAINER":/tmp/scripts
+    for project_file in scripts/data_backups/projects/*.ndjson; do
+        echo "Loading $(basename "$project_file")..."
+        $DOCKER_COMPOSE -f docker-compose.uat.yml exec -T backend \
+            python /tmp/scripts/project_ndjson.py import - --replace < "$project_file"
+    done
+fi
+
 # Create superuser if needed (optional)
-# echo -e "${YELLOW}Step 8: Creating superuser (if needed)...${NC}"
+# echo -e "${YELLOW}Step 9: Creating superuser (if needed)...${NC}"
 # $DOCKER_COMPOSE -f docker-compose.uat.yml exec -T backend python manage.py createsuperuser --noinput || true
 
 echo ""
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Shared Django bootstrap for the Python scripts in this directory
+"""
+import os
+import sys
+
+# Backend checkout next to this repository (git submodule), or /project inside
+# the visor_i2d_backend container
+BACKEND_PATHS = [
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'visor-geografico-I2D-backend'),
+    '/project',
+]
+
+
+def setup_django():
+    """Add the backend to the Python path and configure Django"""
+    for path in [os.getcwd()] + BACKEND_PATHS:
+        if os.path.isdir(path) and path not in sys.path:
+            sys.path.append(path)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'i2dbackend.settings.local')
+
+    import django
+    django.setup()
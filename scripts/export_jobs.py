@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Asynchronous export jobs with persisted, deduplicated results
+
+Big downloads run in a worker pool instead of inside a request:
+
+    POST /api/export/jobs {"dataset": "mpio_amenazas", "format": "gpkg", "codigos": [...], "tipo": ...}
+         -> 202 {"id": 12, "status": "queued", ...}
+    GET  /api/export/jobs/12
+         -> {"status": "done", "url": "/media/exports/<hash>.gpkg", ...}
+
+Jobs live in geovisor.export_jobs (export_jobs.sql). A job is identified by
+the hash of its parameters plus the GBIF data version, so identical requests
+share one job and one file until a new GBIF load arrives. Finished files are
+written to EXPORT_DIR on the media volume and served by nginx.
+
+Workers claim jobs with FOR UPDATE SKIP LOCKED. They wait on Redis
+(BRPOP on REDIS_QUEUE) when REDIS_URL is reachable, and on LISTEN export_jobs
+otherwise; the database stays the source of truth either way. Jobs left
+running by a dead worker are retried after JOB_TIMEOUT_MINUTES.
+
+Formats: csv (WKT geometry), geojson, gpkg (needs ogr2ogr from gdal-bin),
+parquet (WKB geometry, needs pyarrow).
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/export_jobs.py worker [--processes 2]
+    python ../scripts/export_jobs.py submit mpio_amenazas gpkg [--codigos 05001 05002]
+    python ../scripts/export_jobs.py cleanup
+"""
+import argparse
+import hashlib
+import json
+import os
+import select
+import shutil
+import socket
+import subprocess
+import sys
+import time
+import traceback
+
+EXPORT_DIR = os.getenv('EXPORT_DIR', '/app/media/exports')
+EXPORT_URL = os.getenv('EXPORT_URL', '/media/exports/')
+FORMATS = ('csv', 'geojson', 'gpkg', 'parquet')
+CHANNEL = 'export_jobs'
+REDIS_QUEUE = 'export-jobs'
+
+WAIT_SECONDS = 30
+JOB_TIMEOUT_MINUTES = 30
+MAX_ATTEMPTS = 3
+RESULT_TTL_DAYS = 7
+SUBMIT_ATTEMPTS = 5
+
+JOB_FIELDS = ('id', 'params', 'status', 'attempts', 'file_name', 'file_size', 'error',
+              'created_at', 'started_at', 'finished_at')
+
+
+def job_params(dataset, fmt, codigos=None, tipo=None):
+    """Normalized parameter set; raises ValueError on bad input"""
+    import gbif_export
+
+    if dataset not in gbif_export.DATASETS:
+        raise ValueError(f'Unknown dataset: {dataset}')
+    if fmt not in FORMATS:
+        raise ValueError(f'Format must be one of: {", ".join(FORMATS)}')
+    if isinstance(codigos, str):
+        codigos = codigos.split(',')
+    elif codigos is not None and not isinstance(codigos, list):
+        raise ValueError('codigos must be a list or a comma-separated string')
+    codigos = sorted({str(c).strip() for c in codigos or [] if str(c).strip()}) or None
+    return {'dataset': dataset, 'format': fmt, 'codigos': codigos, 'tipo': tipo or None}
+
+
+def params_hash(params, data_version):
+    content = json.dumps({'params': params, 'data_version': data_version}, sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+
+def redis_client():
+    from project_cache import redis_available
+
+    url = os.getenv('REDIS_URL')
+    if url and redis_available(url):
+        import redis
+        return redis.Redis.from_url(url)
+    return None
+
+
+def job_dict(row):
+    job = dict(zip(JOB_FIELDS, row))
+    job['url'] = EXPORT_URL + job['file_name'] if job['status'] == 'done' else None
+    for field in ('created_at', 'started_at', 'finished_at'):
+        if job[field] is not None:
+            job[field] = job[field].isoformat()
+    return job
+
+
+def get_job(job_id):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {", ".join(JOB_FIELDS)} FROM geovisor.export_jobs WHERE id = %s', [job_id])
+        row = cursor.fetchone()
+    return job_dict(row) if row else None
+
+
+def submit_job(dataset, fmt, codigos=None, tipo=None):
+    """Queue an export, or return the live job with the same parameters"""
+    from django.db import connection
+    from tile_cache import data_version
+
+    params = job_params(dataset, fmt, codigos, tipo)
+    digest = params_hash(params, data_version())
+    with connection.cursor() as cursor:
+        # The conflicting job can fail between the INSERT and the SELECT; insert again then
+        for _ in range(SUBMIT_ATTEMPTS):
+            cursor.execute('''
+                INSERT INTO geovisor.export_jobs (params_hash, params)
+                VALUES (%s, %s)
+                ON CONFLICT (params_hash) WHERE status <> 'failed' DO NOTHING
+                RETURNING id
+            ''', [digest, json.dumps(params)])
+            row = cursor.fetchone()
+            if row is not None:
+                if (client := redis_client()) is not None:
+                    client.lpush(REDIS_QUEUE, row[0])
+                break
+            cursor.execute("SELECT id FROM geovisor.export_jobs WHERE params_hash = %s AND status <> 'failed'",
+                           [digest])
+            row = cursor.fetchone()
+            if row is not None:
+                break
+        else:
+            raise RuntimeError(f'Could not queue export job {digest}')
+    return get_job(row[0])
+
+
+def claim_job(worker):
+    """Mark the oldest runnable job as running and return (id, params_hash, params)"""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            UPDATE geovisor.export_jobs
+            SET status = 'running', started_at = now(), attempts = attempts + 1, worker = %s, error = NULL
+            WHERE id = (
+                SELECT id FROM geovisor.export_jobs
+                WHERE status = 'queued'
+                   OR (status = 'running' AND started_at < now() - make_interval(mins => %s)
+                       AND attempts < %s)
+                ORDER BY created_at
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, params_hash, params
+        ''', [worker, JOB_TIMEOUT_MINUTES, MAX_ATTEMPTS])
+        return cursor.fetchone()
+
+
+def write_csv(params, path):
+    import gbif_export
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in gbif_export.iter_export(params['dataset'], 'csv', params['codigos'], params['tipo'], 'wkt'):
+            f.write(chunk)
+
+
+def write_geojson(params, path):
+    import gbif_export
+
+    sql, query_params, columns = gbif_export.export_query(
+        params['dataset'], params['codigos'], params['tipo'], 'geojson')
+    properties = columns[:-1]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"type": "FeatureCollection", "features": [\n')
+        first = True
+        for rows in gbif_export.iter_batches(sql, query_params):
+            for *values, geometry in rows:
+                props = json.dumps(dict(zip(properties, values)), ensure_ascii=False, default=str)
+                f.write(('' if first else ',\n') +
+                        f'{{"type": "Feature", "geometry": {geometry or "null"}, "properties": {props}}}')
+                first = False
+        f.write('\n]}\n')
+
+
+def write_gpkg(params, path):
+    """GeoPackage through ogr2ogr reading straight from PostGIS"""
+    from django.conf import settings
+    from django.db import connection
+    import gbif_export
+
+    ogr2ogr = shutil.which('ogr2ogr')
+    if ogr2ogr is None:
+        raise RuntimeError('ogr2ogr not found (install gdal-bin) - GeoPackage export unavailable')
+
+    sql, query_params, _ = gbif_export.export_query(
+        params['dataset'], params['codigos'], params['tipo'], 'native')
+    with connection.cursor() as cursor:
+        sql = cursor.mogrify(sql, query_params).decode('utf-8')
+
+    db = settings.DATABASES['default']
+    dsn = f"PG:dbname={db['NAME']} host={db.get('HOST') or 'localhost'} port={db.get('PORT') or 5432} user={db['USER']}"
+    env = dict(os.environ, PGPASSWORD=str(db.get('PASSWORD') or ''))
+    subprocess.run(
+        [ogr2ogr, '-f', 'GPKG', path, dsn, '-sql', sql, '-nln', params['dataset']],
+        check=True, env=env, capture_output=True, text=True,
+    )
+
+
+def write_parquet(params, path):
+    import arrow_export
+
+    if not arrow_export.available():
+        raise RuntimeError('pyarrow not installed - Parquet export unavailable')
+    arrow_export.write_arrow(params['dataset'], 'parquet', path, params['codigos'], params['tipo'])
+
+
+WRITERS = {'csv': write_csv, 'geojson': write_geojson, 'gpkg': write_gpkg, 'parquet': write_parquet}
+
+
+def run_job(job_id, digest, params):
+    from django.db import connection
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    file_name = f'{params["dataset"]}.{digest}.{params["format"]}'
+    path = os.path.join(EXPORT_DIR, file_name)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    started = time.monotonic()
+    try:
+        WRITERS[params['format']](params, tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        detail = e.stderr if isinstance(e, subprocess.CalledProcessError) else str(e)
+        with connection.cursor() as cursor:
+            cursor.execute('''
+                UPDATE geovisor.export_jobs
+                SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'queued' END,
+                    error = %s, finished_at = now()
+                WHERE id = %s
+            ''', [MAX_ATTEMPTS, detail[-2000:], job_id])
+        print(f'❌ Job {job_id} failed: {detail}')
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            UPDATE geovisor.export_jobs
+            SET status = 'done', file_name = %s, file_size = %s, finished_at = now()
+            WHERE id = %s
+        ''', [file_name, os.path.getsize(path), job_id])
+    print(f'✅ Job {job_id}: {file_name} ({time.monotonic() - started:.1f}s)')
+    return True
+
+
+def wait_for_work(client, conn):
+    """Block until a job may be available (or WAIT_SECONDS pass)"""
+    if client is not None:
+        client.brpop(REDIS_QUEUE, timeout=WAIT_SECONDS)
+        return
+    if select.select([conn], [], [], WAIT_SECONDS) != ([], [], []):
+        conn.poll()
+        conn.notifies.clear()
+
+
+def worker_loop():
+    import psycopg2
+    import psycopg2.extensions
+    from django.conf import settings
+
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    client = redis_client()
+    conn = None
+    if client is None:
+        db = settings.DATABASES['default']
+        conn = psycopg2.connect(dbname=db['NAME'], user=db['USER'], password=db.get('PASSWORD'),
+                                host=db.get('HOST') or 'localhost', port=db.get('PORT') or 5432)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+    print(f'👂 Worker {worker} waiting for jobs ({"redis" if client else "LISTEN " + CHANNEL})...')
+
+    while True:
+        job = claim_job(worker)
+        if job is None:
+            wait_for_work(client, conn)
+            continue
+        job_id, digest, params = job
+        if isinstance(params, str):
+            params = json.loads(params)
+        run_job(job_id, digest, params)
+
+
+def run_workers(processes):
+    """Fork a pool of worker processes and restart any that die"""
+    from django.db import connections
+
+    connections.close_all()
+    children = {}
+    while True:
+        while len(children) < processes:
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    worker_loop()
+                except BaseException:
+                    # os._exit skips the interpreter's own traceback printing
+                    traceback.print_exc()
+                    sys.stderr.flush()
+                finally:
+                    os._exit(1)
+            children[pid] = True
+        pid, status = os.wait()
+        children.pop(pid, None)
+        print(f'⚠️  Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting')
+        time.sleep(1)
+
+
+def cleanup():
+    """Delete finished exports older than RESULT_TTL_DAYS and give up on stuck jobs"""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            UPDATE geovisor.export_jobs SET status = 'failed', error = 'Timed out', finished_at = now()
+            WHERE status = 'running' AND attempts >= %s
+              AND started_at < now() - make_interval(mins => %s)
+        ''', [MAX_ATTEMPTS, JOB_TIMEOUT_MINUTES])
+        cursor.execute('''
+            DELETE FROM geovisor.export_jobs
+            WHERE status IN ('done', 'failed') AND finished_at < now() - make_interval(days => %s)
+            RETURNING file_name
+        ''', [RESULT_TTL_DAYS])
+        removed = [row[0] for row in cursor.fetchall()]
+    for file_name in filter(None, removed):
+        path = os.path.join(EXPORT_DIR, file_name)
+        if os.path.exists(path):
+            os.remove(path)
+    return len(removed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export job queue')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    worker_parser = subparsers.add_parser('worker', help='run the worker pool')
+    worker_parser.add_argument('--processes', type=int, default=2)
+
+    submit_parser = subparsers.add_parser('submit', help='queue an export')
+    submit_parser.add_argument('dataset')
+    submit_parser.add_argument('format', choices=FORMATS)
+    submit_parser.add_argument('--codigos', nargs='*')
+    submit_parser.add_argument('--tipo')
+
+    subparsers.add_parser('cleanup', help='remove expired exports')
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    if args.command == 'worker':
+        run_workers(args.processes)
+    elif args.command == 'submit':
+        try:
+            job = submit_job(args.dataset, args.format, args.codigos, args.tipo)
+        except ValueError as e:
+            print(f'❌ {e}')
+            return 1
+        print(json.dumps(job, indent=2))
+    else:
+        print(f'✅ {cleanup()} expired exports removed')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+-- ============================================================================
+-- Export Job Queue
+-- Visor I2D Humboldt Project
+-- PostgreSQL 16 + PostGIS 3.4
+-- ============================================================================
+-- DB-backed queue for large exports (scripts/export_jobs.py). Workers claim
+-- jobs with FOR UPDATE SKIP LOCKED and are woken by NOTIFY export_jobs.
+-- params_hash identifies a parameter set (plus GBIF data version), and the
+-- partial unique index lets identical requests reuse the same job and file.
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < export_jobs.sql
+
+\echo '========================================='
+\echo 'Installing export job queue'
+\echo '========================================='
+
+CREATE TABLE IF NOT EXISTS geovisor.export_jobs (
+    id bigserial PRIMARY KEY,
+    params_hash varchar(64) NOT NULL,
+    params jsonb NOT NULL,
+    status varchar(10) NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts smallint NOT NULL DEFAULT 0,
+    worker text,
+    file_name text,
+    file_size bigint,
+    error text,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    started_at timestamptz,
+    finished_at timestamptz
+);
+
+-- One live job per parameter set; failed jobs can be resubmitted
+CREATE UNIQUE INDEX IF NOT EXISTS idx_export_jobs_params_hash
+  ON geovisor.export_jobs (params_hash) WHERE status <> 'failed';
+
+CREATE INDEX IF NOT EXISTS idx_export_jobs_pending
+  ON geovisor.export_jobs (created_at) WHERE status IN ('queued', 'running');
+
+CREATE OR REPLACE FUNCTION geovisor.notify_export_job() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('export_jobs', NEW.id::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_export_jobs_notify ON geovisor.export_jobs;
+CREATE TRIGGER trg_export_jobs_notify
+    AFTER INSERT OR UPDATE OF status ON geovisor.export_jobs
+    FOR EACH ROW WHEN (NEW.status = 'queued')
+    EXECUTE FUNCTION geovisor.notify_export_job();
+
+\echo '✓ Export job queue installed'
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Streaming export of the GBIF statistics tables (CSV / NDJSON)
+
+Rows are read through a server-side (named) cursor in batches of BATCH_SIZE
+and written straight to the response, so memory stays flat whatever the row
+count and the header goes out before the first batch is fetched.
+
+    GET /api/export/{dataset}.{csv|ndjson}[?codigos=05,08][&tipo=][&geom=wkt|geojson][&precision=6]
+
+served by gis_api.py (Parquet / Arrow IPC: arrow_export.py). Datasets: dpto_queries, mpio_queries, dpto_amenazas,
+mpio_amenazas. Exports longer than Gunicorn's worker timeout (120 s) should go
+through the export job queue instead.
+
+Usage from the command line (writes to stdout):
+    cd visor-geografico-I2D-backend
+    python ../scripts/gbif_export.py mpio_queries --format csv [--codigos 05001 05002] [--geom wkt [--precision 5]] > mpio.csv
+"""
+import argparse
+import csv
+import json
+import sys
+
+BATCH_SIZE = 2000
+
+QUERIES_COLUMNS = ('codigo', 'nombre', 'tipo', 'registers', 'species', 'exoticas', 'endemicas')
+AMENAZAS_COLUMNS = ('codigo', 'nombre', 'tipo', 'amenazadas')
+
+DATASETS = {
+    'dpto_queries': ('gbif_consultas.dpto_queries', QUERIES_COLUMNS),
+    'mpio_queries': ('gbif_consultas.mpio_queries', QUERIES_COLUMNS),
+    'dpto_amenazas': ('gbif_consultas.dpto_amenazas', AMENAZAS_COLUMNS),
+    'mpio_amenazas': ('gbif_consultas.mpio_amenazas', AMENAZAS_COLUMNS),
+}
+GEOMETRY_EXPRESSIONS = {
+    'wkt': 'ST_AsText(geom)',
+    'geojson': 'ST_AsGeoJSON(geom)',
+    'native': 'geom',
+    'hexwkb': "encode(ST_AsBinary(geom), 'hex')",
+}
+# Same, with coordinates rounded to a number of decimal places
+PRECISION_EXPRESSIONS = {
+    'wkt': 'ST_AsText(geom, {})',
+    'geojson': 'ST_AsGeoJSON(geom, {})',
+}
+GEOMETRY_FORMATS = ('wkt', 'geojson')
+MAX_PRECISION = 15
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def export_query(dataset, codigos=None, tipo=None, geom=None, precision=None):
+    """(sql, params, columns) for a dataset export"""
+    table, columns = DATASETS[dataset]
+    select = list(columns)
+    if geom and precision is not None and geom in PRECISION_EXPRESSIONS:
+        select.append(f'{PRECISION_EXPRESSIONS[geom].format(int(precision))} AS geom')
+    elif geom:
+        select.append(f'{GEOMETRY_EXPRESSIONS[geom]} AS geom')
+    where = ['tipo IS NOT NULL']
+    params = []
+    if codigos:
+        where.append('codigo = ANY(%s)')
+        params.append(list(codigos))
+    if tipo:
+        where.append('tipo = %s')
+        params.append(tipo)
+    sql = f'SELECT {", ".join(select)} FROM {table} WHERE {" AND ".join(where)} ORDER BY codigo, tipo, id'
+    return sql, params, tuple(columns) + (('geom',) if geom else ())
+
+
+def iter_batches(sql, params):
+    """Yield lists of rows from a server-side cursor"""
+    from django.db import connection
+
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            yield rows
+
+
+class _Line:
+    """File-like sink for csv.writer that hands back each written line"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(columns, batches):
+    writer = csv.writer(_Line())
+    yield writer.writerow(columns)
+    for rows in batches:
+        yield ''.join(writer.writerow(row) for row in rows)
+
+
+def iter_ndjson(columns, batches, geojson=False):
+    for rows in batches:
+        lines = []
+        for row in rows:
+            record = dict(zip(columns, row))
+            if geojson and record.get('geom'):
+                record['geom'] = json.loads(record['geom'])
+            lines.append(json.dumps(record, ensure_ascii=False, default=str))
+        yield '\n'.join(lines) + '\n'
+
+
+def iter_export(dataset, fmt, codigos=None, tipo=None, geom=None, precision=None):
+    """Chunks of text making up the export file"""
+    sql, params, columns = export_query(dataset, codigos, tipo, geom, precision)
+    batches = iter_batches(sql, params)
+    if fmt == 'csv':
+        return iter_csv(columns, batches)
+    return iter_ndjson(columns, batches, geojson=geom == 'geojson')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a GBIF statistics table to stdout')
+    parser.add_argument('dataset', choices=DATASETS)
+    parser.add_argument('--format', choices=CONTENT_TYPES, default='csv')
+    parser.add_argument('--codigos', nargs='*')
+    parser.add_argument('--tipo')
+    parser.add_argument('--geom', choices=GEOMETRY_FORMATS)
+    parser.add_argument('--precision', type=int, help='decimal places of the geometry coordinates')
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    for chunk in iter_export(args.dataset, args.format, args.codigos, args.tipo, args.geom, args.precision):
+        sys.stdout.write(chunk)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic data for scale testing
+
+Dev databases hold 2-3 projects with a few hundred layers and ~1,100
+municipalities, which hides O(N) queries and serializers. This generator adds,
+from a seed:
+
+  projects  synthetic-1..N projects, each with thousands of nested LayerGroups
+            and layers, loaded through import_project_structure.py (bulk, one
+            transaction per project).
+  areas     synthetic municipalities at 10x-100x the real count: a jittered
+            grid over Colombia's bounding box written to
+            capas_base.mpio_politico, gbif_consultas.mpio_queries and
+            gbif_consultas.mpio_amenazas (one row per tipo in each, over the
+            same tipos, as the ?tipo= filters and area_summary.sql's join on
+            tipo expect). Neighbouring cells share
+            exactly the same border vertices, like a real coverage, so
+            simplification and TopoJSON behave as they do on real data.
+  clear     remove everything generated.
+
+The same seed and arguments always produce the same rows: every value derives
+from the seed and the row's identity, not from generation order.
+Synthetic municipalities use codigos 'Z' + 4 base-36 digits (no DIVIPOLA
+code starts with a letter) and synthetic projects the `synthetic-` prefix.
+
+After `areas`, rebuild the derived tables so endpoints see the new rows:
+    python ../scripts/refresh_area_summary.py --force
+    python ../scripts/refresh_area_extents.py
+    python ../scripts/refresh_simplified_geoms.py
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/generate_synthetic_data.py projects [--projects 3] [--groups 2000] [--depth 4] [--layers 3] [--seed 1]
+    python ../scripts/generate_synthetic_data.py areas [--scale 10 | --count 20000] [--vertices 25] [--seed 1]
+    python ../scripts/generate_synthetic_data.py clear
+"""
+import argparse
+import io
+import math
+import random
+import sys
+import time
+
+PROJECT_PREFIX = 'synthetic-'
+AREA_PREFIX = 'Z'
+REAL_MUNICIPALITIES = 1122
+# Colombia (mainland) bounding box, lon/lat
+BOUNDS = (-79.0, -4.2, -67.0, 12.5)
+JITTER = 0.15
+DPTO_BLOCK = 6
+COPY_BATCH = 2000
+
+# Used when the real tables hold no tipos yet; one letter, as mpio_amenazas.tipo is varchar(1)
+DEFAULT_TIPOS = ('c', 'e', 'v')
+
+
+# ---------------------------------------------------------------------------
+# Projects
+# ---------------------------------------------------------------------------
+
+def synthetic_structure(seed, name, groups, depth, layers):
+    """Nested structure dict (import_project_structure.py format) with `groups` groups"""
+    rng = random.Random(f'{seed}:{name}')
+    parents = []   # (path, config) of groups that can still take subgroups
+    roots = {}
+    for index in range(groups):
+        parent = rng.choice(parents) if parents and rng.random() < 0.8 else None
+        siblings = parent[1]['subgroups'] if parent else roots
+        group_name = f'Grupo {index:05d}'
+        config = {'orden': len(siblings), 'subgroups': {}, 'layers': [
+            {
+                'nombre_geoserver': f'{name}_g{index:05d}_l{k}',
+                'nombre_display': f'Capa {index}-{k}',
+                'store_geoserver': 'synthetic',
+                'estado_inicial': rng.random() < 0.02,
+                'orden': k,
+            }
+            for k in range(rng.randint(0, 2 * layers))
+        ]}
+        siblings[group_name] = config
+        path = (parent[0] if parent else ()) + (group_name,)
+        if len(path) < depth:
+            parents.append((path, config))
+    return roots
+
+
+def generate_projects(count, groups, depth, layers, seed):
+    from import_project_structure import import_structure
+
+    for i in range(1, count + 1):
+        nombre_corto = f'{PROJECT_PREFIX}{i}'
+        project = {
+            'nombre_corto': nombre_corto,
+            'nombre': f'Proyecto sintético {i}',
+            'nivel_zoom': 6,
+            'coordenada_central_x': -8113332,
+            'coordenada_central_y': 464737,
+            'panel_visible': True,
+            'base_map_visible': 'streetmap',
+        }
+        started = time.time()
+        diff = import_structure(project, synthetic_structure(seed, nombre_corto, groups, depth, layers),
+                                verbose=False)
+        print(f'✅ {nombre_corto}: {diff.summary()} ({time.time() - started:.1f}s)')
+
+
+# ---------------------------------------------------------------------------
+# Areas
+# ---------------------------------------------------------------------------
+
+def area_code(n):
+    """'Z' + 4 base-36 digits"""
+    digits = ''
+    for _ in range(4):
+        n, r = divmod(n, 36)
+        digits = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'[r] + digits
+    if n:
+        raise ValueError('Too many synthetic areas (max 36^4)')
+    return AREA_PREFIX + digits
+
+
+class Grid:
+    """Jittered lattice over BOUNDS; edges are computed from the lattice, so neighbours share vertices"""
+
+    def __init__(self, count, vertices, seed):
+        xmin, ymin, xmax, ymax = BOUNDS
+        self.cols = max(1, math.ceil(math.sqrt(count * (xmax - xmin) / (ymax - ymin))))
+        self.rows = math.ceil(count / self.cols)
+        self.w = (xmax - xmin) / self.cols
+        self.h = (ymax - ymin) / self.rows
+        self.vertices = vertices
+        self.seed = seed
+
+    def _jitter(self, kind, i, j, k):
+        value = (i * 73856093) ^ (j * 19349663) ^ (k * 83492791) ^ (kind * 2654435761) ^ (self.seed * 97)
+        taper = math.sin(math.pi * k / self.vertices)
+        return ((value % 10007) / 10007 - 0.5) * 2 * JITTER * taper
+
+    def edge(self, kind, i, j):
+        """Points of the horizontal (kind 0) or vertical (kind 1) edge starting at lattice node (i, j)"""
+        x0, y0 = BOUNDS[0], BOUNDS[1]
+        points = []
+        for k in range(self.vertices + 1):
+            if kind == 0:
+                x = x0 + (i + k / self.vertices) * self.w
+                y = y0 + (j + self._jitter(0, i, j, k)) * self.h
+            else:
+                x = x0 + (i + self._jitter(1, i, j, k)) * self.w
+                y = y0 + (j + k / self.vertices) * self.h
+            points.append((round(x, 6), round(y, 6)))
+        return points
+
+    def ring(self, i, j):
+        """Counterclockwise closed ring of cell (i, j)"""
+        bottom = self.edge(0, i, j)
+        right = self.edge(1, i + 1, j)
+        top = self.edge(0, i, j + 1)[::-1]
+        left = self.edge(1, i, j)[::-1]
+        return bottom + right[1:] + top[1:] + left[1:]
+
+    def cell(self, n):
+        return n % self.cols, n // self.cols
+
+    def wkt(self, n):
+        coordinates = ','.join(f'{x} {y}' for x, y in self.ring(*self.cell(n)))
+        return f'MULTIPOLYGON((({coordinates})))'
+
+    def dpto(self, n):
+        i, j = self.cell(n)
+        return (j // DPTO_BLOCK) * math.ceil(self.cols / DPTO_BLOCK) + i // DPTO_BLOCK
+
+
+def area_stats(seed, codigo, tipos):
+    """([(tipo, registers, species, exoticas, endemicas)], [(tipo, amenazadas)]) for one area"""
+    rng = random.Random(f'{seed}:{codigo}')
+    queries = []
+    for tipo in tipos:
+        registers = int(rng.lognormvariate(7, 1.5))
+        species = min(registers, int(registers ** 0.6 * rng.uniform(1, 3)))
+        queries.append((tipo, registers, species, int(species * rng.uniform(0, 0.05)),
+                        int(species * rng.uniform(0, 0.1))))
+    amenazas = [(tipo, int(rng.uniform(0, 40))) for tipo in tipos]
+    return queries, amenazas
+
+
+def existing_tipos(cursor):
+    """Real tipos shared by queries and amenazas, read from mpio_amenazas whose varchar(1) bounds the domain"""
+    cursor.execute('''
+        SELECT DISTINCT tipo::text FROM gbif_consultas.mpio_amenazas
+        WHERE tipo IS NOT NULL AND codigo NOT LIKE %s ORDER BY 1
+    ''', [AREA_PREFIX + '%'])
+    return tuple(row[0] for row in cursor.fetchall()) or DEFAULT_TIPOS
+
+
+def _copy(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join('\\N' if v is None else str(v) for v in row) + '\n')
+    buffer.seek(0)
+    cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN', buffer)
+
+
+def generate_areas(count, vertices, seed):
+    from django.db import connection, transaction
+
+    grid = Grid(count, vertices, seed)
+    with transaction.atomic(), connection.cursor() as cursor:
+        tipos = existing_tipos(cursor)
+        clear_areas(cursor)
+        cursor.execute('''
+            CREATE TEMP TABLE synthetic_areas (codigo varchar(5), nombre text, dpto_nombre text, wkt text) ON COMMIT DROP;
+            CREATE TEMP TABLE synthetic_queries (codigo varchar(5), tipo text, registers bigint, species bigint,
+                                                 exoticas bigint, endemicas bigint) ON COMMIT DROP;
+            CREATE TEMP TABLE synthetic_amenazas (codigo varchar(5), tipo text, amenazadas bigint) ON COMMIT DROP;
+        ''')
+
+        for start in range(0, count, COPY_BATCH):
+            areas, queries, amenazas = [], [], []
+            for n in range(start, min(start + COPY_BATCH, count)):
+                codigo = area_code(n)
+                areas.append((codigo, f'Sintético {codigo}', f'Depto sintético {grid.dpto(n):03d}', grid.wkt(n)))
+                area_queries, area_amenazas = area_stats(seed, codigo, tipos)
+                queries.extend((codigo, *row) for row in area_queries)
+                amenazas.extend((codigo, *row) for row in area_amenazas)
+            _copy(cursor, 'synthetic_areas', ('codigo', 'nombre', 'dpto_nombre', 'wkt'), areas)
+            _copy(cursor, 'synthetic_queries',
+                  ('codigo', 'tipo', 'registers', 'species', 'exoticas', 'endemicas'), queries)
+            _copy(cursor, 'synthetic_amenazas', ('codigo', 'tipo', 'amenazadas'), amenazas)
+            print(f'   {min(start + COPY_BATCH, count):,} / {count:,} areas', end='\r')
+
+        cursor.execute('''
+            INSERT INTO capas_base.mpio_politico (codigo, nombre, dpto_nombre, geom)
+            SELECT codigo, nombre, dpto_nombre,
+                   ST_Transform(ST_GeomFromText(wkt, 4326), Find_SRID('capas_base', 'mpio_politico', 'geom'))
+            FROM synthetic_areas;
+
+            INSERT INTO gbif_consultas.mpio_queries (codigo, tipo, registers, species, exoticas, endemicas, geom, nombre)
+            SELECT q.codigo, q.tipo, q.registers, q.species, q.exoticas, q.endemicas,
+                   ST_Transform(ST_GeomFromText(a.wkt, 4326), Find_SRID('gbif_consultas', 'mpio_queries', 'geom')),
+                   a.nombre
+            FROM synthetic_queries q JOIN synthetic_areas a USING (codigo);
+
+            INSERT INTO gbif_consultas.mpio_amenazas (codigo, tipo, amenazadas, geom, nombre)
+            SELECT m.codigo, m.tipo, m.amenazadas,
+                   ST_Transform(ST_GeomFromText(a.wkt, 4326), Find_SRID('gbif_consultas', 'mpio_amenazas', 'geom')),
+                   a.nombre
+            FROM synthetic_amenazas m JOIN synthetic_areas a USING (codigo);
+        ''')
+        cursor.execute('ANALYZE capas_base.mpio_politico; ANALYZE gbif_consultas.mpio_queries; '
+                       'ANALYZE gbif_consultas.mpio_amenazas;')
+    print(f'✅ {count:,} synthetic municipalities ({grid.cols}x{grid.rows} grid, '
+          f'{4 * vertices} vertices each, {len(tipos)} tipos)')
+
+
+def real_municipality_count():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM capas_base.mpio_politico WHERE codigo NOT LIKE %s',
+                       [AREA_PREFIX + '%'])
+        return cursor.fetchone()[0] or REAL_MUNICIPALITIES
+
+
+# ---------------------------------------------------------------------------
+# Clear
+# ---------------------------------------------------------------------------
+
+def clear_areas(cursor):
+    removed = 0
+    for table in ('capas_base.mpio_politico', 'gbif_consultas.mpio_queries', 'gbif_consultas.mpio_amenazas'):
+        cursor.execute(f'DELETE FROM {table} WHERE codigo LIKE %s', [AREA_PREFIX + '%'])
+        removed += cursor.rowcount
+    return removed
+
+
+def clear():
+    from django.db import connection, transaction
+    from applications.projects.models import Project
+
+    with transaction.atomic():
+        deleted, _ = Project.objects.filter(nombre_corto__startswith=PROJECT_PREFIX).delete()
+        with connection.cursor() as cursor:
+            rows = clear_areas(cursor)
+    print(f'🗑️  Removed {deleted:,} project/group/layer rows and {rows:,} area rows')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate deterministic synthetic data for scale testing')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    projects = subparsers.add_parser('projects', help='synthetic projects with nested groups and layers')
+    projects.add_argument('--projects', type=int, default=3)
+    projects.add_argument('--groups', type=int, default=2000, help='groups per project')
+    projects.add_argument('--depth', type=int, default=4, help='maximum nesting depth')
+    projects.add_argument('--layers', type=int, default=3, help='average layers per group')
+    projects.add_argument('--seed', type=int, default=1)
+
+    areas = subparsers.add_parser('areas', help='synthetic municipalities with GBIF statistics')
+    size = areas.add_mutually_exclusive_group()
+    size.add_argument('--scale', type=float, default=10, help='multiple of the real municipality count')
+    size.add_argument('--count', type=int, help='exact number of municipalities')
+    areas.add_argument('--vertices', type=int, default=25, help='vertices per polygon side')
+    areas.add_argument('--seed', type=int, default=1)
+
+    subparsers.add_parser('clear', help='remove all synthetic data')
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    started = time.time()
+    if args.command == 'projects':
+        generate_projects(args.projects, args.groups, args.depth, args.layers, args.seed)
+    elif args.command == 'areas':
+        count = args.count or int(real_municipality_count() * args.scale)
+        generate_areas(count, args.vertices, args.seed)
+    else:
+        clear()
+    print(f'⏱️  {time.time() - started:.1f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+GeoJSON FeatureCollections built by PostGIS and streamed untouched
+
+GeoDjango materializes a GEOSGeometry per row and serializes it in Python
+(see tests/test_spatial_performance.py). Here ST_AsGeoJSON(record, 'geom',
+precision) makes every Feature (geometry and properties) inside PostgreSQL,
+and Python only joins those strings, batch by batch from a server-side
+cursor, between the FeatureCollection header and footer. No geometry or dict
+is built per row. (A single json_agg over the whole table would hold the
+collection in one value before the first byte goes out.)
+
+At low zooms the boundaries come from capas_base.simplified_geoms
+(simplified_geometries.sql) when a simplification level is given.
+`precision` sets the decimal places of the coordinates (6 = ~10 cm).
+
+The same features can be served as TopoJSON (shared arcs, quantized integer
+coordinates, topojson_builder.py). That output is built in Python, so it is
+cached in the shared cache per request parameters and GBIF data version.
+
+    GET /api/features/{dataset}.geojson[?codigos=05,08][&tipo=][&precision=6][&zoom=|&bbox=]
+    GET /api/features/{dataset}.topojson[?codigos=05,08][&tipo=][&quantization=1e5][&zoom=|&bbox=]
+
+served by gis_api.py. Datasets: those of gbif_export.py plus the boundary
+layers mpio_politico and dpto_politico.
+
+Usage from the command line (writes to stdout):
+    cd visor-geografico-I2D-backend
+    python ../scripts/geojson_features.py dpto_queries [--tipo total] [--precision 5] [--level 3] > dpto.geojson
+    python ../scripts/geojson_features.py mpio_politico --topojson 100000 > mpio.topojson
+"""
+import argparse
+import hashlib
+import json
+import sys
+
+import gbif_export
+import topojson_builder
+
+BOUNDARY_DATASETS = {
+    'mpio_politico': ('capas_base.mpio_politico', ('codigo', 'nombre', 'dpto_nombre')),
+    'dpto_politico': ('capas_base.dpto_politico', ('codigo', 'nombre')),
+}
+DATASETS = {**gbif_export.DATASETS, **BOUNDARY_DATASETS}
+
+CONTENT_TYPE = 'application/geo+json'
+TOPOJSON_CONTENT_TYPE = 'application/json'
+TOPOJSON_CACHE_TIMEOUT = 24 * 3600
+DEFAULT_PRECISION = 6
+MAX_PRECISION = 15
+BATCH_SIZE = 500
+
+# Layer of capas_base.simplified_geoms holding the boundaries of each dataset
+SIMPLIFIED_LAYERS = {
+    'dpto_queries': 'departamentos',
+    'dpto_amenazas': 'departamentos',
+    'mpio_queries': 'municipios',
+    'mpio_amenazas': 'municipios',
+    'dpto_politico': 'departamentos',
+    'mpio_politico': 'municipios',
+}
+
+HEADER = '{"type":"FeatureCollection","features":['
+FOOTER = ']}'
+
+
+def features_query(dataset, codigos=None, tipo=None, precision=DEFAULT_PRECISION, level=0, bbox=None):
+    """(sql, params) returning one Feature (GeoJSON text) per row"""
+    table, columns = DATASETS[dataset]
+    select = [f't.{column}' for column in columns]
+    params = []
+    join = ''
+    if level:
+        select.append('COALESCE(s.geom, t.geom) AS geom')
+        join = 'LEFT JOIN capas_base.simplified_geoms s ON s.layer = %s AND s.level = %s AND s.codigo = t.codigo'
+        params += [SIMPLIFIED_LAYERS[dataset], level]
+    else:
+        select.append('t.geom')
+
+    boundary = dataset in BOUNDARY_DATASETS
+    where = ['t.geom IS NOT NULL'] if boundary else ['t.tipo IS NOT NULL', 't.geom IS NOT NULL']
+    if codigos:
+        where.append('t.codigo = ANY(%s)')
+        params.append(list(codigos))
+    if tipo and not boundary:
+        where.append('t.tipo = %s')
+        params.append(tipo)
+    if bbox:
+        where.append('t.geom && ST_MakeEnvelope(%s, %s, %s, %s, 4326)')
+        params += list(bbox)
+
+    sql = f'''
+        SELECT ST_AsGeoJSON(f.*, 'geom', %s)
+        FROM (
+            SELECT {", ".join(select)}
+            FROM {table} t {join}
+            WHERE {" AND ".join(where)}
+            ORDER BY {'t.codigo' if boundary else 't.codigo, t.tipo, t.id'}
+        ) f
+    '''
+    return sql, [precision] + params
+
+
+def iter_feature_collection(chunks):
+    """Frame pre-serialized, comma-joined Feature chunks as a FeatureCollection"""
+    yield HEADER
+    separator = ''
+    for chunk in chunks:
+        if chunk:
+            yield separator + chunk
+            separator = ','
+    yield FOOTER
+
+
+def iter_features(dataset, codigos=None, tipo=None, precision=DEFAULT_PRECISION, level=0, bbox=None):
+    """Chunks of text making up the FeatureCollection"""
+    from django.db import connection
+
+    sql, params = features_query(dataset, codigos, tipo, precision, level, bbox)
+
+    def chunks():
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(BATCH_SIZE)
+                if not rows:
+                    break
+                yield ','.join(feature for feature, in rows)
+
+    return iter_feature_collection(chunks())
+
+
+def build_topojson(dataset, codigos=None, tipo=None, quantization=topojson_builder.DEFAULT_QUANTIZATION,
+                   level=0, bbox=None):
+    """TopoJSON Topology of a dataset, as a dict"""
+    sql, params = features_query(dataset, codigos, tipo, MAX_PRECISION, level, bbox)
+    features = []
+    for rows in gbif_export.iter_batches(sql, params):
+        for text, in rows:
+            feature = json.loads(text)
+            features.append((feature['properties'], feature['geometry']))
+    return topojson_builder.build_topology(features, dataset, quantization)
+
+
+def topojson_collection(dataset, codigos=None, tipo=None, quantization=topojson_builder.DEFAULT_QUANTIZATION,
+                        level=0, bbox=None):
+    """Serialized TopoJSON, cached per parameters and data version; returns (bytes, hit)"""
+    from project_cache import get_cache
+    from tile_cache import data_version
+
+    request = json.dumps([dataset, sorted(codigos or []), tipo, quantization, level, bbox])
+    key = f'topojson:{data_version()}:{hashlib.sha1(request.encode()).hexdigest()}'
+    cache = get_cache()
+    data = cache.get(key)
+    if data is not None:
+        return data, True
+
+    topology = build_topojson(dataset, codigos, tipo, quantization, level, bbox)
+    data = json.dumps(topology, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    cache.set(key, data, timeout=TOPOJSON_CACHE_TIMEOUT)
+    return data, False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a GBIF statistics or boundary table as GeoJSON to stdout')
+    parser.add_argument('dataset', choices=DATASETS)
+    parser.add_argument('--codigos', nargs='*')
+    parser.add_argument('--tipo')
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION)
+    parser.add_argument('--level', type=int, default=0, help='capas_base.simplified_geoms level (0 = original)')
+    parser.add_argument('--topojson', type=int, metavar='QUANTIZATION', help='write TopoJSON instead')
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    if args.topojson:
+        topology = build_topojson(args.dataset, args.codigos, args.tipo, args.topojson, args.level)
+        json.dump(topology, sys.stdout, ensure_ascii=False, separators=(',', ':'))
+        return 0
+    for chunk in iter_features(args.dataset, args.codigos, args.tipo, args.precision, args.level):
+        sys.stdout.write(chunk)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,455 @@
+"""
+Geographic API views served directly from PostGIS
+
+Endpoints that don't map onto a DRF model viewset (vector tiles, area
+statistics, search...) and delegate the heavy lifting to SQL functions
+installed from scripts/*.sql.
+
+Wire into the backend URLconf (scripts/ must be on sys.path, as set up by
+django_env.py or PYTHONPATH):
+
+    # i2dbackend/urls.py
+    path('api/', include('gis_api')),
+
+Endpoints:
+    GET /api/tiles/{layer}/{z}/{x}/{y}.mvt[?tipo=]   (vector_tiles.sql, cached by tile_cache.py)
+    GET /api/tiles/stats                              tile cache hit/miss counters
+    GET /api/areas/{dpto|mpio}/{codigo}/stats[?tipo=] per-tipo statistics (area_summary.sql)
+    GET|POST /api/areas/{dpto|mpio}/stats              many areas at once (?codigos=05,08 or {"codigos": [...]})
+    GET /api/export/{dataset}.{csv|ndjson}             streamed GBIF statistics (gbif_export.py, ?precision=)
+    GET /api/export/{dataset}.{parquet|arrow}          columnar export (arrow_export.py)
+    POST /api/export/jobs, GET /api/export/jobs/{id}  asynchronous exports (export_jobs.py)
+    GET /api/search/municipios?q=[&limit=]              municipality search (municipality_search.sql)
+    GET /api/autocomplete?q=[&limit=]                  in-memory autocomplete (autocomplete.py)
+    GET /api/areas/{codigo}/extent[?source=]           centroid and bbox (area_extents.sql)
+    GET /api/identify?lon=&lat=                        units containing a point, with stats (identify.sql)
+    GET|POST /api/areas/aggregate                      stats for a bbox or GeoJSON polygon (area_aggregation.py)
+    GET /api/features/{dataset}.{geojson|topojson}     PostGIS-built FeatureCollection or TopoJSON (geojson_features.py)
+    GET /api/metrics                                   Prometheus metrics (metrics.py)
+"""
+import json
+import math
+
+from django.db import connection
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+import area_aggregation
+import arrow_export
+import autocomplete
+import export_jobs
+import gbif_export
+import geojson_features
+import metrics
+import tile_cache
+import topojson_builder
+
+TILE_LAYERS = ('departamentos', 'municipios')
+MAX_TILE_ZOOM = 16
+MVT_CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+TILE_MAX_AGE = 3600
+
+STAT_FIELDS = ('registers', 'species', 'exoticas', 'endemicas', 'amenazadas')
+AREA_TABLES = {
+    'dpto': ('gbif_consultas.dpto_queries', 'gbif_consultas.dpto_amenazas'),
+    'mpio': ('gbif_consultas.mpio_queries', 'gbif_consultas.mpio_amenazas'),
+}
+MAX_BATCH_CODES = 2000
+
+# Extent sources tried in order, by code length (DIVIPOLA: 2 digits dpto, 5 mpio)
+EXTENT_SOURCES = {
+    2: ('dpto_politico', 'dpto_queries'),
+    5: ('mpio_politico', 'mpio_queries'),
+}
+EXTENT_MAX_AGE = 86400
+
+# Colombia, with a margin for the maritime islands
+IDENTIFY_BOUNDS = (-82.0, -4.5, -66.0, 16.5)
+IDENTIFY_MAX_AGE = 3600
+
+SEARCH_MIN_LENGTH = 2
+SEARCH_MAX_RESULTS = 50
+SEARCH_MAX_AGE = 300
+
+
+def fetch_tile(layer, z, x, y, tipo=None):
+    """Return the MVT bytes of a tile (empty bytes when nothing intersects it)"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT capas_base.mvt_tile(%s, %s, %s, %s, %s)', [layer, z, x, y, tipo])
+        return bytes(cursor.fetchone()[0])
+
+
+def simplification_level(zoom=None, bbox=None, width_px=1024):
+    """Level of capas_base.simplified_geoms to serve for a zoom or a lon/lat bbox (0 = original)"""
+    with connection.cursor() as cursor:
+        if zoom is not None:
+            cursor.execute('SELECT capas_base.geom_level_for_zoom(%s)', [zoom])
+        else:
+            cursor.execute('SELECT capas_base.geom_level_for_bbox(ST_MakeEnvelope(%s, %s, %s, %s, 4326), %s)',
+                           [*bbox, width_px])
+        return cursor.fetchone()[0]
+
+
+def parse_precision(request, default=None):
+    """?precision= as decimal places (default when absent); raises ValueError"""
+    if not request.GET.get('precision'):
+        return default
+    try:
+        precision = int(request.GET['precision'])
+    except ValueError:
+        precision = -1
+    if not 0 <= precision <= gbif_export.MAX_PRECISION:
+        raise ValueError(f'precision must be an integer between 0 and {gbif_export.MAX_PRECISION}')
+    return precision
+
+
+def parse_limit(request, default):
+    """?limit= clamped to 1..SEARCH_MAX_RESULTS (default when absent); raises ValueError"""
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise ValueError('limit must be an integer') from None
+    return max(1, min(limit, SEARCH_MAX_RESULTS))
+
+
+def tile(request, layer, z, x, y):
+    if layer not in TILE_LAYERS or z > MAX_TILE_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        raise Http404('Tile not found')
+
+    tipo = request.GET.get('tipo') or None
+    if not tile_cache.valid_tipo(tipo):
+        return HttpResponseBadRequest('Invalid tipo')
+    data, hit = tile_cache.cached_tile(layer, z, x, y, tipo, lambda: fetch_tile(layer, z, x, y, tipo))
+    response = HttpResponse(data, content_type=MVT_CONTENT_TYPE)
+    response['Cache-Control'] = f'public, max-age={TILE_MAX_AGE}'
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
+
+
+def tile_stats(request):
+    return JsonResponse(tile_cache.cache_stats())
+
+
+def prometheus_metrics(request):
+    if not metrics.available():
+        return HttpResponse('Metrics need prometheus_client on the server', status=501, content_type='text/plain')
+    body, content_type = metrics.render()
+    response = HttpResponse(body, content_type=content_type)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def area_stats(request, nivel, codigo):
+    if nivel not in AREA_TABLES:
+        raise Http404('Unknown area level')
+
+    sql = f'''
+        SELECT tipo, nombre, {", ".join(STAT_FIELDS)}
+        FROM gbif_consultas.area_summary
+        WHERE nivel = %s AND codigo = %s
+    '''
+    params = [nivel, codigo]
+    if request.GET.get('tipo'):
+        sql += ' AND tipo = %s'
+        params.append(request.GET['tipo'])
+    with connection.cursor() as cursor:
+        cursor.execute(sql + ' ORDER BY tipo', params)
+        rows = cursor.fetchall()
+    if not rows:
+        raise Http404('Area not found')
+
+    return JsonResponse({
+        'nivel': nivel,
+        'codigo': codigo,
+        'nombre': rows[0][1],
+        'tipos': {tipo: dict(zip(STAT_FIELDS, values)) for tipo, _, *values in rows},
+    })
+
+
+def fetch_areas_stats(nivel, codigos):
+    """Queries and amenazas rows of many areas in one round trip, grouped by codigo and tipo"""
+    queries_table, amenazas_table = AREA_TABLES[nivel]
+    sql = f'''
+        SELECT codigo, tipo, nombre, registers, species, exoticas, endemicas, NULL::bigint AS amenazadas
+        FROM {queries_table}
+        WHERE codigo = ANY(%(codigos)s) AND tipo IS NOT NULL
+        UNION ALL
+        SELECT codigo, tipo::text, nombre, NULL, NULL, NULL, NULL, amenazadas
+        FROM {amenazas_table}
+        WHERE codigo = ANY(%(codigos)s) AND tipo IS NOT NULL
+        ORDER BY codigo, tipo
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, {'codigos': list(codigos)})
+        rows = cursor.fetchall()
+
+    areas = {}
+    for codigo, tipo, nombre, *values in rows:
+        area = areas.setdefault(codigo, {'nombre': nombre, 'tipos': {}})
+        stats = area['tipos'].setdefault(tipo, dict.fromkeys(STAT_FIELDS))
+        for field, value in zip(STAT_FIELDS, values):
+            if value is not None:
+                stats[field] = (stats[field] or 0) + value
+    return areas
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def areas_stats(request, nivel):
+    if nivel not in AREA_TABLES:
+        raise Http404('Unknown area level')
+
+    if request.method == 'POST':
+        try:
+            codigos = json.loads(request.body or b'{}').get('codigos', [])
+        except (ValueError, AttributeError):
+            return HttpResponseBadRequest('Body must be JSON: {"codigos": [...]}')
+        if isinstance(codigos, str):
+            codigos = codigos.split(',')
+        elif not isinstance(codigos, list):
+            return HttpResponseBadRequest('codigos must be a list or a comma-separated string')
+    else:
+        codigos = request.GET.get('codigos', '').split(',')
+    codigos = list(dict.fromkeys(str(c).strip() for c in codigos if str(c).strip()))
+
+    if not codigos:
+        return HttpResponseBadRequest('codigos is required')
+    if len(codigos) > MAX_BATCH_CODES:
+        return HttpResponseBadRequest(f'At most {MAX_BATCH_CODES} codigos per request')
+
+    areas = fetch_areas_stats(nivel, codigos)
+    return JsonResponse({
+        'nivel': nivel,
+        'areas': areas,
+        'missing': [c for c in codigos if c not in areas],
+    })
+
+
+def export(request, dataset, fmt):
+    if dataset not in gbif_export.DATASETS:
+        raise Http404('Unknown export')
+    if fmt in arrow_export.ARROW_FORMATS:
+        return export_arrow(request, dataset, fmt)
+    if fmt not in gbif_export.CONTENT_TYPES:
+        raise Http404('Unknown export')
+    geom = request.GET.get('geom') or None
+    if geom and geom not in gbif_export.GEOMETRY_FORMATS:
+        return HttpResponseBadRequest(f'geom must be one of: {", ".join(gbif_export.GEOMETRY_FORMATS)}')
+    try:
+        precision = parse_precision(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    codigos = [c.strip() for c in request.GET.get('codigos', '').split(',') if c.strip()]
+
+    response = StreamingHttpResponse(
+        gbif_export.iter_export(dataset, fmt, codigos, request.GET.get('tipo') or None, geom, precision),
+        content_type=gbif_export.CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    # Let nginx pass chunks through as they are produced
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def export_arrow(request, dataset, fmt):
+    if not arrow_export.available():
+        return HttpResponse('Columnar exports need pyarrow on the server', status=501, content_type='text/plain')
+    codigos = [c.strip() for c in request.GET.get('codigos', '').split(',') if c.strip()]
+
+    response = StreamingHttpResponse(
+        arrow_export.iter_arrow(dataset, fmt, codigos, request.GET.get('tipo') or None),
+        content_type=arrow_export.ARROW_FORMATS[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+def export_job_create(request):
+    try:
+        body = json.loads(request.body or b'{}')
+        job = export_jobs.submit_job(body.get('dataset'), body.get('format'), body.get('codigos'), body.get('tipo'))
+    except (ValueError, AttributeError) as e:
+        return HttpResponseBadRequest(str(e))
+    return JsonResponse(job, status=202 if job['status'] != 'done' else 200)
+
+
+def export_job_status(request, job_id):
+    job = export_jobs.get_job(job_id)
+    if job is None:
+        raise Http404('Job not found')
+    return JsonResponse(job)
+
+
+def search_municipios(request):
+    q = request.GET.get('q', '').strip()
+    try:
+        limit = parse_limit(request, 10)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    if len(q.split(',')[0].strip()) < SEARCH_MIN_LENGTH:
+        return JsonResponse({'q': q, 'results': []})
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT codigo, nombre, dpto_nombre, score FROM capas_base.search_municipios(%s, %s)',
+                       [q, limit])
+        results = [
+            {'codigo': codigo, 'nombre': nombre, 'dpto_nombre': dpto_nombre, 'score': round(score, 3)}
+            for codigo, nombre, dpto_nombre, score in cursor.fetchall()
+        ]
+    response = JsonResponse({'q': q, 'results': results})
+    response['Cache-Control'] = f'public, max-age={SEARCH_MAX_AGE}'
+    return response
+
+
+def autocomplete_view(request):
+    q = request.GET.get('q', '')
+    try:
+        limit = parse_limit(request, autocomplete.DEFAULT_LIMIT)
+    except ValueError as exc:
+        return HttpResponseBadRequest(str(exc))
+    return JsonResponse({'q': q, 'results': autocomplete.search(q, limit)})
+
+
+def area_extent(request, codigo):
+    sources = EXTENT_SOURCES.get(len(codigo))
+    if request.GET.get('source'):
+        sources = (request.GET['source'],)
+    if not sources:
+        raise Http404('Area not found')
+
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT source, nombre, ST_X(centroid), ST_Y(centroid), ST_X(label_point), ST_Y(label_point),
+                   xmin, ymin, xmax, ymax
+            FROM capas_base.area_extents
+            WHERE codigo = %s AND source = ANY(%s)
+            ORDER BY array_position(%s, source::text)
+            LIMIT 1
+        ''', [codigo, list(sources), list(sources)])
+        row = cursor.fetchone()
+    if row is None:
+        raise Http404('Area not found')
+
+    source, nombre, cx, cy, lx, ly, *bbox = row
+    response = JsonResponse({
+        'codigo': codigo,
+        'nombre': nombre,
+        'source': source,
+        'centroid': [cx, cy],
+        'label_point': [lx, ly],
+        'bbox': bbox,
+    })
+    response['Cache-Control'] = f'public, max-age={EXTENT_MAX_AGE}'
+    return response
+
+
+def identify(request):
+    try:
+        lon = float(request.GET['lon'])
+        lat = float(request.GET['lat'])
+    except (KeyError, ValueError):
+        return HttpResponseBadRequest('lon and lat are required numbers')
+
+    result = {'lon': lon, 'lat': lat, 'departamento': None, 'municipio': None, 'cars': []}
+    xmin, ymin, xmax, ymax = IDENTIFY_BOUNDS
+    if xmin <= lon <= xmax and ymin <= lat <= ymax:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT unidad, codigo, nombre, atributos, stats FROM capas_base.identify(%s, %s)',
+                           [lon, lat])
+            rows = cursor.fetchall()
+        for unidad, codigo, nombre, atributos, stats in rows:
+            if isinstance(atributos, str):
+                atributos = json.loads(atributos)
+            if isinstance(stats, str):
+                stats = json.loads(stats)
+            if unidad == 'car':
+                result['cars'].append({'codigo': codigo, 'nombre': nombre, 'atributos': atributos})
+            else:
+                result[unidad] = {'codigo': codigo, 'nombre': nombre, **(atributos or {}), 'tipos': stats or {}}
+
+    response = JsonResponse(result)
+    response['Cache-Control'] = f'public, max-age={IDENTIFY_MAX_AGE}'
+    return response
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def areas_aggregate(request):
+    try:
+        if request.method == 'POST':
+            body = json.loads(request.body or b'{}')
+            tipo = body.get('tipo') or None
+            geometry = area_aggregation.bbox_polygon(body['bbox']) if body.get('bbox') else body.get('geometry')
+        else:
+            tipo = request.GET.get('tipo') or None
+            geometry = area_aggregation.bbox_polygon(request.GET.get('bbox', ''))
+        result, hit = area_aggregation.aggregate(geometry, tipo)
+    except (ValueError, AttributeError) as e:
+        return HttpResponseBadRequest(str(e) or 'Body must be JSON: {"geometry": {...}} or {"bbox": [...]}')
+
+    response = JsonResponse(result)
+    response['X-Cache'] = 'HIT' if hit else 'MISS'
+    return response
+
+
+def features(request, dataset, fmt):
+    if dataset not in geojson_features.DATASETS or fmt not in ('geojson', 'topojson'):
+        raise Http404('Unknown dataset')
+    try:
+        precision = parse_precision(request, geojson_features.DEFAULT_PRECISION)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    try:
+        quantization = int(float(request.GET.get('quantization', topojson_builder.DEFAULT_QUANTIZATION)))
+        zoom = int(request.GET['zoom']) if request.GET.get('zoom') else None
+        bbox = [float(v) for v in request.GET['bbox'].split(',')] if request.GET.get('bbox') else None
+    except (ValueError, OverflowError):
+        # OverflowError: int(float('inf'))
+        return HttpResponseBadRequest('quantization and zoom must be numbers, bbox xmin,ymin,xmax,ymax')
+    if not topojson_builder.MIN_QUANTIZATION <= quantization <= topojson_builder.MAX_QUANTIZATION:
+        return HttpResponseBadRequest(f'quantization must be between {topojson_builder.MIN_QUANTIZATION} '
+                                      f'and {topojson_builder.MAX_QUANTIZATION}')
+    if bbox is not None and (len(bbox) != 4 or not all(map(math.isfinite, bbox))):
+        return HttpResponseBadRequest('bbox must be xmin,ymin,xmax,ymax')
+
+    level = 0
+    if zoom is not None or bbox is not None:
+        level = simplification_level(zoom=zoom, bbox=bbox)
+    codigos = [c.strip() for c in request.GET.get('codigos', '').split(',') if c.strip()]
+    tipo = request.GET.get('tipo') or None
+
+    if fmt == 'topojson':
+        data, hit = geojson_features.topojson_collection(dataset, codigos, tipo, quantization, level, bbox)
+        response = HttpResponse(data, content_type=geojson_features.TOPOJSON_CONTENT_TYPE)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+    else:
+        response = StreamingHttpResponse(
+            geojson_features.iter_features(dataset, codigos, tipo, precision, level, bbox),
+            content_type=geojson_features.CONTENT_TYPE,
+        )
+        response['X-Accel-Buffering'] = 'no'
+    response['X-Simplification-Level'] = str(level)
+    return response
+
+
+urlpatterns = [
+    path('tiles/stats', tile_stats, name='gis-tile-stats'),
+    path('tiles/<str:layer>/<int:z>/<int:x>/<int:y>.mvt', tile, name='gis-tile'),
+    path('export/jobs', export_job_create, name='gis-export-job-create'),
+    path('export/jobs/<int:job_id>', export_job_status, name='gis-export-job'),
+    path('export/<str:dataset>.<str:fmt>', export, name='gis-export'),
+    path('features/<str:dataset>.<str:fmt>', features, name='gis-features'),
+    path('search/municipios', search_municipios, name='gis-search-municipios'),
+    path('autocomplete', autocomplete_view, name='gis-autocomplete'),
+    path('areas/aggregate', areas_aggregate, name='gis-areas-aggregate'),
+    path('areas/<str:nivel>/stats', areas_stats, name='gis-areas-stats'),
+    path('areas/<str:nivel>/<str:codigo>/stats', area_stats, name='gis-area-stats'),
+    path('areas/<str:codigo>/extent', area_extent, name='gis-area-extent'),
+    path('identify', identify, name='gis-identify'),
+    path('metrics', prometheus_metrics, name='gis-metrics'),
+]
@@ -0,0 +1,86 @@
+-- ============================================================================
+-- Click-to-identify: Point-in-Polygon Reverse Lookup
+-- Visor I2D Humboldt Project
+-- PostgreSQL 16 + PostGIS 3.4
+-- ============================================================================
+-- capas_base.identify(lon, lat) returns the department, municipality and
+-- CAR(s) containing a point together with their GBIF statistics from
+-- gbif_consultas.area_summary (area_summary.sql), in one query. Each branch
+-- is a GIST lookup (idx_*_geom from optimize_database.sql) followed by an
+-- exact ST_Intersects on the few candidates, replacing one GeoServer
+-- GetFeatureInfo request per WMS layer.
+--
+-- capas_base.cars has no fixed schema here, so its attributes are returned
+-- as jsonb built from the table's non-geometry columns, listed explicitly
+-- when the function is installed: the CAR polygons are never serialized.
+-- Re-run this script after the columns of capas_base.cars change.
+--
+-- Used by GET /api/identify?lon=&lat= (scripts/gis_api.py)
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < identify.sql
+
+\echo '========================================='
+\echo 'Installing identify function'
+\echo '========================================='
+
+-- Statistics of one area as {"<tipo>": {"registers": ..., ...}}
+CREATE OR REPLACE FUNCTION gbif_consultas.area_stats_json(p_nivel text, p_codigo text)
+RETURNS jsonb AS $$
+    SELECT jsonb_object_agg(tipo, jsonb_build_object(
+               'registers', registers, 'species', species, 'exoticas', exoticas,
+               'endemicas', endemicas, 'amenazadas', amenazadas))
+    FROM gbif_consultas.area_summary
+    WHERE nivel = p_nivel AND codigo = p_codigo;
+$$ LANGUAGE sql STABLE;
+
+DO $install$
+DECLARE
+    car_attributes text;
+BEGIN
+    -- jsonb_build_object('col', c.col, ...) per 50 columns (100 arguments max per call)
+    SELECT string_agg(chunk, ' || ' ORDER BY part)
+    INTO car_attributes
+    FROM (
+        SELECT part, 'jsonb_build_object('
+                     || string_agg(format('%L, c.%I', attname, attname), ', ' ORDER BY attnum) || ')' AS chunk
+        FROM (
+            SELECT attname, attnum, (row_number() OVER (ORDER BY attnum) - 1) / 50 AS part
+            FROM pg_attribute
+            WHERE attrelid = 'capas_base.cars'::regclass
+              AND attnum > 0
+              AND NOT attisdropped
+              AND atttypid NOT IN (SELECT oid FROM pg_type WHERE typname IN ('geometry', 'geography'))
+        ) columns
+        GROUP BY part
+    ) chunks;
+
+    EXECUTE format($fn$
+CREATE OR REPLACE FUNCTION capas_base.identify(lon double precision, lat double precision)
+RETURNS TABLE (unidad text, codigo text, nombre text, atributos jsonb, stats jsonb) AS $$
+    WITH pt AS (SELECT ST_SetSRID(ST_MakePoint(lon, lat), 4326) AS g)
+    SELECT 'departamento', d.codigo::text, d.nombre::text, NULL::jsonb,
+           gbif_consultas.area_stats_json('dpto', d.codigo)
+    FROM capas_base.dpto_politico d, pt
+    WHERE ST_Intersects(d.geom, pt.g)
+    UNION ALL
+    SELECT 'municipio', m.codigo::text, m.nombre::text,
+           jsonb_build_object('dpto_nombre', m.dpto_nombre),
+           gbif_consultas.area_stats_json('mpio', m.codigo)
+    FROM capas_base.mpio_politico m, pt
+    WHERE ST_Intersects(m.geom, pt.g)
+    UNION ALL
+    SELECT 'car', a ->> 'codigo', COALESCE(a ->> 'nombre', a ->> 'car'), a, NULL
+    FROM (
+        SELECT %s AS a
+        FROM capas_base.cars c, pt
+        WHERE ST_Intersects(c.geom, pt.g)
+    ) cars;
+$$ LANGUAGE sql STABLE;
+$fn$, COALESCE(car_attributes, $e$'{}'::jsonb$e$));
+END
+$install$;
+
+\echo '✓ Identify function installed'
+\echo ''
+\echo 'Test with (Medellín):'
+\echo '  EXPLAIN ANALYZE SELECT * FROM capas_base.identify(-75.5636, 6.2518);'
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Bulk, transactional importer for project group/layer structures
+
+Takes a declarative structure (the same nested `subgroups`/`layers` dict shape
+used by create_ecoreservas_layers.py), diffs it against the database with a
+constant number of queries, and applies the changes with bulk_create /
+bulk_update inside a single transaction.
+
+Structure file (JSON, or YAML when PyYAML is installed):
+
+    {
+      "project": {"nombre_corto": "ecoreservas", "nombre": "Ecoreservas", ...},
+      "structure": {
+        "Group name": {
+          "orden": 0,
+          "color": "bg-warning",            # optional
+          "layers": [{"nombre_geoserver": "...", "nombre_display": "...",
+                      "store_geoserver": "...", "estado_inicial": false,
+                      "metadata_id": null, "orden": 0}],
+          "subgroups": {"Subgroup name": {...}}
+        }
+      }
+    }
+
+Groups are identified by their name path from the root and layers by
+(group path, nombre_geoserver). Only the attributes present in the file are
+compared, so columns maintained elsewhere (e.g. colors set by
+update_ecoreservas_colors.sql) are left untouched.
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/import_project_structure.py structure.json [--dry-run] [--prune]
+
+    --dry-run   print the diff without writing anything
+    --prune     also delete groups/layers of the project missing from the file
+    --no-update only create missing rows, never modify existing ones
+"""
+import argparse
+import json
+import sys
+import time
+
+GROUP_FIELDS = ('orden', 'fold_state', 'color')
+LAYER_FIELDS = ('nombre_display', 'store_geoserver', 'estado_inicial', 'metadata_id', 'orden')
+GROUP_DEFAULTS = {'orden': 0, 'fold_state': 'close'}
+LAYER_DEFAULTS = {'estado_inicial': False, 'metadata_id': None, 'orden': 0}
+
+
+class StructureDiff:
+    """Changes needed to bring a project in line with a structure"""
+
+    def __init__(self):
+        self.groups_to_create = []   # (path, fields)
+        self.groups_to_update = []   # (group, {field: (old, new)})
+        self.groups_to_delete = []   # (path, group)
+        self.layers_to_create = []   # (group path, fields)
+        self.layers_to_update = []   # (group path, layer, {field: (old, new)})
+        self.layers_to_delete = []   # (group path, layer)
+
+    @property
+    def is_empty(self):
+        return not any((self.groups_to_create, self.groups_to_update, self.groups_to_delete,
+                        self.layers_to_create, self.layers_to_update, self.layers_to_delete))
+
+    def summary(self):
+        return (f'groups +{len(self.groups_to_create)} ~{len(self.groups_to_update)} '
+                f'-{len(self.groups_to_delete)} | layers +{len(self.layers_to_create)} '
+                f'~{len(self.layers_to_update)} -{len(self.layers_to_delete)}')
+
+    def lines(self):
+        """Human readable diff, one change per line"""
+        for path, _ in self.groups_to_create:
+            yield f'+ group  {" / ".join(path)}'
+        for group, changes in self.groups_to_update:
+            yield f'~ group  {group.nombre} ({format_changes(changes)})'
+        for path, _ in self.groups_to_delete:
+            yield f'- group  {" / ".join(path)}'
+        for path, fields in self.layers_to_create:
+            yield f'+ layer  {" / ".join(path)} :: {fields["nombre_geoserver"]}'
+        for path, layer, changes in self.layers_to_update:
+            yield f'~ layer  {" / ".join(path)} :: {layer.nombre_geoserver} ({format_changes(changes)})'
+        for path, layer in self.layers_to_delete:
+            yield f'- layer  {" / ".join(path)} :: {layer.nombre_geoserver}'
+
+
+def format_changes(changes):
+    return ', '.join(f'{field}: {old!r} → {new!r}' for field, (old, new) in changes.items())
+
+
+def load_structure_file(path):
+    """Read a JSON or YAML structure file"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yml', '.yaml')):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def flatten_structure(structure, parent_path=()):
+    """Yield (path, config) for every group, parents before children"""
+    for name, config in structure.items():
+        path = parent_path + (name,)
+        yield path, config
+        yield from flatten_structure(config.get('subgroups') or {}, path)
+
+
+def group_paths(groups):
+    """Map name path -> LayerGroup for the groups of a project"""
+    by_id = {group.id: group for group in groups}
+    paths = {}
+
+    def path_of(group):
+        parts = []
+        seen = set()
+        while group is not None and group.id not in seen:
+            seen.add(group.id)
+            parts.append(group.nombre)
+            group = by_id.get(group.parent_group_id)
+        return tuple(reversed(parts))
+
+    for group in groups:
+        paths.setdefault(path_of(group), group)
+    return paths
+
+
+def changed_fields(obj, spec, fields):
+    changes = {}
+    for field in fields:
+        if field in spec and getattr(obj, field) != spec[field]:
+            changes[field] = (getattr(obj, field), spec[field])
+    return changes
+
+
+def diff_structure(project, structure, prune=False, update=True):
+    """
+    Compare a structure with the database (two queries for an existing project).
+    With update=False existing rows are never modified (get_or_create semantics).
+    """
+    from applications.projects.models import LayerGroup, Layer
+
+    diff = StructureDiff()
+    existing_groups = {}
+    existing_layers = {}
+    if project is not None and project.pk is not None:
+        existing_groups = group_paths(list(LayerGroup.objects.filter(proyecto=project)))
+        path_by_group = {group.id: path for path, group in existing_groups.items()}
+        for layer in Layer.objects.filter(grupo__proyecto=project):
+            path = path_by_group.get(layer.grupo_id)
+            if path is not None:
+                existing_layers.setdefault((path, layer.nombre_geoserver), layer)
+
+    wanted_groups = set()
+    wanted_layers = set()
+    for path, config in flatten_structure(structure):
+        wanted_groups.add(path)
+        group = existing_groups.get(path)
+        if group is None:
+            fields = dict(GROUP_DEFAULTS)
+            fields.update({f: config[f] for f in GROUP_FIELDS if f in config})
+            diff.groups_to_create.append((path, fields))
+        elif update:
+            changes = changed_fields(group, config, GROUP_FIELDS)
+            if changes:
+                diff.groups_to_update.append((group, changes))
+
+        for layer_config in config.get('layers') or []:
+            key = (path, layer_config['nombre_geoserver'])
+            wanted_layers.add(key)
+            layer = existing_layers.get(key)
+            if layer is None:
+                fields = dict(LAYER_DEFAULTS)
+                fields.update(layer_config)
+                diff.layers_to_create.append((path, fields))
+            elif update:
+                changes = changed_fields(layer, layer_config, LAYER_FIELDS)
+                if changes:
+                    diff.layers_to_update.append((path, layer, changes))
+
+    if prune:
+        for path, group in existing_groups.items():
+            if path not in wanted_groups:
+                diff.groups_to_delete.append((path, group))
+        for (path, _), layer in existing_layers.items():
+            if path in wanted_groups and (path, layer.nombre_geoserver) not in wanted_layers:
+                diff.layers_to_delete.append((path, layer))
+
+    return diff, existing_groups
+
+
+def apply_diff(project, diff, existing_groups):
+    """Write a diff with bulk operations in one transaction"""
+    from django.db import transaction
+    from django.utils import timezone
+    from applications.projects.models import LayerGroup, Layer
+    from project_cache import bump_project_version
+
+    now = timezone.now()
+    groups_by_path = dict(existing_groups)
+
+    with transaction.atomic():
+        # Parents must exist before children: one INSERT per nesting level
+        levels = {}
+        for path, fields in diff.groups_to_create:
+            levels.setdefault(len(path), []).append((path, fields))
+        for depth in sorted(levels):
+            objs = [
+                LayerGroup(proyecto=project, nombre=path[-1],
+                           parent_group=groups_by_path.get(path[:-1]), **fields)
+                for path, fields in levels[depth]
+            ]
+            for (path, _), group in zip(levels[depth], LayerGroup.objects.bulk_create(objs)):
+                groups_by_path[path] = group
+
+        if diff.groups_to_update:
+            fields = set()
+            for group, changes in diff.groups_to_update:
+                for field, (_, new) in changes.items():
+                    setattr(group, field, new)
+                    fields.add(field)
+                group.updated_at = now
+            LayerGroup.objects.bulk_update([g for g, _ in diff.groups_to_update],
+                                           sorted(fields) + ['updated_at'])
+
+        if diff.layers_to_create:
+            Layer.objects.bulk_create([
+                Layer(grupo=groups_by_path[path], **fields)
+                for path, fields in diff.layers_to_create
+            ])
+
+        if diff.layers_to_update:
+            fields = set()
+            for _, layer, changes in diff.layers_to_update:
+                for field, (_, new) in changes.items():
+                    setattr(layer, field, new)
+                    fields.add(field)
+                layer.updated_at = now
+            Layer.objects.bulk_update([l for _, l, _ in diff.layers_to_update],
+                                      sorted(fields) + ['updated_at'])
+
+        if diff.layers_to_delete:
+            Layer.objects.filter(id__in=[l.id for _, l in diff.layers_to_delete]).delete()
+        if diff.groups_to_delete:
+            LayerGroup.objects.filter(id__in=[g.id for _, g in diff.groups_to_delete]).delete()
+
+        # bulk operations skip post_save, so invalidate cached responses here
+        transaction.on_commit(lambda: bump_project_version(project.id))
+
+
+def import_structure(project_data, structure, dry_run=False, prune=False, update=True, verbose=True):
+    """Bring a project in line with a structure; returns the StructureDiff"""
+    from django.db import transaction
+    from applications.projects.models import Project
+
+    nombre_corto = project_data['nombre_corto']
+    defaults = {k: v for k, v in project_data.items() if k != 'nombre_corto'}
+
+    with transaction.atomic():
+        if dry_run:
+            project = Project.objects.filter(nombre_corto=nombre_corto).first()
+        else:
+            project, created = Project.objects.get_or_create(nombre_corto=nombre_corto, defaults=defaults)
+            if created and verbose:
+                print(f'Created project: {project}')
+
+        diff, existing_groups = diff_structure(project, structure, prune=prune, update=update)
+        if verbose:
+            for line in diff.lines():
+                print(line)
+        if not dry_run and not diff.is_empty:
+            apply_diff(project, diff, existing_groups)
+
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import a project group/layer structure in bulk')
+    parser.add_argument('structure_file', help='JSON or YAML structure file')
+    parser.add_argument('--dry-run', action='store_true', help='only print the diff')
+    parser.add_argument('--prune', action='store_true', help='delete groups/layers missing from the file')
+    parser.add_argument('--no-update', action='store_true', help='only create missing rows, never modify existing ones')
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    data = load_structure_file(args.structure_file)
+    start_time = time.time()
+    diff = import_structure(data['project'], data['structure'], dry_run=args.dry_run,
+                            prune=args.prune, update=not args.no_update)
+    duration = time.time() - start_time
+
+    mode = 'Dry run' if args.dry_run else 'Imported'
+    print(f'\n✅ {mode} {data["project"]["nombre_corto"]}: {diff.summary()} ({duration:.3f}s)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
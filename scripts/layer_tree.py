@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Layer tree assembler for GET /api/projects/{id}/layer-groups/
+
+The recursive LayerGroupSerializer issues one query per group (subgroups and
+layers of every node). This module loads the whole tree of a project with two
+flat queries and assembles the nested structure in memory, keyed on
+parent_group_id, producing the same payload as the serializer.
+
+Usage from the backend view:
+
+    from layer_tree import fetch_layer_tree
+    return Response(fetch_layer_tree(project.id))
+
+Usage as a script (prints the tree as JSON):
+
+    python ../scripts/layer_tree.py <project_id>
+"""
+import json
+import sys
+
+# Field order must match LayerGroupSerializer / LayerSerializer so the rendered
+# JSON stays byte-identical
+GROUP_FIELDS = ('id', 'nombre', 'orden', 'fold_state', 'parent_group', 'color')
+LAYER_FIELDS = ('id', 'nombre_display', 'nombre_geoserver', 'store_geoserver',
+                'estado_inicial', 'metadata_id', 'orden')
+
+
+def build_layer_tree(groups, layers):
+    """
+    Assemble flat group and layer rows into the nested serializer structure.
+
+    groups: iterable of dicts with GROUP_FIELDS, already sorted by (orden, id)
+    layers: iterable of dicts with LAYER_FIELDS plus 'grupo', same ordering
+    Returns the list of root groups (parent_group is None or outside the project).
+    """
+    nodes = {}
+    for group in groups:
+        node = {field: group[field] for field in GROUP_FIELDS}
+        node['layers'] = []
+        node['subgroups'] = []
+        nodes[group['id']] = node
+
+    for layer in layers:
+        parent = nodes.get(layer['grupo'])
+        if parent is not None:
+            parent['layers'].append({field: layer[field] for field in LAYER_FIELDS})
+
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_group'])
+        if parent is None:
+            roots.append(node)
+        else:
+            parent['subgroups'].append(node)
+
+    return roots
+
+
+def fetch_layer_tree(project_id):
+    """Load the complete group/layer tree of a project in two queries"""
+    from applications.projects.models import LayerGroup, Layer
+
+    groups = (
+        LayerGroup.objects
+        .filter(proyecto_id=project_id)
+        .order_by('orden', 'id')
+        .values(*GROUP_FIELDS)
+    )
+    layers = (
+        Layer.objects
+        .filter(grupo__proyecto_id=project_id)
+        .order_by('orden', 'id')
+        .values('grupo', *LAYER_FIELDS)
+    )
+    return build_layer_tree(groups, layers)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print('Usage: python layer_tree.py <project_id>')
+        return 1
+
+    from django_env import setup_django
+    setup_django()
+
+    from django.db import connection, reset_queries
+    from django.conf import settings
+    settings.DEBUG = True
+    reset_queries()
+
+    tree = fetch_layer_tree(int(sys.argv[1]))
+    print(json.dumps(tree, ensure_ascii=False, indent=2))
+    print(f'\n✅ Tree loaded with {len(connection.queries)} queries', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics: request latency per route group, DB connections, cache
+hit ratios and export queue depth
+
+    GET /api/metrics    Prometheus text format (nginx only allows visor_network)
+
+Request metrics are recorded by MetricsMiddleware in every Gunicorn worker.
+With PROMETHEUS_MULTIPROC_DIR set (docker-compose.yml) prometheus_client
+writes them to per-process files and the scrape aggregates all workers, so
+it doesn't matter which worker answers /api/metrics. Everything else is read
+at scrape time from shared state (PostgreSQL, Redis), so there are no live
+per-process gauges and no Gunicorn child_exit hook is needed.
+
+    visor_http_request_duration_seconds{route,method,status}  histogram
+    visor_cache_requests_total{route,result}                   X-Cache HIT/MISS by route
+    visor_tile_cache_requests_total{result}                    tile_cache.py counters (all workers)
+    visor_tile_cache_bytes, visor_tile_cache_entries
+    visor_db_connections{state}, visor_db_max_connections      pg_stat_activity of this database
+    visor_export_jobs{status}, visor_export_queue_length       geovisor.export_jobs / Redis queue
+
+Routes are grouped (projects, layer_groups, search, stats, export, tiles,
+features, other) to keep label cardinality bounded. Streaming responses are
+timed until the view returns, not until the last byte is sent.
+
+Backend integration (i2dbackend/settings), first in MIDDLEWARE so cached
+responses are timed too; needs `pip install prometheus_client`:
+
+    MIDDLEWARE.insert(0, 'metrics.MetricsMiddleware')
+
+Example alerts:
+
+    histogram_quantile(0.99, sum by (route, le) (rate(visor_http_request_duration_seconds_bucket[5m])))
+    sum by (route) (rate(visor_cache_requests_total{result="hit"}[5m]))
+      / sum by (route) (rate(visor_cache_requests_total[5m]))
+"""
+import logging
+import os
+import re
+import time
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# First match wins; paths as seen by Django (nginx passes /api/ through)
+ROUTE_GROUPS = (
+    ('layer_groups', re.compile(r'^/api/projects/[^/]+/layer-groups/')),
+    ('projects', re.compile(r'^/api/projects/')),
+    ('search', re.compile(r'^/api/(search|autocomplete)')),
+    ('stats', re.compile(r'^/api/(areas|identify)')),
+    ('export', re.compile(r'^/api/export/')),
+    ('tiles', re.compile(r'^/api/tiles/')),
+    ('features', re.compile(r'^/api/features/')),
+    ('metrics', re.compile(r'^/api/metrics$')),
+)
+
+logger = logging.getLogger(__name__)
+
+
+def available():
+    return prometheus_client is not None
+
+
+def route_group(path):
+    for name, pattern in ROUTE_GROUPS:
+        if pattern.match(path):
+            return name
+    return 'other'
+
+
+def status_class(status_code):
+    return f'{status_code // 100}xx'
+
+
+if prometheus_client is not None:
+    REQUEST_DURATION = prometheus_client.Histogram(
+        'visor_http_request_duration_seconds', 'Request latency by route group',
+        ['route', 'method', 'status'], buckets=LATENCY_BUCKETS)
+    CACHE_REQUESTS = prometheus_client.Counter(
+        'visor_cache_requests', 'Responses carrying X-Cache, by route group and outcome',
+        ['route', 'result'])
+
+
+class MetricsMiddleware:
+    """Record the latency and cache outcome of every request"""
+
+    def __init__(self, get_response):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        if not available():
+            raise MiddlewareNotUsed('prometheus_client is not installed')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        route = route_group(request.path)
+        REQUEST_DURATION.labels(route, request.method, status_class(response.status_code)).observe(
+            time.perf_counter() - started)
+        cache = response.get('X-Cache')
+        if cache:
+            CACHE_REQUESTS.labels(route, cache.lower()).inc()
+        return response
+
+
+def _query(sql):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return cursor.fetchall()
+
+
+def _db_metrics():
+    connections = GaugeMetricFamily('visor_db_connections', 'Connections to this database by state',
+                                    labels=['state'])
+    for state, count in _query('''
+        SELECT coalesce(state, 'unknown'), count(*)
+        FROM pg_stat_activity
+        WHERE datname = current_database()
+        GROUP BY 1
+    '''):
+        connections.add_metric([state], count)
+    yield connections
+    yield GaugeMetricFamily('visor_db_max_connections', 'PostgreSQL max_connections',
+                            value=int(_query('SHOW max_connections')[0][0]))
+
+
+def _export_metrics():
+    import export_jobs
+
+    jobs = GaugeMetricFamily('visor_export_jobs', 'Export jobs by status', labels=['status'])
+    for status, count in _query('SELECT status, count(*) FROM geovisor.export_jobs GROUP BY status'):
+        jobs.add_metric([status], count)
+    yield jobs
+
+    client = export_jobs.redis_client()
+    if client is not None:
+        yield GaugeMetricFamily('visor_export_queue_length', f'Length of the {export_jobs.REDIS_QUEUE} Redis list',
+                                value=client.llen(export_jobs.REDIS_QUEUE))
+
+
+def _tile_cache_metrics():
+    import tile_cache
+
+    stats = tile_cache.cache_stats()
+    requests = CounterMetricFamily('visor_tile_cache_requests', 'Tile cache lookups (all workers)',
+                                   labels=['result'])
+    requests.add_metric(['hit'], stats['hits'])
+    requests.add_metric(['miss'], stats['misses'])
+    yield requests
+    yield GaugeMetricFamily('visor_tile_cache_bytes', 'Bytes stored in the tile cache', value=stats['bytes'])
+    yield GaugeMetricFamily('visor_tile_cache_entries', 'Tiles stored in the tile cache', value=stats['entries'])
+
+
+class StateCollector:
+    """Metrics read from shared state at scrape time; a failing source is skipped, not fatal"""
+
+    SOURCES = (_db_metrics, _export_metrics, _tile_cache_metrics)
+
+    def collect(self):
+        for source in self.SOURCES:
+            try:
+                yield from list(source())
+            except Exception:
+                logger.exception('Metrics source %s failed', source.__name__)
+
+
+def registry():
+    """Registry for one scrape: all workers' files in multiprocess mode, this process otherwise"""
+    result = prometheus_client.CollectorRegistry()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.MultiProcessCollector(result)
+    else:
+        result.register(prometheus_client.REGISTRY)
+    result.register(StateCollector())
+    return result
+
+
+def render():
+    """(body, content type) of a scrape"""
+    return prometheus_client.generate_latest(registry()), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,122 @@
+-- ============================================================================
+-- Municipality Search (accent-insensitive, typo-tolerant)
+-- Visor I2D Humboldt Project
+-- PostgreSQL 16 + PostGIS 3.4
+-- ============================================================================
+-- Replaces the to_tsvector('spanish', ...) indexes for search-as-you-type:
+-- full-text stemming does not match partial words ("medel") and regressed on
+-- this small table (docs/dev/commit_info.md). pg_trgm GIN indexes on the
+-- lower-cased unaccented columns answer both prefix (LIKE 'q%') and similarity
+-- (%) matches.
+--
+-- capas_base.search_municipios('medelin')              -> typo tolerant
+-- capas_base.search_municipios('san jose, caldas')     -> "municipio, departamento"
+--
+-- Used by GET /api/search/municipios?q= (scripts/gis_api.py)
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < municipality_search.sql
+-- (CREATE EXTENSION may need to run as the postgres superuser)
+
+\echo '========================================='
+\echo 'Installing municipality search'
+\echo '========================================='
+
+-- ============================================================================
+-- 1. EXTENSIONS
+-- ============================================================================
+\echo '1. Enabling pg_trgm and unaccent...'
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+\echo '✓ Extensions enabled'
+\echo ''
+
+-- ============================================================================
+-- 2. UNACCENTED COLUMNS
+-- ============================================================================
+\echo '2. Filling and maintaining unaccented columns...'
+
+UPDATE capas_base.mpio_politico
+SET nombre_unaccented = unaccent(nombre),
+    dpto_nombre_unaccented = unaccent(dpto_nombre)
+WHERE nombre_unaccented IS DISTINCT FROM unaccent(nombre)
+   OR dpto_nombre_unaccented IS DISTINCT FROM unaccent(dpto_nombre);
+
+CREATE OR REPLACE FUNCTION capas_base.set_mpio_unaccented() RETURNS trigger AS $$
+BEGIN
+    NEW.nombre_unaccented := unaccent(NEW.nombre);
+    NEW.dpto_nombre_unaccented := unaccent(NEW.dpto_nombre);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_mpio_politico_unaccented ON capas_base.mpio_politico;
+CREATE TRIGGER trg_mpio_politico_unaccented
+    BEFORE INSERT OR UPDATE OF nombre, dpto_nombre ON capas_base.mpio_politico
+    FOR EACH ROW EXECUTE FUNCTION capas_base.set_mpio_unaccented();
+
+\echo '✓ Unaccented columns up to date'
+\echo ''
+
+-- ============================================================================
+-- 3. TRIGRAM INDEXES
+-- ============================================================================
+\echo '3. Creating trigram GIN indexes...'
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_mpio_politico_nombre_trgm
+  ON capas_base.mpio_politico USING gin (lower(nombre_unaccented) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_mpio_politico_dpto_nombre_trgm
+  ON capas_base.mpio_politico USING gin (lower(dpto_nombre_unaccented) gin_trgm_ops);
+
+ANALYZE capas_base.mpio_politico;
+
+\echo '✓ Trigram indexes created'
+\echo ''
+
+-- ============================================================================
+-- 4. SEARCH FUNCTION
+-- ============================================================================
+-- Ranking: exact name (3) > name prefix (2) > similarity only, plus the
+-- trigram similarity of the name and, after a comma, of the department.
+\echo '4. Creating capas_base.search_municipios()...'
+
+CREATE OR REPLACE FUNCTION capas_base.search_municipios(q text, max_results integer DEFAULT 10)
+RETURNS TABLE (codigo varchar, nombre varchar, dpto_nombre varchar, score real) AS $$
+DECLARE
+    municipio text := lower(unaccent(trim(split_part(q, ',', 1))));
+    departamento text := lower(unaccent(trim(split_part(q, ',', 2))));
+    municipio_prefix text;
+    departamento_prefix text;
+BEGIN
+    IF municipio = '' THEN
+        RETURN;
+    END IF;
+    municipio_prefix := replace(replace(replace(municipio, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+    departamento_prefix := replace(replace(replace(departamento, '\', '\\'), '%', '\%'), '_', '\_') || '%';
+
+    RETURN QUERY
+    SELECT m.codigo, m.nombre, m.dpto_nombre,
+           (CASE WHEN lower(m.nombre_unaccented) = municipio THEN 3
+                 WHEN lower(m.nombre_unaccented) LIKE municipio_prefix THEN 2
+                 ELSE 0 END
+            + similarity(lower(m.nombre_unaccented), municipio)
+            + CASE WHEN departamento <> '' THEN similarity(lower(m.dpto_nombre_unaccented), departamento)
+                   ELSE 0 END)::real AS score
+    FROM capas_base.mpio_politico m
+    WHERE (lower(m.nombre_unaccented) LIKE municipio_prefix OR lower(m.nombre_unaccented) % municipio)
+      AND (departamento = ''
+           OR lower(m.dpto_nombre_unaccented) LIKE departamento_prefix
+           OR lower(m.dpto_nombre_unaccented) % departamento)
+    ORDER BY 4 DESC, m.nombre
+    LIMIT max_results;
+END;
+$$ LANGUAGE plpgsql STABLE
+SET pg_trgm.similarity_threshold = 0.3;
+
+\echo '✓ Search function created'
+\echo ''
+\echo 'Test with:'
+\echo '  EXPLAIN ANALYZE SELECT * FROM capas_base.search_municipios(''medelin'');'
+\echo '  SELECT * FROM capas_base.search_municipios(''san jose, caldas'');'
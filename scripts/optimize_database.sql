@@ -209,6 +209,7 @@ ORDER BY schemaname, tablename, indexname;
 
 \echo ''
 \echo 'Index usage statistics:'
+-- Indexes missing or unused under real traffic: python scripts/slow_queries.py indexes
 SELECT 
     schemaname,
     tablename,
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Versioned response cache for the project configuration endpoints
+
+    GET /api/projects/by-name/{nombre_corto}/
+    GET /api/projects/{id}/layer-groups/
+
+Responses are cached under a per-project version counter. Any post_save /
+post_delete of Project, LayerGroup or Layer bumps the counter, and bulk loaders
+call bump_project_version() explicitly, so stale entries are never served.
+Every cached response carries a strong ETag; requests with a matching
+If-None-Match get a 304 without touching the database.
+
+Backend integration (i2dbackend/settings):
+
+    from project_cache import cache_settings
+    CACHES = cache_settings()
+    MIDDLEWARE += ['project_cache.ProjectConfigCacheMiddleware']
+
+and in ProjectsConfig.ready():
+
+    from project_cache import connect_signals
+    connect_signals()
+
+Redis is used when REDIS_URL is set and reachable (see the redis service in
+docker-compose.yml); otherwise a local-memory cache is used. Local memory is per
+Gunicorn worker, so signal bumps only reach the worker that handled the edit;
+entries get a short timeout in that mode to bound staleness.
+
+Usage as a script (bump the version of one project or all of them):
+
+    python ../scripts/project_cache.py [nombre_corto]
+"""
+import hashlib
+import os
+import re
+import sys
+
+CACHE_ALIAS = 'default'
+KEY_PREFIX = 'visor'
+
+REDIS_TIMEOUT = 60 * 60 * 24
+LOCMEM_TIMEOUT = 30
+
+PROJECT_URL_PATTERNS = [
+    re.compile(r'^/api/projects/(?P<project_id>\d+)/layer-groups/$'),
+    re.compile(r'^/api/projects/by-name/(?P<nombre_corto>[^/]+)/$'),
+]
+
+
+def redis_available(url):
+    """Return True if a Redis server answers at url"""
+    try:
+        import redis
+        return redis.Redis.from_url(url, socket_connect_timeout=0.5).ping()
+    except Exception:
+        return False
+
+
+def cache_settings(redis_url=None):
+    """CACHES setting: Redis when reachable, local memory otherwise"""
+    redis_url = redis_url or os.getenv('REDIS_URL')
+    if redis_url and redis_available(redis_url):
+        return {
+            CACHE_ALIAS: {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'LOCATION': redis_url,
+                'TIMEOUT': REDIS_TIMEOUT,
+                'KEY_PREFIX': KEY_PREFIX,
+            }
+        }
+    return {
+        CACHE_ALIAS: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'visor-project-config',
+            'TIMEOUT': LOCMEM_TIMEOUT,
+            'KEY_PREFIX': KEY_PREFIX,
+        }
+    }
+
+
+def get_cache():
+    from django.core.cache import caches
+    return caches[CACHE_ALIAS]
+
+
+def version_key(project_id):
+    return f'project:{project_id}:version'
+
+
+def get_project_version(project_id):
+    """Current version counter of a project (created on first use)"""
+    cache = get_cache()
+    key = version_key(project_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_project_version(project_id):
+    """Invalidate every cached response of a project"""
+    cache = get_cache()
+    key = version_key(project_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Counter evicted or never created: start over above any old value
+        cache.set(key, 2, timeout=None)
+        return 2
+
+
+def project_id_for_name(nombre_corto):
+    """Resolve nombre_corto to a project id, cached until the project changes"""
+    from applications.projects.models import Project
+
+    cache = get_cache()
+    key = f'project-id:{nombre_corto}'
+    project_id = cache.get(key)
+    if project_id is None:
+        project_id = (
+            Project.objects.filter(nombre_corto=nombre_corto)
+            .values_list('id', flat=True).first()
+        )
+        if project_id is not None:
+            cache.set(key, project_id)
+    return project_id
+
+
+def project_id_for_instance(instance):
+    """Project id affected by a Project, LayerGroup or Layer instance"""
+    from applications.projects.models import Project, LayerGroup, Layer
+
+    if isinstance(instance, Project):
+        return instance.id
+    if isinstance(instance, LayerGroup):
+        return instance.proyecto_id
+    if isinstance(instance, Layer):
+        return (
+            LayerGroup.objects.filter(id=instance.grupo_id)
+            .values_list('proyecto_id', flat=True).first()
+        )
+    return None
+
+
+def invalidate_project(sender, instance, **kwargs):
+    """post_save / post_delete receiver"""
+    from applications.projects.models import Project
+
+    if isinstance(instance, Project):
+        get_cache().delete(f'project-id:{instance.nombre_corto}')
+    project_id = project_id_for_instance(instance)
+    if project_id is not None:
+        bump_project_version(project_id)
+
+
+def connect_signals():
+    """Register cache invalidation on Project, LayerGroup and Layer changes"""
+    from django.db.models.signals import post_save, post_delete
+    from applications.projects.models import Project, LayerGroup, Layer
+
+    for model in (Project, LayerGroup, Layer):
+        post_save.connect(invalidate_project, sender=model,
+                          dispatch_uid=f'project_cache_save_{model.__name__}')
+        post_delete.connect(invalidate_project, sender=model,
+                            dispatch_uid=f'project_cache_delete_{model.__name__}')
+
+
+def make_etag(content):
+    return '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in [tag.strip() for tag in header.split(',')] or header.strip() == '*'
+
+
+class ProjectConfigCacheMiddleware:
+    """Serve the project configuration endpoints from the versioned cache"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def resolve_project(self, path):
+        for pattern in PROJECT_URL_PATTERNS:
+            match = pattern.match(path)
+            if match:
+                params = match.groupdict()
+                if 'project_id' in params:
+                    return int(params['project_id'])
+                return project_id_for_name(params['nombre_corto'])
+        return None
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+
+        project_id = self.resolve_project(request.path)
+        if project_id is None:
+            return self.get_response(request)
+
+        from django.http import HttpResponse, HttpResponseNotModified
+
+        cache = get_cache()
+        version = get_project_version(project_id)
+        key = f'response:{request.get_full_path()}:v{version}'
+
+        cached = cache.get(key)
+        if cached is None:
+            response = self.get_response(request)
+            if response.status_code != 200 or response.streaming:
+                return response
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            cached = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': make_etag(response.content),
+            }
+            cache.set(key, cached)
+            status = 'MISS'
+        else:
+            status = 'HIT'
+
+        if etag_matches(request, cached['etag']):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+        response['ETag'] = cached['etag']
+        response['Cache-Control'] = 'no-cache'
+        response['X-Cache'] = status
+        return response
+
+
+def main():
+    from django_env import setup_django
+    setup_django()
+
+    from applications.projects.models import Project
+
+    projects = Project.objects.all()
+    if len(sys.argv) > 1:
+        projects = projects.filter(nombre_corto=sys.argv[1])
+
+    for project in projects:
+        version = bump_project_version(project.id)
+        print(f'✅ {project.nombre_corto}: cache version {version}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
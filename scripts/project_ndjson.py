@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Streamable NDJSON export/import of a project's group/layer tree
+
+One JSON record per line, parents before children, in a stable order so
+exports can be diffed and merged with git:
+
+    {"type": "project", "nombre_corto": "ecoreservas", "nombre": "Ecoreservas", ...}
+    {"type": "group", "key": "ecoreservas/Biodiversidad", "parent": null, "nombre": "Biodiversidad", ...}
+    {"type": "group", "key": "ecoreservas/Biodiversidad/Aves", "parent": "ecoreservas/Biodiversidad", ...}
+    {"type": "layer", "group": "ecoreservas/Biodiversidad/Aves", "nombre_geoserver": "...", ...}
+
+Group keys are the path of group names from the project, and groups and
+layers are ordered by depth, names and orden, never by database ids, so the
+same tree exports to the same file from any database. Keys are only
+references inside the file; import maps them to the new ids.
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/project_ndjson.py export ecoreservas > ecoreservas.ndjson
+    python ../scripts/project_ndjson.py import ecoreservas.ndjson [--replace]
+    python ../scripts/project_ndjson.py import - --replace < ecoreservas.ndjson
+
+Export streams rows through server-side cursors and import creates rows in
+fixed-size bulk batches inside one transaction, so memory stays constant
+except for the group key maps.
+"""
+import argparse
+import json
+import sys
+
+BATCH_SIZE = 2000
+
+PROJECT_FIELDS = ('nombre_corto', 'nombre', 'logo_pequeno_url', 'logo_completo_url', 'nivel_zoom',
+                  'coordenada_central_x', 'coordenada_central_y', 'panel_visible', 'base_map_visible')
+GROUP_FIELDS = ('nombre', 'orden', 'fold_state', 'color')
+LAYER_FIELDS = ('nombre_geoserver', 'nombre_display', 'store_geoserver', 'estado_inicial',
+                'metadata_id', 'orden')
+
+
+def dumps(record):
+    return json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(', ', ': '))
+
+
+def group_key(parent_key, nombre, used_keys):
+    """Path of a group from the project, e.g. 'ecoreservas/Biodiversidad/Aves';
+    a repeated sibling name gets a ' #2', ' #3', ... suffix in export order"""
+    base = f'{parent_key}/{nombre}'
+    key, n = base, 1
+    while key in used_keys:
+        n += 1
+        key = f'{base} #{n}'
+    used_keys.add(key)
+    return key
+
+
+def export_project(nombre_corto, out):
+    """Write the project tree as NDJSON records to a text stream"""
+    from django.db import connection, transaction
+    from applications.projects.models import Project, LayerGroup, Layer
+
+    project = Project.objects.get(nombre_corto=nombre_corto)
+    record = {'type': 'project'}
+    record.update({field: getattr(project, field) for field in PROJECT_FIELDS})
+    out.write(dumps(record) + '\n')
+
+    # Groups ordered by depth so every parent precedes its children, then by
+    # names and orden rather than ids so two databases export the same file
+    tree_sql = f'''
+        WITH RECURSIVE tree AS (
+            SELECT id, 0 AS depth, ARRAY[]::text[] AS parent_path
+            FROM {LayerGroup._meta.db_table}
+            WHERE proyecto_id = %s AND parent_group_id IS NULL
+            UNION ALL
+            SELECT g.id, t.depth + 1, t.parent_path || p.nombre::text
+            FROM {LayerGroup._meta.db_table} g
+            JOIN tree t ON g.parent_group_id = t.id
+            JOIN {LayerGroup._meta.db_table} p ON p.id = t.id
+        )
+    '''
+    group_order = 'tree.depth, tree.parent_path, g.orden, g.nombre, g.id'
+    groups_sql = tree_sql + f'''
+        SELECT g.id, g.parent_group_id, {", ".join("g." + f for f in GROUP_FIELDS)}
+        FROM tree
+        JOIN {LayerGroup._meta.db_table} g ON g.id = tree.id
+        ORDER BY {group_order}
+    '''
+    layers_sql = tree_sql + f'''
+        SELECT l.grupo_id, {", ".join("l." + f for f in LAYER_FIELDS)}
+        FROM tree
+        JOIN {LayerGroup._meta.db_table} g ON g.id = tree.id
+        JOIN {Layer._meta.db_table} l ON l.grupo_id = g.id
+        ORDER BY {group_order}, l.orden, l.nombre_geoserver, l.id
+    '''
+    group_keys = {}
+    used_keys = set()
+    groups = layers = 0
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(groups_sql, [project.id])
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            for group_id, parent_id, *values in rows:
+                record = {'type': 'group', 'parent': group_keys.get(parent_id)}
+                record.update(zip(GROUP_FIELDS, values))
+                record['key'] = group_key(record['parent'] or project.nombre_corto, record['nombre'], used_keys)
+                group_keys[group_id] = record['key']
+                out.write(dumps(record) + '\n')
+                groups += 1
+
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(layers_sql, [project.id])
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            for group_id, *values in rows:
+                record = {'type': 'layer', 'group': group_keys[group_id]}
+                record.update(zip(LAYER_FIELDS, values))
+                out.write(dumps(record) + '\n')
+                layers += 1
+
+    return groups, layers
+
+
+def read_records(stream):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f'Line {line_number}: {e}')
+
+
+def import_project(stream, replace=False):
+    """Load NDJSON records into the database in bulk batches"""
+    from django.db import transaction
+    from applications.projects.models import Project, LayerGroup, Layer
+    from project_cache import bump_project_version
+
+    records = read_records(stream)
+    header = next(records, None)
+    if not header or header.get('type') != 'project':
+        raise ValueError('First record must be the project')
+
+    group_ids = {}
+    pending_groups = []
+    pending_layers = []
+    totals = {'groups': 0, 'layers': 0}
+
+    with transaction.atomic():
+        fields = {f: header[f] for f in PROJECT_FIELDS if f in header and f != 'nombre_corto'}
+        project, created = Project.objects.update_or_create(
+            nombre_corto=header['nombre_corto'], defaults=fields
+        )
+        if LayerGroup.objects.filter(proyecto=project).exists():
+            if not replace:
+                raise ValueError(f'Project {project.nombre_corto} already has groups (use --replace)')
+            LayerGroup.objects.filter(proyecto=project).delete()
+
+        def flush_groups():
+            for record in pending_groups:
+                if record['parent'] is not None and record['parent'] not in group_ids:
+                    raise ValueError(f'Group {record["key"]} appears before its parent {record["parent"]}')
+            objs = [
+                LayerGroup(proyecto=project, parent_group_id=group_ids.get(record['parent']),
+                           **{f: record[f] for f in GROUP_FIELDS if f in record})
+                for record in pending_groups
+            ]
+            for record, group in zip(pending_groups, LayerGroup.objects.bulk_create(objs)):
+                group_ids[record['key']] = group.id
+            totals['groups'] += len(pending_groups)
+            pending_groups.clear()
+
+        def flush_layers():
+            Layer.objects.bulk_create([
+                Layer(grupo_id=group_ids[record['group']],
+                      **{f: record[f] for f in LAYER_FIELDS if f in record})
+                for record in pending_layers
+            ])
+            totals['layers'] += len(pending_layers)
+            pending_layers.clear()
+
+        pending_keys = set()
+        for record in records:
+            if record['type'] == 'group':
+                # A child of a pending group needs its parent id first
+                if record['parent'] in pending_keys or len(pending_groups) >= BATCH_SIZE:
+                    flush_groups()
+                    pending_keys.clear()
+                pending_groups.append(record)
+                pending_keys.add(record['key'])
+            elif record['type'] == 'layer':
+                if pending_groups:
+                    flush_groups()
+                    pending_keys.clear()
+                if record['group'] not in group_ids:
+                    raise ValueError(f'Layer {record.get("nombre_geoserver")} references unknown group {record["group"]}')
+                pending_layers.append(record)
+                if len(pending_layers) >= BATCH_SIZE:
+                    flush_layers()
+            else:
+                raise ValueError(f'Unknown record type: {record["type"]}')
+
+        if pending_groups:
+            flush_groups()
+        if pending_layers:
+            flush_layers()
+
+        transaction.on_commit(lambda: bump_project_version(project.id))
+
+    return project, totals['groups'], totals['layers']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export/import project trees as NDJSON')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='write a project tree to stdout')
+    export_parser.add_argument('nombre_corto')
+
+    import_parser = subparsers.add_parser('import', help='load a project tree')
+    import_parser.add_argument('file', help="NDJSON file, or '-' for stdin")
+    import_parser.add_argument('--replace', action='store_true',
+                               help='delete the existing groups/layers of the project first')
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    if args.command == 'export':
+        groups, layers = export_project(args.nombre_corto, sys.stdout)
+        print(f'✅ Exported {args.nombre_corto}: {groups} groups, {layers} layers', file=sys.stderr)
+        return 0
+
+    try:
+        if args.file == '-':
+            project, groups, layers = import_project(sys.stdin, replace=args.replace)
+        else:
+            with open(args.file, encoding='utf-8') as f:
+                project, groups, layers = import_project(f, replace=args.replace)
+    except ValueError as e:
+        print(f'❌ {e}', file=sys.stderr)
+        return 1
+
+    print(f'✅ Imported {project.nombre_corto}: {groups} groups, {layers} layers')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
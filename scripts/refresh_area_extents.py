@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Refresh the precomputed centroids and bounding boxes (area_extents.sql)
+
+Run after loading new boundaries into capas_base.mpio_politico /
+dpto_politico or new GBIF statistics into gbif_consultas.*_queries.
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/refresh_area_extents.py [mpio_politico|dpto_politico|mpio_queries|dpto_queries]
+"""
+import sys
+
+SOURCES = ('mpio_politico', 'dpto_politico', 'mpio_queries', 'dpto_queries')
+
+
+def refresh_area_extents(source=None):
+    """Rebuild one source (all when None); returns rows written"""
+    from django.db import connection, transaction
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SELECT capas_base.refresh_area_extents(%s)', [source])
+        return cursor.fetchone()[0]
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else None
+    if source is not None and source not in SOURCES:
+        print(f'❌ Unknown source: {source} (choose from {", ".join(SOURCES)})')
+        return 1
+
+    from django_env import setup_django
+    setup_django()
+
+    rows = refresh_area_extents(source)
+    print(f'✅ {rows} area extents written ({source or "all sources"})')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Refresh the biodiversity summary per area (area_summary.sql)
+
+Recomputes only the areas whose source rows changed since the last refresh,
+as recorded by the triggers on dpto/mpio_queries and dpto/mpio_amenazas in
+gbif_consultas.area_summary_dirty, and rewrites only the rows whose values
+changed. With nothing marked it does nothing, unless a new GBIF load appears
+in gbif_consultas.gbif_info (e.g. loaded with triggers disabled); then, as
+with --force, every area is compared. Run after every GBIF load.
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/refresh_area_summary.py [--force]
+"""
+import argparse
+import sys
+
+
+def refresh_area_summary(force=False):
+    """Returns (changed, removed, download_date, areas, full_refresh); areas is None on a full refresh"""
+    from django.db import connection, transaction
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT changed, removed, download_date, areas, full_refresh
+            FROM gbif_consultas.refresh_area_summary(%s)
+        ''', [force])
+        return cursor.fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh gbif_consultas.area_summary')
+    parser.add_argument('--force', action='store_true',
+                        help='compare every area, not only the ones marked as changed')
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    changed, removed, download_date, areas, full_refresh = refresh_area_summary(args.force)
+    if not full_refresh and not areas:
+        print(f'✅ Area summary up to date (GBIF load {download_date})')
+    else:
+        scope = 'all areas' if full_refresh else f'{areas} changed areas'
+        print(f'✅ Area summary refreshed for GBIF load {download_date} ({scope}): '
+              f'{changed} rows updated, {removed} removed')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Refresh the multi-resolution simplified geometries (simplified_geometries.sql)
+
+Recomputes every simplification level of the department and municipality
+boundaries into capas_base.simplified_geoms and clears the tile cache so tiles
+are rebuilt from the new geometries. Run after loading new boundaries or
+changing capas_base.simplification_levels.
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/refresh_simplified_geoms.py [departamentos] [municipios] [--keep-tiles]
+"""
+import argparse
+import sys
+
+LAYERS = ('departamentos', 'municipios')
+
+
+def refresh(layer):
+    """Rebuild one layer; returns rows written"""
+    from django.db import connection, transaction
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SELECT capas_base.refresh_simplified_geoms(%s)', [layer])
+        return cursor.fetchone()[0]
+
+
+def level_summary(layer):
+    """(level, tolerance, features, vertices) per level, level 0 being the originals"""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT l.level, l.tolerance, count(sg.codigo), COALESCE(sum(ST_NPoints(sg.geom)), 0)
+            FROM capas_base.simplification_levels l
+            LEFT JOIN capas_base.simplified_geoms sg ON sg.level = l.level AND sg.layer = %s
+            GROUP BY l.level, l.tolerance
+            ORDER BY l.level
+        ''', [layer])
+        return cursor.fetchall()
+
+
+def original_vertices(layer):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT boundary_table FROM capas_base.mvt_layer_tables(%s)', [layer])
+        table = cursor.fetchone()[0]
+        cursor.execute(f'SELECT count(*), COALESCE(sum(ST_NPoints(geom)), 0) FROM {table}')
+        return cursor.fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh simplified boundary geometries')
+    # No choices=: argparse rejects an empty nargs='*' list against them
+    parser.add_argument('layers', nargs='*', help=f'layers to refresh: {", ".join(LAYERS)} (default: all)')
+    parser.add_argument('--keep-tiles', action='store_true', help='do not clear the tile cache')
+    args = parser.parse_args()
+    unknown = [layer for layer in args.layers if layer not in LAYERS]
+    if unknown:
+        print(f'❌ Unknown layer: {", ".join(unknown)} (choose from {", ".join(LAYERS)})')
+        return 1
+
+    from django_env import setup_django
+    setup_django()
+
+    for layer in args.layers or LAYERS:
+        print(f'🔄 Refreshing {layer}...')
+        rows = refresh(layer)
+        features, vertices = original_vertices(layer)
+        print(f'   level 0 (original): {features} features, {vertices} vertices')
+        for level, tolerance, count, level_vertices in level_summary(layer):
+            ratio = f'{level_vertices / vertices:.1%}' if vertices else '-'
+            print(f'   level {level} (tolerance {tolerance}): {count} features, {level_vertices} vertices ({ratio})')
+        print(f'✅ {layer}: {rows} simplified geometries written')
+
+    if not args.keep_tiles:
+        import tile_cache
+        print(f'🧹 {tile_cache.get_store().clear()} cached tiles removed')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
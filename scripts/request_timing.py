@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Per-request SQL and timing instrumentation (Server-Timing + JSON access log)
+
+For a sampled request the middleware records the number of SQL queries and
+their total time (through connection.execute_wrapper, so DEBUG is not
+needed), the DRF/template render time, any explicitly timed spans and the
+cache outcome reported in the X-Cache header by project_cache.py,
+tile_cache.py and the other cached endpoints. They are sent back as
+
+    Server-Timing: db;dur=12.4;desc="5 queries", render;dur=3.1, serialize;dur=8.0,
+                   cache;desc="HIT", app;dur=31.7
+
+and logged as one JSON line on the `request_timing` logger, next to the
+Gunicorn access log. Requests that are not sampled only get `app;dur=`.
+
+Streamed responses (CSV/NDJSON exports, /api/features) send their headers
+before running most of their queries, so their Server-Timing only covers
+the work up to the first byte. Their log line is written when the stream
+is closed instead: duration_ms and db_* then cover the whole response,
+with first_byte_ms and a `stream` span for the time spent producing chunks.
+
+Settings (environment):
+    REQUEST_TIMING_SAMPLE_RATE  fraction of requests instrumented (default 0.05)
+    REQUEST_TIMING_SLOW_MS      always log requests slower than this (default 1000)
+    REQUEST_TIMING_TOKEN        a request carrying `X-Request-Timing: <token>` is always
+                                sampled (with DEBUG any value works), e.g. for
+                                tests/benchmark_api.py --timing-token
+
+Backend integration (i2dbackend/settings), first in MIDDLEWARE so it sees the
+whole request, including the cached responses of project_cache.py:
+
+    MIDDLEWARE.insert(0, 'request_timing.RequestTimingMiddleware')
+    LOGGING['loggers']['request_timing'] = {'handlers': ['console'], 'level': 'INFO', 'propagate': False}
+
+Time a block explicitly (e.g. serializer.data in a view):
+
+    from request_timing import span
+    with span('serialize'):
+        data = serializer.data
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+SAMPLE_RATE = float(os.environ.get('REQUEST_TIMING_SAMPLE_RATE', '0.05'))
+SLOW_MS = float(os.environ.get('REQUEST_TIMING_SLOW_MS', '1000'))
+TOKEN = os.environ.get('REQUEST_TIMING_TOKEN', '')
+FORCE_HEADER = 'HTTP_X_REQUEST_TIMING'
+
+logger = logging.getLogger('request_timing')
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """Measurements of one sampled request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.spans = {}
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextlib.contextmanager
+def span(name):
+    """Add the duration of the block to `name` of the current sampled request (no-op otherwise)"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - started)
+
+
+def server_timing(total_ms, timing=None, cache=None):
+    """Server-Timing header value"""
+    entries = []
+    if timing is not None:
+        entries.append(f'db;dur={timing.db_seconds * 1000:.1f};desc="{timing.queries} queries"')
+        entries.extend(f'{name};dur={seconds * 1000:.1f}' for name, seconds in timing.spans.items())
+    if cache:
+        entries.append(f'cache;desc="{cache}"')
+    entries.append(f'app;dur={total_ms:.1f}')
+    return ', '.join(entries)
+
+
+def log_record(request, response, total_ms, timing=None, first_byte_ms=None):
+    """Fields of the JSON access log line; first_byte_ms is set for streamed responses"""
+    match = getattr(request, 'resolver_match', None)
+    record = {
+        'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'method': request.method,
+        'path': request.path,
+        'route': match.route if match else None,
+        'status': response.status_code,
+        'duration_ms': round(total_ms, 1),
+        'cache': response.get('X-Cache'),
+        'bytes': None if response.streaming else len(response.content),
+        'pid': os.getpid(),
+        'sampled': timing is not None,
+        'streamed': response.streaming,
+    }
+    if first_byte_ms is not None:
+        record['first_byte_ms'] = round(first_byte_ms, 1)
+    if timing is not None:
+        record['db_queries'] = timing.queries
+        record['db_ms'] = round(timing.db_seconds * 1000, 1)
+        for name, seconds in timing.spans.items():
+            record[f'{name}_ms'] = round(seconds * 1000, 1)
+    return record
+
+
+def _timed_stream(content, timing):
+    """Count the queries of a streaming response and the time spent producing its chunks"""
+    from django.db import connection
+
+    with connection.execute_wrapper(timing):
+        iterator = iter(content)
+        while True:
+            started = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                timing.add('stream', time.perf_counter() - started)
+            yield chunk
+
+
+class RequestTimingMiddleware:
+    """Time requests; instrument a sample of them in detail"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_sample(self, request):
+        forced = request.META.get(FORCE_HEADER)
+        if forced:
+            from django.conf import settings
+            if settings.DEBUG or (TOKEN and forced == TOKEN):
+                return True
+        return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        timing = RequestTiming() if self.should_sample(request) else None
+        if timing is None:
+            response = self.get_response(request)
+        else:
+            from django.db import connection
+
+            token = _current.set(timing)
+            try:
+                with connection.execute_wrapper(timing):
+                    response = self.get_response(request)
+            finally:
+                _current.reset(token)
+
+        # Sent before any streamed content, so for streams it only covers the work up to the first byte
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        response['Server-Timing'] = server_timing(elapsed_ms, timing,
+                                                  response.get('X-Cache') if timing is not None else None)
+        if response.streaming:
+            if timing is not None:
+                response.streaming_content = _timed_stream(response.streaming_content, timing)
+            self.log_on_close(request, response, started, elapsed_ms, timing)
+        elif timing is not None or elapsed_ms >= SLOW_MS:
+            logger.info(json.dumps(log_record(request, response, elapsed_ms, timing)))
+        return response
+
+    def log_on_close(self, request, response, started, first_byte_ms, timing):
+        """Log a streamed response once the WSGI server closes it, with the full duration"""
+        close = response.close
+
+        def close_and_log():
+            close()
+            total_ms = (time.perf_counter() - started) * 1000
+            if timing is not None or total_ms >= SLOW_MS:
+                logger.info(json.dumps(log_record(request, response, total_ms, timing, first_byte_ms)))
+
+        response.close = close_and_log
+
+    def process_template_response(self, request, response):
+        """Time DRF/template rendering, which happens after the view returns"""
+        timing = _current.get()
+        if timing is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda r: timing.add('render', time.perf_counter() - started))
+        return response
@@ -0,0 +1,139 @@
+-- ============================================================================
+-- Multi-resolution Simplified Geometries
+-- Visor I2D Humboldt Project
+-- PostgreSQL 16 + PostGIS 3.4
+-- ============================================================================
+-- Precomputed simplified variants of the department and municipality
+-- boundaries at several tolerances, stored alongside the originals in
+-- capas_base.simplified_geoms. Geometry-serving endpoints pick the coarsest
+-- level that is still finer than one screen pixel (capas_base.geom_level_*).
+--
+-- Simplification is done over the whole coverage with ST_CoverageSimplify
+-- (GEOS >= 3.12) so shared borders stay identical between neighbours; older
+-- GEOS builds fall back to per-polygon ST_SimplifyPreserveTopology.
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < simplified_geometries.sql
+-- Requires vector_tiles.sql (layer registry capas_base.mvt_layer_tables)
+-- Fill/refresh with: python ../scripts/refresh_simplified_geoms.py
+
+\echo '========================================='
+\echo 'Installing simplified geometry tables'
+\echo '========================================='
+
+-- ============================================================================
+-- 1. TABLES
+-- ============================================================================
+\echo '1. Creating tables...'
+
+-- Tolerances in degrees (EPSG:4326); level 0 is the original geometry
+CREATE TABLE IF NOT EXISTS capas_base.simplification_levels (
+    level smallint PRIMARY KEY CHECK (level > 0),
+    tolerance double precision NOT NULL
+);
+
+INSERT INTO capas_base.simplification_levels (level, tolerance) VALUES
+    (1, 0.0005),   -- ~55 m,  zoom 10-11
+    (2, 0.002),    -- ~220 m, zoom 8-9
+    (3, 0.008),    -- ~900 m, zoom 6-7
+    (4, 0.03)      -- ~3 km,  zoom 0-5
+ON CONFLICT (level) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS capas_base.simplified_geoms (
+    layer text NOT NULL,
+    level smallint NOT NULL REFERENCES capas_base.simplification_levels (level) ON DELETE CASCADE,
+    codigo varchar(5) NOT NULL,
+    geom geometry(MultiPolygon, 4326) NOT NULL,
+    refreshed_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (layer, level, codigo)
+);
+
+CREATE INDEX IF NOT EXISTS idx_simplified_geoms_geom
+  ON capas_base.simplified_geoms USING GIST (geom);
+
+\echo '✓ Tables created'
+\echo ''
+
+-- ============================================================================
+-- 2. LEVEL SELECTION
+-- ============================================================================
+\echo '2. Creating level selection functions...'
+
+-- Coarsest level whose tolerance does not exceed the pixel size (degrees)
+CREATE OR REPLACE FUNCTION capas_base.geom_level(pixel_size double precision)
+RETURNS smallint AS $$
+    SELECT COALESCE(max(level), 0)::smallint
+    FROM capas_base.simplification_levels
+    WHERE tolerance <= pixel_size;
+$$ LANGUAGE sql STABLE;
+
+-- Web map zoom level (256 px tiles)
+CREATE OR REPLACE FUNCTION capas_base.geom_level_for_zoom(z integer)
+RETURNS smallint AS $$
+    SELECT capas_base.geom_level(360.0 / (256 * 2 ^ z));
+$$ LANGUAGE sql STABLE;
+
+-- Bounding box rendered at width_px pixels
+CREATE OR REPLACE FUNCTION capas_base.geom_level_for_bbox(bbox geometry, width_px integer DEFAULT 1024)
+RETURNS smallint AS $$
+    SELECT capas_base.geom_level(
+        (ST_XMax(ST_Transform(bbox, 4326)) - ST_XMin(ST_Transform(bbox, 4326))) / width_px
+    );
+$$ LANGUAGE sql STABLE;
+
+\echo '✓ Level selection functions created'
+\echo ''
+
+-- ============================================================================
+-- 3. REFRESH
+-- ============================================================================
+\echo '3. Creating refresh function...'
+
+-- Recompute every level of one layer in a single transaction; readers keep
+-- seeing the previous rows until it commits
+CREATE OR REPLACE FUNCTION capas_base.refresh_simplified_geoms(p_layer text)
+RETURNS integer AS $$
+DECLARE
+    tables RECORD;
+    lvl RECORD;
+    use_coverage boolean;
+    simplify_expr text;
+    inserted integer;
+    total integer := 0;
+BEGIN
+    tables := capas_base.mvt_layer_tables(p_layer);
+    use_coverage := string_to_array(split_part(postgis_geos_version(), '-', 1), '.')::int[] >= ARRAY[3, 12];
+
+    DELETE FROM capas_base.simplified_geoms WHERE layer = p_layer;
+
+    FOR lvl IN SELECT level, tolerance FROM capas_base.simplification_levels ORDER BY level LOOP
+        IF use_coverage THEN
+            simplify_expr := format('ST_CoverageSimplify(geom, %s) OVER ()', lvl.tolerance);
+        ELSE
+            simplify_expr := format('ST_SimplifyPreserveTopology(geom, %s)', lvl.tolerance);
+        END IF;
+
+        EXECUTE format($q$
+            INSERT INTO capas_base.simplified_geoms (layer, level, codigo, geom)
+            SELECT %1$L, %2$s, codigo, ST_Multi(ST_CollectionExtract(simplified, 3))
+            FROM (
+                SELECT codigo, %3$s AS simplified
+                FROM (SELECT codigo, ST_Transform(geom, 4326) AS geom FROM %4$s
+                      WHERE geom IS NOT NULL AND codigo IS NOT NULL) src
+            ) s
+            WHERE NOT ST_IsEmpty(ST_CollectionExtract(simplified, 3))
+            ON CONFLICT (layer, level, codigo) DO NOTHING
+        $q$, p_layer, lvl.level, simplify_expr, tables.boundary_table);
+
+        GET DIAGNOSTICS inserted = ROW_COUNT;
+        total := total + inserted;
+    END LOOP;
+
+    RETURN total;
+END;
+$$ LANGUAGE plpgsql;
+
+\echo '✓ Refresh function created'
+\echo ''
+\echo 'Fill with:'
+\echo '  SELECT capas_base.refresh_simplified_geoms(''departamentos'');'
+\echo '  SELECT capas_base.refresh_simplified_geoms(''municipios'');'
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Slow query capture with sampled EXPLAIN (ANALYZE, BUFFERS) (slow_queries.sql)
+
+SlowQueryMiddleware watches every ORM and raw query of a request through
+connection.execute_wrapper, including those run while a streaming response
+(CSV/NDJSON exports, /api/features) is being sent. Queries over
+SLOW_QUERY_MS are recorded in geovisor.slow_queries under a fingerprint of
+their normalized SQL (literals, placeholders and IN lists collapsed), with
+the request path. For a sample of them the statement is run again under
+EXPLAIN (ANALYZE, BUFFERS) inside a savepoint that is rolled back, and the
+plan, timings, buffer counts and sequentially scanned relations are stored
+too. Explaining and writing happen when the WSGI server closes the
+response, after it has been sent, so they don't add to the latency the
+client sees. Only the normalized SQL is kept; parameters never leave the
+process.
+
+Settings (environment):
+    SLOW_QUERY_MS            capture threshold (default 200, 0 disables capture)
+    SLOW_QUERY_EXPLAIN_RATE  fraction of captured queries explained (default 0.2)
+    SLOW_QUERY_EXPLAIN_INTERVAL  seconds before the same fingerprint is explained
+                             again by a worker (default 600)
+
+Backend integration (i2dbackend/settings):
+
+    MIDDLEWARE.insert(0, 'slow_queries.SlowQueryMiddleware')
+
+Outside requests (workers, scripts):
+
+    with slow_queries.capture('export_worker'):
+        ...
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/slow_queries.py report [--days 7] [--limit 20] [--plans]
+    python ../scripts/slow_queries.py indexes [--days 7]
+    python ../scripts/slow_queries.py prune [--days 30]
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '200'))
+EXPLAIN_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE', '0.2'))
+EXPLAIN_INTERVAL = float(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL', '600'))
+EXPLAIN_PER_REQUEST = 3
+EXPLAIN_TIMEOUT_MS = 30000
+
+INDEX_SCHEMAS = ('capas_base', 'gbif_consultas', 'geovisor', 'django')
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'(?<![\w$.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b', re.I)
+_PLACEHOLDERS = re.compile(r'%s|%\(\w+\)s|\$\d+')
+_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACES = re.compile(r'\s+')
+_EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH)\b', re.I)
+_WRITES = re.compile(r'\b(INSERT|UPDATE|DELETE|FOR\s+UPDATE|FOR\s+SHARE|FOR\s+NO\s+KEY\s+UPDATE)\b', re.I)
+
+logger = logging.getLogger(__name__)
+
+# fingerprint -> time.monotonic() of its last EXPLAIN in this process
+_explained = {}
+
+
+def normalize(sql):
+    """SQL with comments, literals and value lists replaced by placeholders"""
+    sql = _COMMENTS.sub(' ', sql)
+    sql = _STRINGS.sub('?', sql)
+    sql = _PLACEHOLDERS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    sql = _LISTS.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def explainable(sql):
+    """Read-only statements only: EXPLAIN ANALYZE executes the query"""
+    return bool(_EXPLAINABLE.match(sql)) and not _WRITES.search(sql)
+
+
+def plan_summary(explain):
+    """Timings, buffers and sequentially scanned relations of EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) output"""
+    if isinstance(explain, str):
+        explain = json.loads(explain)
+    root = explain[0]
+    seq_scans = set()
+    nodes = [root['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node.get('Node Type') == 'Seq Scan':
+            seq_scans.add(node['Relation Name'])
+        nodes.extend(node.get('Plans', ()))
+    return {
+        'plan': root,
+        'planning_ms': root.get('Planning Time'),
+        'execution_ms': root.get('Execution Time'),
+        'shared_hit_blocks': root['Plan'].get('Shared Hit Blocks'),
+        'shared_read_blocks': root['Plan'].get('Shared Read Blocks'),
+        'seq_scans': sorted(seq_scans),
+    }
+
+
+class SlowQueryRecorder:
+    """connection.execute_wrapper hook collecting the slow queries of one request or job"""
+
+    def __init__(self, threshold_ms=SLOW_QUERY_MS):
+        self.threshold_ms = threshold_ms
+        self.captured = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= self.threshold_ms:
+            self.captured.append((sql, None if many else params, duration_ms))
+        return result
+
+    def should_explain(self, sql, params, key, explained):
+        if params is None or explained >= EXPLAIN_PER_REQUEST or not explainable(sql):
+            return False
+        last = _explained.get(key)
+        if last is not None and time.monotonic() - last < EXPLAIN_INTERVAL:
+            return False
+        return random.random() < EXPLAIN_RATE
+
+    def explain(self, sql, params):
+        from django.db import connection, transaction
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}')
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}', params)
+            result = cursor.fetchone()[0]
+            transaction.set_rollback(True)
+        return plan_summary(result)
+
+    def flush(self, path=None):
+        """Explain a sample and write the captured queries; never raises"""
+        from django.db import connection
+
+        # Take the list first: queries run below must not land in it
+        captured, self.captured = self.captured, []
+        if not captured:
+            return 0
+        rows = []
+        explained = 0
+        try:
+            for sql, params, duration_ms in captured:
+                normalized = normalize(sql)
+                key = fingerprint(normalized)
+                summary = {}
+                if self.should_explain(sql, params, key, explained):
+                    _explained[key] = time.monotonic()
+                    explained += 1
+                    try:
+                        summary = self.explain(sql, params)
+                    except Exception:
+                        logger.warning('EXPLAIN failed for slow query %s', key, exc_info=True)
+                rows.append([
+                    key, normalized, duration_ms, path,
+                    json.dumps(summary['plan']) if summary else None,
+                    summary.get('planning_ms'), summary.get('execution_ms'),
+                    summary.get('shared_hit_blocks'), summary.get('shared_read_blocks'),
+                    summary.get('seq_scans'),
+                ])
+            with connection.cursor() as cursor:
+                cursor.executemany('''
+                    INSERT INTO geovisor.slow_queries
+                        (fingerprint, query, duration_ms, path, plan, planning_ms, execution_ms,
+                         shared_hit_blocks, shared_read_blocks, seq_scans)
+                    VALUES (%s, %s, %s, %s, %s::jsonb, %s, %s, %s, %s, %s)
+                ''', rows)
+        except Exception:
+            logger.exception('Could not record %d slow queries', len(captured))
+            return 0
+        return len(rows)
+
+
+@contextlib.contextmanager
+def capture(path=None, threshold_ms=SLOW_QUERY_MS):
+    """Record the slow queries of the block (as `path`) when it finishes"""
+    from django.db import connection
+
+    if threshold_ms <= 0:
+        yield None
+        return
+    recorder = SlowQueryRecorder(threshold_ms)
+    with connection.execute_wrapper(recorder):
+        yield recorder
+    recorder.flush(path)
+
+
+class SlowQueryMiddleware:
+    """Capture the slow queries of every request"""
+
+    def __init__(self, get_response):
+        from django.core.exceptions import MiddlewareNotUsed
+
+        if SLOW_QUERY_MS <= 0:
+            raise MiddlewareNotUsed('SLOW_QUERY_MS is 0')
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from django.db import connection
+
+        recorder = SlowQueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = _watched(response.streaming_content, recorder)
+        flush_after_response(response, recorder, f'{request.method} {request.path}')
+        return response
+
+
+def _watched(content, recorder):
+    """Keep the recorder installed while a streaming response is iterated (gbif_export, /api/features)"""
+    from django.db import connection
+
+    with connection.execute_wrapper(recorder):
+        yield from content
+
+
+def flush_after_response(response, recorder, path):
+    """Flush once the WSGI server closes the response, i.e. after the last byte was sent"""
+    close = response.close
+
+    def close_and_flush():
+        from django.db import close_old_connections
+
+        close()
+        if recorder.captured:
+            recorder.flush(path)
+            # close() already ran close_old_connections; apply CONN_MAX_AGE to the one flush used
+            close_old_connections()
+
+    response.close = close_and_flush
+
+
+def report(days, limit):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT fingerprint, query, calls, total_ms, mean_ms, p95_ms, max_ms, paths, seq_scans, plan
+            FROM geovisor.slow_query_report(now() - make_interval(days => %s), %s)
+        ''', [days, limit])
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def index_candidates(days):
+    """(relations seq-scanned by slow queries, indexes never used)"""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT s.rel, count(DISTINCT s.fingerprint), round(sum(s.duration_ms)), max(t.n_live_tup)
+            FROM (
+                SELECT fingerprint, duration_ms, unnest(seq_scans) AS rel
+                FROM geovisor.slow_queries
+                WHERE captured_at >= now() - make_interval(days => %s)
+            ) s
+            LEFT JOIN pg_stat_user_tables t ON t.relname = s.rel
+            GROUP BY s.rel
+            ORDER BY 3 DESC
+        ''', [days])
+        seq_scans = cursor.fetchall()
+        cursor.execute('''
+            SELECT s.schemaname, s.relname, s.indexrelname, pg_size_pretty(pg_relation_size(s.indexrelid))
+            FROM pg_stat_user_indexes s
+            JOIN pg_index i ON i.indexrelid = s.indexrelid
+            WHERE s.idx_scan = 0
+              AND NOT i.indisunique
+              AND s.schemaname = ANY(%s)
+            ORDER BY pg_relation_size(s.indexrelid) DESC
+        ''', [list(INDEX_SCHEMAS)])
+        return seq_scans, cursor.fetchall()
+
+
+def prune(days):
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM geovisor.slow_queries WHERE captured_at < now() - make_interval(days => %s)',
+                       [days])
+        return cursor.rowcount
+
+
+def print_report(rows, plans):
+    if not rows:
+        print('✅ No slow queries captured in this period')
+        return
+    for rank, row in enumerate(rows, 1):
+        print(f'\n#{rank} {row["fingerprint"][:12]}  {row["calls"]} calls, total {row["total_ms"]:,.0f} ms, '
+              f'mean {row["mean_ms"]:.0f} ms, p95 {row["p95_ms"]:.0f} ms, max {row["max_ms"]:.0f} ms')
+        print(f'   {row["query"][:300]}')
+        if row['paths']:
+            print(f'   paths: {", ".join(row["paths"])}')
+        if row['seq_scans']:
+            print(f'   ⚠️  seq scans: {", ".join(row["seq_scans"])}')
+        if plans and row['plan']:
+            plan = row['plan'] if isinstance(row['plan'], dict) else json.loads(row['plan'])
+            print(json.dumps(plan, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report slow queries captured from real traffic')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    top = subparsers.add_parser('report', help='top offenders by total time')
+    top.add_argument('--days', type=int, default=7)
+    top.add_argument('--limit', type=int, default=20)
+    top.add_argument('--plans', action='store_true', help='print the latest EXPLAIN plan of each')
+
+    indexes = subparsers.add_parser('indexes', help='seq-scanned relations and unused indexes')
+    indexes.add_argument('--days', type=int, default=7)
+
+    old = subparsers.add_parser('prune', help='delete old captures')
+    old.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    if args.command == 'report':
+        print(f'🐢 Slow queries of the last {args.days} days (>= {SLOW_QUERY_MS:.0f} ms when captured)')
+        print_report(report(args.days, args.limit), args.plans)
+    elif args.command == 'indexes':
+        seq_scans, unused = index_candidates(args.days)
+        print(f'🔍 Relations read with a sequential scan by slow queries (last {args.days} days):')
+        for rel, fingerprints, total_ms, rows in seq_scans:
+            print(f'   {rel:<40} {fingerprints:>4} queries {total_ms:>12,.0f} ms  ~{rows or 0:,} rows')
+        print(f'\n🗑️  Indexes never used since the statistics were reset ({", ".join(INDEX_SCHEMAS)}):')
+        for schema, table, index, size in unused:
+            print(f'   {schema}.{table}.{index} ({size})')
+    else:
+        print(f'✅ {prune(args.days)} captures older than {args.days} days deleted')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
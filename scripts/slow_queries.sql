@@ -0,0 +1,84 @@
+-- ============================================================================
+-- Slow Query Log
+-- Visor I2D Humboldt Project
+-- PostgreSQL 16 + PostGIS 3.4
+-- ============================================================================
+-- Queries over SLOW_QUERY_MS captured from real traffic by slow_queries.py
+-- (SlowQueryMiddleware), one row per occurrence. fingerprint is the sha1 of
+-- the normalized SQL (literals and IN lists collapsed), so repeated calls of
+-- the same statement group together; a sample carries its EXPLAIN (ANALYZE,
+-- BUFFERS) plan and the relations it read with a sequential scan.
+--
+-- pg_stat_statements and auto_explain cover the same ground from inside the
+-- server but need shared_preload_libraries and a restart; this log works on
+-- the stock postgis image and keeps the request path of each query.
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < slow_queries.sql
+
+\echo '========================================='
+\echo 'Installing slow query log'
+\echo '========================================='
+
+CREATE TABLE IF NOT EXISTS geovisor.slow_queries (
+    id bigserial PRIMARY KEY,
+    fingerprint char(40) NOT NULL,
+    query text NOT NULL,
+    duration_ms double precision NOT NULL,
+    path text,
+    plan jsonb,
+    planning_ms double precision,
+    execution_ms double precision,
+    shared_hit_blocks bigint,
+    shared_read_blocks bigint,
+    seq_scans text[],
+    captured_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_slow_queries_fingerprint
+  ON geovisor.slow_queries (fingerprint, captured_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_slow_queries_captured_at
+  ON geovisor.slow_queries (captured_at);
+
+-- Top offenders: total time spent per fingerprint, with the latest plan
+CREATE OR REPLACE FUNCTION geovisor.slow_query_report(p_since timestamptz, p_limit integer DEFAULT 20)
+RETURNS TABLE (
+    fingerprint char(40),
+    query text,
+    calls bigint,
+    total_ms double precision,
+    mean_ms double precision,
+    p95_ms double precision,
+    max_ms double precision,
+    paths text[],
+    seq_scans text[],
+    plan jsonb,
+    last_seen timestamptz
+) AS $$
+    SELECT
+        s.fingerprint,
+        min(s.query),
+        count(*),
+        sum(s.duration_ms),
+        avg(s.duration_ms),
+        percentile_cont(0.95) WITHIN GROUP (ORDER BY s.duration_ms),
+        max(s.duration_ms),
+        (array_agg(DISTINCT s.path) FILTER (WHERE s.path IS NOT NULL))[1:5],
+        latest.seq_scans,
+        latest.plan,
+        max(s.captured_at)
+    FROM geovisor.slow_queries s
+    LEFT JOIN LATERAL (
+        SELECT e.plan, e.seq_scans
+        FROM geovisor.slow_queries e
+        WHERE e.fingerprint = s.fingerprint AND e.plan IS NOT NULL
+        ORDER BY e.captured_at DESC
+        LIMIT 1
+    ) latest ON true
+    WHERE s.captured_at >= p_since
+    GROUP BY s.fingerprint, latest.seq_scans, latest.plan
+    ORDER BY sum(s.duration_ms) DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+\echo '✓ Slow query log installed'
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Persistent cache for rendered map tiles
+
+Tiles are keyed by layer, tipo, z, x, y and the data version (the latest GBIF
+load in gbif_consultas.gbif_info), so a new GBIF download naturally stops
+serving old tiles. Entries expire after TILE_CACHE_TTL and the store is capped
+at TILE_CACHE_MAX_MB, evicting least recently used tiles first.
+
+Stores (TILE_CACHE_BACKEND):
+    disk   files under TILE_CACHE_DIR (default, shared media volume)
+    redis  keys in REDIS_URL, with an access-time index for LRU eviction
+
+Hit/miss counters live in the shared Django cache (project_cache.py) so they
+aggregate across Gunicorn workers; GET /api/tiles/stats exposes them.
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/tile_cache.py seed [--min-zoom 0] [--max-zoom 10] [--layers departamentos municipios]
+    python ../scripts/tile_cache.py stats
+    python ../scripts/tile_cache.py clear
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import time
+
+TILE_CACHE_BACKEND = os.getenv('TILE_CACHE_BACKEND', 'disk')
+TILE_CACHE_DIR = os.getenv('TILE_CACHE_DIR', '/app/media/tile_cache')
+TILE_CACHE_MAX_MB = int(os.getenv('TILE_CACHE_MAX_MB', '512'))
+TILE_CACHE_TTL = int(os.getenv('TILE_CACHE_TTL', str(7 * 24 * 60 * 60)))
+
+DATA_VERSION_TIMEOUT = 300
+EVICT_EVERY = 200
+EVICT_TARGET = 0.9
+
+# tipo ends up in cache keys and file paths; anything else is rejected by gis_api.tile()
+TIPO_PATTERN = re.compile(r'^[a-z_]{1,32}$')
+
+
+class DiskTileStore:
+    """Tiles as files; access time drives LRU eviction"""
+
+    def __init__(self, root=TILE_CACHE_DIR, max_bytes=TILE_CACHE_MAX_MB * 1024 * 1024, ttl=TILE_CACHE_TTL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.writes = 0
+
+    def path(self, key):
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(os.path.join(root, *key.split(':')) + '.mvt')
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f'Tile key resolves outside {self.root}: {key!r}')
+        return path
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            stat = os.stat(path)
+            if stat.st_mtime + self.ttl < time.time():
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Record the access explicitly: relatime/noatime mounts don't
+            os.utime(path, (time.time(), stat.st_mtime))
+            return data
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        self.writes += 1
+        if self.writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.mvt'):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        yield path, os.stat(path)
+                    except FileNotFoundError:
+                        pass
+
+    def evict(self):
+        """Drop expired tiles, then the least recently used until under the cap"""
+        now = time.time()
+        live = []
+        total = removed = 0
+        for path, stat in self.entries():
+            if stat.st_mtime + self.ttl < now:
+                removed += self._remove(path)
+            else:
+                live.append((stat.st_atime, stat.st_size, path))
+                total += stat.st_size
+
+        if total > self.max_bytes:
+            live.sort()
+            target = self.max_bytes * EVICT_TARGET
+            for _, size, path in live:
+                if total <= target:
+                    break
+                removed += self._remove(path)
+                total -= size
+        return removed
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def usage(self):
+        count = size = 0
+        for _, stat in self.entries():
+            count += 1
+            size += stat.st_size
+        return {'entries': count, 'bytes': size}
+
+    def clear(self):
+        removed = 0
+        for path, _ in list(self.entries()):
+            removed += self._remove(path)
+        return removed
+
+
+class RedisTileStore:
+    """Tiles as Redis strings with TTL; a sorted set of access times drives LRU eviction"""
+
+    PREFIX = 'tile:'
+    LRU_KEY = 'tile-meta:lru'
+    SIZES_KEY = 'tile-meta:sizes'
+    BYTES_KEY = 'tile-meta:bytes'
+
+    def __init__(self, url=None, max_bytes=TILE_CACHE_MAX_MB * 1024 * 1024, ttl=TILE_CACHE_TTL):
+        import redis
+        self.redis = redis.Redis.from_url(url or os.getenv('REDIS_URL', 'redis://redis:6379/1'))
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+    def get(self, key):
+        data = self.redis.get(self.PREFIX + key)
+        if data is not None:
+            self.redis.zadd(self.LRU_KEY, {key: time.time()})
+        return data
+
+    def set(self, key, data):
+        pipe = self.redis.pipeline()
+        pipe.set(self.PREFIX + key, data, ex=self.ttl)
+        pipe.zadd(self.LRU_KEY, {key: time.time()})
+        pipe.hget(self.SIZES_KEY, key)
+        pipe.hset(self.SIZES_KEY, key, len(data))
+        old_size = pipe.execute()[2]
+        total = self.redis.incrby(self.BYTES_KEY, len(data) - int(old_size or 0))
+        if total > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used tiles until under the cap (expired keys sort first)"""
+        removed = 0
+        target = self.max_bytes * EVICT_TARGET
+        while int(self.redis.get(self.BYTES_KEY) or 0) > target:
+            victims = [k.decode() for k in self.redis.zrange(self.LRU_KEY, 0, 99)]
+            if not victims:
+                self.redis.set(self.BYTES_KEY, 0)
+                break
+            sizes = self.redis.hmget(self.SIZES_KEY, victims)
+            pipe = self.redis.pipeline()
+            pipe.delete(*[self.PREFIX + k for k in victims])
+            pipe.zrem(self.LRU_KEY, *victims)
+            pipe.hdel(self.SIZES_KEY, *victims)
+            pipe.decrby(self.BYTES_KEY, sum(int(s or 0) for s in sizes))
+            pipe.execute()
+            removed += len(victims)
+        return removed
+
+    def usage(self):
+        return {'entries': self.redis.zcard(self.LRU_KEY), 'bytes': int(self.redis.get(self.BYTES_KEY) or 0)}
+
+    def clear(self):
+        keys = [k.decode() for k in self.redis.zrange(self.LRU_KEY, 0, -1)]
+        for start in range(0, len(keys), 1000):
+            self.redis.delete(*[self.PREFIX + k for k in keys[start:start + 1000]])
+        self.redis.delete(self.LRU_KEY, self.SIZES_KEY, self.BYTES_KEY)
+        return len(keys)
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = RedisTileStore() if TILE_CACHE_BACKEND == 'redis' else DiskTileStore()
+    return _store
+
+
+def data_version():
+    """Stamp of the latest GBIF load, memoized in the shared cache"""
+    from django.db import connection
+    from project_cache import get_cache
+
+    cache = get_cache()
+    version = cache.get('tile-data-version')
+    if version is None:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT max(download_date) FROM gbif_consultas.gbif_info')
+            latest = cursor.fetchone()[0]
+        version = latest.strftime('%Y%m%d%H%M%S') if latest else '0'
+        cache.set('tile-data-version', version, timeout=DATA_VERSION_TIMEOUT)
+    return version
+
+
+def valid_tipo(tipo):
+    return tipo is None or bool(TIPO_PATTERN.fullmatch(tipo))
+
+
+def tile_key(layer, z, x, y, tipo=None, version=None):
+    return f'{layer}:{tipo or "all"}:{version or data_version()}:{z}:{x}:{y}'
+
+
+def count(outcome):
+    from project_cache import get_cache
+
+    cache = get_cache()
+    key = f'tile-cache:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def cached_tile(layer, z, x, y, tipo, render):
+    """Return (data, hit) for a tile, calling render() and storing on a miss"""
+    store = get_store()
+    key = tile_key(layer, z, x, y, tipo)
+    data = store.get(key)
+    if data is not None:
+        count('hits')
+        return data, True
+    count('misses')
+    data = render()
+    store.set(key, data)
+    return data, False
+
+
+def cache_stats():
+    from project_cache import get_cache
+
+    cache = get_cache()
+    hits = cache.get('tile-cache:hits', 0)
+    misses = cache.get('tile-cache:misses', 0)
+    stats = {
+        'backend': TILE_CACHE_BACKEND,
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        'max_bytes': get_store().max_bytes,
+        'ttl': get_store().ttl,
+    }
+    stats.update(get_store().usage())
+    return stats
+
+
+def colombia_bounds():
+    """(xmin, ymin, xmax, ymax) in degrees from the department extents"""
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute('''
+            SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e)
+            FROM (SELECT ST_Extent(ST_Transform(geom, 4326)) AS e FROM capas_base.dpto_politico) extent
+        ''')
+        return cursor.fetchone()
+
+
+def tile_range(bounds, z):
+    """Inclusive x/y tile ranges covering lon/lat bounds at zoom z"""
+    xmin, ymin, xmax, ymax = bounds
+    n = 2 ** z
+
+    def tile_x(lon):
+        return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+    def tile_y(lat):
+        lat = math.radians(max(-85.0511, min(85.0511, lat)))
+        return min(n - 1, max(0, int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n)))
+
+    return range(tile_x(xmin), tile_x(xmax) + 1), range(tile_y(ymax), tile_y(ymin) + 1)
+
+
+def seed(layers, min_zoom, max_zoom, tipo=None):
+    """Render and store every tile over Colombia for the zoom range"""
+    from gis_api import fetch_tile
+
+    store = get_store()
+    bounds = colombia_bounds()
+    version = data_version()
+    rendered = skipped = 0
+    for z in range(min_zoom, max_zoom + 1):
+        xs, ys = tile_range(bounds, z)
+        for layer in layers:
+            for x in xs:
+                for y in ys:
+                    key = tile_key(layer, z, x, y, tipo, version)
+                    if store.get(key) is not None:
+                        skipped += 1
+                        continue
+                    store.set(key, fetch_tile(layer, z, x, y, tipo))
+                    rendered += 1
+        print(f'   z{z}: {len(xs) * len(ys) * len(layers)} tiles')
+    store.evict()
+    return rendered, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the persistent tile cache')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help='pre-render tiles over Colombia')
+    seed_parser.add_argument('--min-zoom', type=int, default=0)
+    seed_parser.add_argument('--max-zoom', type=int, default=10)
+    seed_parser.add_argument('--layers', nargs='+', default=['departamentos', 'municipios'])
+    seed_parser.add_argument('--tipo', default=None)
+    subparsers.add_parser('stats', help='print hit/miss counters and store usage')
+    subparsers.add_parser('clear', help='remove every cached tile')
+    args = parser.parse_args()
+
+    from django_env import setup_django
+    setup_django()
+
+    if args.command == 'seed':
+        print(f'🌱 Seeding z{args.min_zoom}-z{args.max_zoom} for {", ".join(args.layers)}...')
+        rendered, skipped = seed(args.layers, args.min_zoom, args.max_zoom, args.tipo)
+        print(f'✅ {rendered} tiles rendered, {skipped} already cached')
+    elif args.command == 'stats':
+        print(json.dumps(cache_stats(), indent=2))
+    else:
+        print(f'✅ {get_store().clear()} tiles removed')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+TopoJSON encoding of polygon FeatureCollections (shared arcs + quantization)
+
+Neighbouring municipalities repeat every border twice in GeoJSON, each with
+15-digit coordinates. TopoJSON stores each border once as an arc referenced
+by both polygons, and quantizes coordinates to an integer grid of
+`quantization` steps per axis with delta encoding, which typically brings
+Colombia-wide boundary layers down by an order of magnitude.
+
+The encoder follows the reference topojson steps: quantize, find junctions
+(points where rings meet with different neighbours), cut rings at the
+junctions and deduplicate the resulting arcs, forwards or reversed. Shared
+borders only collapse into one arc when both sides have identical vertices,
+as with the originals and ST_CoverageSimplify levels (simplified_geometries.sql).
+
+    GET /api/features/{dataset}.topojson[?quantization=1e5][&zoom=|&bbox=]
+
+served by gis_api.py, cached by geojson_features.topojson_collection().
+"""
+import math
+
+DEFAULT_QUANTIZATION = 100000
+MIN_QUANTIZATION = 1000
+MAX_QUANTIZATION = 10000000
+
+
+def _polygons(geometry):
+    if not geometry:
+        return None
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    raise ValueError(f'TopoJSON encoding supports polygons only, got {geometry["type"]}')
+
+
+def _bounds(features):
+    xmin = ymin = math.inf
+    xmax = ymax = -math.inf
+    for _, geometry in features:
+        for polygon in _polygons(geometry) or ():
+            for ring in polygon:
+                for x, y, *_ in ring:
+                    xmin, xmax = min(xmin, x), max(xmax, x)
+                    ymin, ymax = min(ymin, y), max(ymax, y)
+    if xmin > xmax:
+        return 0.0, 0.0, 0.0, 0.0
+    return xmin, ymin, xmax, ymax
+
+
+def _quantize_ring(ring, x0, y0, kx, ky):
+    """Open ring (last point not repeated) on the integer grid, or None if degenerate"""
+    points = []
+    for x, y, *_ in ring:
+        point = (round((x - x0) * kx), round((y - y0) * ky))
+        if not points or points[-1] != point:
+            points.append(point)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points if len(points) >= 3 else None
+
+
+def _junctions(rings):
+    """Points where rings meet with different neighbours"""
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring)
+        for i, point in enumerate(ring):
+            pair = frozenset((ring[i - 1], ring[(i + 1) % n]))
+            seen = neighbours.setdefault(point, pair)
+            if seen != pair:
+                junctions.add(point)
+    return junctions
+
+
+class _Arcs:
+    """Deduplicated arcs; index() returns i for a known arc and ~i for its reverse"""
+
+    def __init__(self):
+        self.arcs = []
+        self.index_of = {}
+
+    def index(self, arc):
+        key = tuple(arc)
+        if key in self.index_of:
+            return self.index_of[key]
+        reverse = key[::-1]
+        if reverse in self.index_of:
+            return ~self.index_of[reverse]
+        self.index_of[key] = len(self.arcs)
+        self.arcs.append(key)
+        return len(self.arcs) - 1
+
+    def encoded(self):
+        """Delta-encoded arcs"""
+        result = []
+        for arc in self.arcs:
+            px, py = 0, 0
+            deltas = []
+            for x, y in arc:
+                deltas.append([x - px, y - py])
+                px, py = x, y
+            result.append(deltas)
+        return result
+
+
+def _ring_arcs(ring, junctions, arcs):
+    cuts = [i for i, point in enumerate(ring) if point in junctions]
+    if not cuts:
+        # Closed loop without junctions (islands, enclaves): canonical start at the smallest point
+        start = ring.index(min(ring))
+        loop = ring[start:] + ring[:start]
+        return [arcs.index(loop + [loop[0]])]
+
+    rotated = ring[cuts[0]:] + ring[:cuts[0]]
+    offsets = [i - cuts[0] for i in cuts] + [len(ring)]
+    closed = rotated + [rotated[0]]
+    return [arcs.index(closed[a:b + 1]) for a, b in zip(offsets, offsets[1:])]
+
+
+def build_topology(features, object_name='features', quantization=DEFAULT_QUANTIZATION):
+    """TopoJSON Topology from (properties, GeoJSON geometry) pairs"""
+    xmin, ymin, xmax, ymax = _bounds(features)
+    kx = (quantization - 1) / (xmax - xmin) if xmax > xmin else 1.0
+    ky = (quantization - 1) / (ymax - ymin) if ymax > ymin else 1.0
+
+    quantized = []
+    for properties, geometry in features:
+        polygons = []
+        for polygon in _polygons(geometry) or ():
+            rings = [_quantize_ring(ring, xmin, ymin, kx, ky) for ring in polygon]
+            if rings and rings[0]:
+                polygons.append([ring for ring in rings if ring])
+        quantized.append((properties, geometry['type'] if geometry else None, polygons))
+
+    junctions = _junctions(ring for _, _, polygons in quantized for polygon in polygons for ring in polygon)
+    arcs = _Arcs()
+    geometries = []
+    for properties, kind, polygons in quantized:
+        encoded = [[_ring_arcs(ring, junctions, arcs) for ring in polygon] for polygon in polygons]
+        if not encoded:
+            geometries.append({'type': None, 'properties': properties})
+        elif kind == 'Polygon' and len(encoded) == 1:
+            geometries.append({'type': 'Polygon', 'arcs': encoded[0], 'properties': properties})
+        else:
+            geometries.append({'type': 'MultiPolygon', 'arcs': encoded, 'properties': properties})
+
+    return {
+        'type': 'Topology',
+        'bbox': [xmin, ymin, xmax, ymax],
+        'transform': {'scale': [1 / kx, 1 / ky], 'translate': [xmin, ymin]},
+        'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs.encoded(),
+    }
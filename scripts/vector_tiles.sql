@@ -0,0 +1,144 @@
+-- ============================================================================
+-- Vector Tiles (MVT) for Departments and Municipalities
+-- Visor I2D Humboldt Project
+-- PostgreSQL 16 + PostGIS 3.4
+-- ============================================================================
+-- Serves capas_base.dpto_politico / capas_base.mpio_politico as Mapbox Vector
+-- Tiles with GBIF statistics attached (registers, species, endemicas,
+-- exoticas, amenazadas), so the visor can style choropleths client-side.
+--
+-- Used by GET /api/tiles/{layer}/{z}/{x}/{y}.mvt (scripts/gis_api.py)
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < vector_tiles.sql
+-- Requires the GIST indexes from optimize_database.sql
+
+\echo '========================================='
+\echo 'Installing vector tile functions'
+\echo '========================================='
+
+-- ============================================================================
+-- 1. TILE LAYER REGISTRY
+-- ============================================================================
+-- Maps the public layer name to its boundary table and statistics tables
+
+CREATE OR REPLACE FUNCTION capas_base.mvt_layer_tables(p_layer text,
+    OUT boundary_table text, OUT queries_table text, OUT amenazas_table text)
+AS $$
+BEGIN
+    CASE p_layer
+        WHEN 'departamentos' THEN
+            boundary_table := 'capas_base.dpto_politico';
+            queries_table := 'gbif_consultas.dpto_queries';
+            amenazas_table := 'gbif_consultas.dpto_amenazas';
+        WHEN 'municipios' THEN
+            boundary_table := 'capas_base.mpio_politico';
+            queries_table := 'gbif_consultas.mpio_queries';
+            amenazas_table := 'gbif_consultas.mpio_amenazas';
+        ELSE
+            RAISE EXCEPTION 'Unknown tile layer: %', p_layer USING ERRCODE = 'invalid_parameter_value';
+    END CASE;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- ============================================================================
+-- 2. TILE FUNCTION
+-- ============================================================================
+-- p_tipo NULL sums the statistics of every tipo; otherwise only that tipo,
+-- in both *_queries and *_amenazas (they share the tipo codes).
+-- Statistics are only aggregated for the codigos of the features in the
+-- tile, after the bbox filter, so a tile costs the same however large the
+-- statistics tables grow. Rows are filtered on tipo IS NOT NULL to match
+-- the partial (codigo, tipo) indexes.
+-- Geometries come from the precomputed level for the zoom in
+-- capas_base.simplified_geoms (simplified_geometries.sql) when it is
+-- installed and filled; otherwise the originals are simplified to one tile
+-- pixel (extent 4096) on the fly. The bbox filter runs in the data SRID (4326)
+-- so the GIST index on geom is used.
+
+\echo '1. Creating capas_base.mvt_tile()...'
+
+CREATE OR REPLACE FUNCTION capas_base.mvt_tile(p_layer text, z integer, x integer, y integer,
+                                               p_tipo text DEFAULT NULL)
+RETURNS bytea AS $$
+DECLARE
+    tables RECORD;
+    bounds geometry := ST_TileEnvelope(z, x, y);
+    tolerance double precision := 0;
+    level smallint := 0;
+    source text;
+    tile bytea;
+BEGIN
+    IF z < 0 OR z > 22 OR x < 0 OR y < 0 OR x >= (1 << z) OR y >= (1 << z) THEN
+        RAISE EXCEPTION 'Invalid tile %/%/%', z, x, y USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+
+    tables := capas_base.mvt_layer_tables(p_layer);
+
+    IF to_regclass('capas_base.simplified_geoms') IS NOT NULL THEN
+        level := capas_base.geom_level_for_zoom(z);
+        IF level > 0 AND NOT EXISTS (
+            SELECT 1 FROM capas_base.simplified_geoms sg WHERE sg.layer = p_layer AND sg.level = mvt_tile.level
+        ) THEN
+            level := 0;
+        END IF;
+    END IF;
+
+    IF level > 0 THEN
+        source := format(
+            '(SELECT b.codigo, b.nombre, sg.geom FROM capas_base.simplified_geoms sg '
+            'JOIN %s b ON b.codigo = sg.codigo WHERE sg.layer = %L AND sg.level = %s)',
+            tables.boundary_table, p_layer, level);
+    ELSE
+        source := tables.boundary_table;
+        tolerance := (ST_XMax(bounds) - ST_XMin(bounds)) / 4096;
+    END IF;
+
+    EXECUTE format($q$
+        WITH in_tile AS (
+            SELECT b.codigo, b.nombre, b.geom
+            FROM %1$s b
+            WHERE b.geom && ST_Transform($1, 4326)
+        ),
+        stats AS (
+            SELECT q.codigo,
+                   SUM(q.registers) AS registers, SUM(q.species) AS species,
+                   SUM(q.endemicas) AS endemicas, SUM(q.exoticas) AS exoticas
+            FROM %2$s q
+            WHERE q.codigo IN (SELECT codigo FROM in_tile)
+              AND q.tipo IS NOT NULL AND ($3 IS NULL OR q.tipo = $3)
+            GROUP BY q.codigo
+        ),
+        threats AS (
+            SELECT a.codigo, SUM(a.amenazadas) AS amenazadas
+            FROM %3$s a
+            WHERE a.codigo IN (SELECT codigo FROM in_tile)
+              AND a.tipo IS NOT NULL AND ($3 IS NULL OR a.tipo = $3)
+            GROUP BY a.codigo
+        ),
+        features AS (
+            SELECT b.codigo, b.nombre,
+                   s.registers, s.species, s.endemicas, s.exoticas, t.amenazadas,
+                   ST_AsMVTGeom(
+                       CASE WHEN $2 > 0 THEN ST_SimplifyPreserveTopology(ST_Transform(b.geom, 3857), $2)
+                            ELSE ST_Transform(b.geom, 3857) END,
+                       $1, 4096, 64, true
+                   ) AS geom
+            FROM in_tile b
+            LEFT JOIN stats s ON s.codigo = b.codigo
+            LEFT JOIN threats t ON t.codigo = b.codigo
+        )
+        SELECT ST_AsMVT(features, %4$L, 4096, 'geom')
+        FROM features
+        WHERE geom IS NOT NULL
+    $q$, source, tables.queries_table, tables.amenazas_table, p_layer)
+    INTO tile
+    USING bounds, tolerance, p_tipo;
+
+    RETURN COALESCE(tile, ''::bytea);
+END;
+$$ LANGUAGE plpgsql STABLE PARALLEL SAFE;
+
+\echo '✓ Vector tile functions installed'
+\echo ''
+\echo 'Test with:'
+\echo '  SELECT length(capas_base.mvt_tile(''departamentos'', 5, 9, 15));'
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Precomputed visor bundles: one static JSON artifact per project
+
+A bundle holds everything the visor needs to render a project (project
+settings plus the complete group/layer tree with colors) so the page loads it
+in a single request instead of /api/projects/by-name/ + /layer-groups/.
+
+Files written to BUNDLE_DIR (media_volume, served by nginx at /media/visor_bundles/):
+
+    {nombre_corto}.{hash}.json      content-addressed bundle (immutable)
+    {nombre_corto}.{hash}.json.gz   pre-gzipped, picked up by gzip_static
+    {nombre_corto}.{hash}.json.br   pre-brotli'd (only when `brotli` is installed)
+    {nombre_corto}.json             small manifest pointing at the current hash
+
+Usage:
+    cd visor-geografico-I2D-backend
+    python ../scripts/visor_bundle.py                 # rebuild all projects
+    python ../scripts/visor_bundle.py ecoreservas     # rebuild one project
+    python ../scripts/visor_bundle.py --watch         # rebuild on every change
+
+--watch listens on the `visor_bundle` PostgreSQL channel fed by the triggers in
+visor_bundle_triggers.sql, so admin edits, bulk loaders and SQL scripts all
+trigger a rebuild.
+"""
+import gzip
+import hashlib
+import json
+import os
+import select
+import sys
+import time
+
+from django_env import setup_django
+setup_django()
+
+from django.conf import settings
+from django.db import connection
+from applications.projects.models import Project
+from layer_tree import fetch_layer_tree
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLE_DIR = os.getenv('VISOR_BUNDLE_DIR') or os.path.join(str(settings.MEDIA_ROOT), 'visor_bundles')
+BUNDLE_URL = settings.MEDIA_URL.rstrip('/') + '/visor_bundles/'
+CHANNEL = 'visor_bundle'
+HASH_LENGTH = 16
+DEBOUNCE_SECONDS = 1.0
+
+PROJECT_FIELDS = ('id', 'nombre_corto', 'nombre', 'logo_pequeno_url', 'logo_completo_url',
+                  'nivel_zoom', 'coordenada_central_x', 'coordenada_central_y',
+                  'panel_visible', 'base_map_visible')
+
+
+def build_bundle(project):
+    """Bundle payload for one project"""
+    return {
+        'project': {field: getattr(project, field) for field in PROJECT_FIELDS},
+        'layer_groups': fetch_layer_tree(project.id),
+    }
+
+
+def write_atomic(path, content):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def remove_bundles(nombre_corto, keep=None):
+    """Delete the files of older bundle versions of a project"""
+    prefix = f'{nombre_corto}.'
+    for filename in os.listdir(BUNDLE_DIR):
+        name = filename.split('.json')[0]
+        if not filename.startswith(prefix) or name.count('.') != 1:
+            continue
+        if keep is None or name != f'{nombre_corto}.{keep}':
+            os.remove(os.path.join(BUNDLE_DIR, filename))
+
+
+def publish_bundle(project):
+    """Write the bundle of a project and return its public URL"""
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+
+    content = json.dumps(build_bundle(project), ensure_ascii=False,
+                         separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    basename = f'{project.nombre_corto}.{digest}.json'
+    path = os.path.join(BUNDLE_DIR, basename)
+
+    if not os.path.exists(path):
+        write_atomic(f'{path}.gz', gzip.compress(content, compresslevel=9))
+        if brotli is not None:
+            write_atomic(f'{path}.br', brotli.compress(content, quality=11))
+        write_atomic(path, content)
+
+    url = BUNDLE_URL + basename
+    manifest = {'nombre_corto': project.nombre_corto, 'hash': digest, 'url': url, 'size': len(content)}
+    write_atomic(os.path.join(BUNDLE_DIR, f'{project.nombre_corto}.json'),
+                 json.dumps(manifest).encode('utf-8'))
+    remove_bundles(project.nombre_corto, keep=digest)
+    return url
+
+
+def rebuild(project_ids=None):
+    """Rebuild bundles for the given project ids (all projects when None)"""
+    projects = Project.objects.all()
+    if project_ids is not None:
+        projects = projects.filter(id__in=project_ids)
+
+    for project in projects:
+        url = publish_bundle(project)
+        print(f'✅ {project.nombre_corto}: {url}')
+
+
+def watch():
+    """Rebuild bundles whenever the triggers notify a project change"""
+    import psycopg2.extensions
+
+    rebuild()
+
+    connection.ensure_connection()
+    conn = connection.connection
+    conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    with conn.cursor() as cursor:
+        cursor.execute(f'LISTEN {CHANNEL}')
+    print(f'👂 Listening on channel {CHANNEL}...')
+
+    while True:
+        if select.select([conn], [], [], 60) == ([], [], []):
+            continue
+        # Collect a burst of notifications (bulk loads) before rebuilding
+        pending = set()
+        deadline = time.monotonic() + DEBOUNCE_SECONDS
+        while True:
+            conn.poll()
+            while conn.notifies:
+                pending.add(int(conn.notifies.pop(0).payload))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or select.select([conn], [], [], remaining) == ([], [], []):
+                break
+
+        existing = set(Project.objects.filter(id__in=pending).values_list('id', flat=True))
+        rebuild(existing)
+        if existing != pending:
+            # Deleted projects: drop bundles whose manifest has no project left
+            names = set(Project.objects.values_list('nombre_corto', flat=True))
+            for filename in os.listdir(BUNDLE_DIR):
+                name = filename.split('.')[0]
+                if filename.endswith('.json') and filename.count('.') == 1 and name not in names:
+                    remove_bundles(name)
+                    os.remove(os.path.join(BUNDLE_DIR, filename))
+                    print(f'🗑️  {name}: bundle removed')
+
+
+def main():
+    args = sys.argv[1:]
+    if args == ['--watch']:
+        watch()
+        return 0
+
+    if args:
+        ids = list(Project.objects.filter(nombre_corto__in=args).values_list('id', flat=True))
+        if not ids:
+            print(f'❌ Project not found: {", ".join(args)}')
+            return 1
+        rebuild(ids)
+    else:
+        rebuild()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+-- ============================================================================
+-- Visor Bundle Change Notifications
+-- Visor I2D Humboldt Project
+-- ============================================================================
+-- Emits NOTIFY visor_bundle, '<project_id>' whenever a project, layer group
+-- or layer changes, so `scripts/visor_bundle.py --watch` rebuilds the
+-- precomputed bundle of that project. Works for Django admin edits, bulk
+-- loaders and plain SQL scripts alike.
+--
+-- Run with: docker exec -i visor_i2d_db psql -U i2d_user -d i2d_db < visor_bundle_triggers.sql
+
+\echo 'Installing visor bundle notification triggers...'
+
+CREATE OR REPLACE FUNCTION django.notify_visor_bundle() RETURNS trigger AS $$
+DECLARE
+    row_data RECORD;
+    project_id INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_data := OLD;
+    ELSE
+        row_data := NEW;
+    END IF;
+
+    IF TG_TABLE_NAME = 'projects' THEN
+        project_id := row_data.id;
+    ELSIF TG_TABLE_NAME = 'layer_groups' THEN
+        project_id := row_data.proyecto_id;
+    ELSE
+        SELECT lg.proyecto_id INTO project_id
+        FROM django.layer_groups lg
+        WHERE lg.id = row_data.grupo_id;
+    END IF;
+
+    -- Identical payloads are folded into one notification per transaction
+    IF project_id IS NOT NULL THEN
+        PERFORM pg_notify('visor_bundle', project_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_projects_visor_bundle ON django.projects;
+CREATE TRIGGER trg_projects_visor_bundle
+    AFTER INSERT OR UPDATE OR DELETE ON django.projects
+    FOR EACH ROW EXECUTE FUNCTION django.notify_visor_bundle();
+
+DROP TRIGGER IF EXISTS trg_layer_groups_visor_bundle ON django.layer_groups;
+CREATE TRIGGER trg_layer_groups_visor_bundle
+    AFTER INSERT OR UPDATE OR DELETE ON django.layer_groups
+    FOR EACH ROW EXECUTE FUNCTION django.notify_visor_bundle();
+
+DROP TRIGGER IF EXISTS trg_layers_visor_bundle ON django.layers;
+CREATE TRIGGER trg_layers_visor_bundle
+    AFTER INSERT OR UPDATE OR DELETE ON django.layers
+    FOR EACH ROW EXECUTE FUNCTION django.notify_visor_bundle();
+
+\echo '✓ Visor bundle triggers installed'
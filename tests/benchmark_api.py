@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+API load-testing and latency benchmark harness
+
+Replays visor sessions against a running stack (Gunicorn directly on :8001,
+or nginx). A session opens a project (bundle manifest, project by name,
+layer-groups), types a municipality in the search box one keystroke at a time,
+opens area statistics, identifies a point on the map, loads a few tiles and
+downloads a small export. --users sessions run concurrently, each on its own
+keep-alive connection, after --warmup sessions that are not recorded.
+
+Per step it reports p50/p95/p99/mean latency, errors and DB queries per
+request (from the `db` entry of the Server-Timing header sent by
+scripts/request_timing.py for sampled requests; --timing-token asks for every
+request to be sampled), plus overall throughput. Results are written as JSON to
+tests/benchmark_results/ with the git commit, so runs can be compared across
+commits; --baseline compares against an earlier result file (or `latest`) and
+exits with status 1 when any step's --metric grew by more than --threshold.
+
+Sessions are drawn from a seeded random generator, so the same --seed replays
+the same requests.
+
+Usage:
+    python3 tests/benchmark_api.py [--base-url http://localhost:8001] [--project general]
+        [--users 10] [--sessions 50] [--warmup 5] [--seed 1] [--timing-token TOKEN]
+        [--baseline latest] [--metric p95] [--threshold 0.2]
+
+Run with (unit tests of the statistics helpers):
+    python3 -m unittest tests.test_benchmark_api
+"""
+import argparse
+import glob
+import http.client
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_results')
+PERCENTILES = (50, 95, 99)
+# Regressions smaller than this (ms) are treated as noise whatever the ratio
+MIN_REGRESSION_MS = 5.0
+
+SEARCH_TERMS = ('medellin', 'bogota', 'cali', 'san jose', 'leticia', 'pasto', 'villavicencio', 'santa marta')
+DPTO_CODES = ('05', '08', '11', '13', '15', '17', '19', '25', '50', '52', '68', '76', '91')
+MPIO_CODES = ('05001', '08001', '11001', '13001', '17001', '19001', '50001', '52001', '68001', '76001', '91001')
+# lon, lat inside Colombia
+POINTS = ((-75.56, 6.25), (-74.08, 4.61), (-76.53, 3.45), (-69.94, -4.21), (-73.63, 4.14), (-74.2, 11.24))
+
+
+def percentile(sorted_values, p):
+    """Linear-interpolated percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def parse_server_timing(header):
+    """{name: {'dur': ms, 'desc': str}} from a Server-Timing header"""
+    metrics = {}
+    for entry in (header or '').split(','):
+        parts = [part.strip() for part in entry.split(';')]
+        if not parts[0]:
+            continue
+        metric = {}
+        for param in parts[1:]:
+            key, _, value = param.partition('=')
+            metric[key.strip()] = value.strip().strip('"')
+        if 'dur' in metric:
+            try:
+                metric['dur'] = float(metric['dur'])
+            except ValueError:
+                del metric['dur']
+        metrics[parts[0]] = metric
+    return metrics
+
+
+def db_queries(header):
+    """Query count from `db;desc="N queries"`, or None"""
+    match = re.match(r'\s*(\d+)', parse_server_timing(header).get('db', {}).get('desc', ''))
+    return int(match.group(1)) if match else None
+
+
+def tile_for(lon, lat, z):
+    n = 2 ** z
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return x, y
+
+
+def build_session(rng, project, project_id):
+    """(step, path) pairs of one visor session"""
+    steps = [
+        ('bundle_manifest', f'/media/visor_bundles/{project}.json'),
+        ('project_by_name', f'/api/projects/by-name/{project}/'),
+        ('layer_groups', f'/api/projects/{project_id}/layer-groups/'),
+    ]
+
+    term = rng.choice(SEARCH_TERMS)
+    for length in range(2, len(term) + 1):
+        steps.append(('autocomplete', f'/api/autocomplete?q={urllib.parse.quote(term[:length])}'))
+    steps.append(('search_municipios', f'/api/search/municipios?q={urllib.parse.quote(term)}'))
+
+    steps.append(('area_stats', f'/api/areas/mpio/{rng.choice(MPIO_CODES)}/stats'))
+    steps.append(('area_extent', f'/api/areas/{rng.choice(DPTO_CODES)}/extent'))
+    codigos = ','.join(rng.sample(DPTO_CODES, 5))
+    steps.append(('areas_stats_batch', f'/api/areas/dpto/stats?codigos={codigos}'))
+
+    lon, lat = rng.choice(POINTS)
+    steps.append(('identify', f'/api/identify?lon={lon}&lat={lat}'))
+    for z in (5, 7, 9):
+        x, y = tile_for(lon, lat, z)
+        steps.append(('tile', f'/api/tiles/municipios/{z}/{x}/{y}.mvt'))
+
+    steps.append(('export_csv', f'/api/export/mpio_queries.csv?codigos={rng.choice(MPIO_CODES)}'))
+    return steps
+
+
+class Client:
+    """One keep-alive connection per virtual user"""
+
+    def __init__(self, base_url, timeout, timing_token=None):
+        parsed = urllib.parse.urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parsed.netloc, timeout=timeout)
+        self.prefix = parsed.path.rstrip('/')
+        self.headers = {'Accept-Encoding': 'gzip'}
+        if timing_token:
+            self.headers['X-Request-Timing'] = timing_token
+
+    def get(self, path):
+        """(status, elapsed ms, db queries or None)"""
+        started = time.perf_counter()
+        try:
+            self.connection.request('GET', self.prefix + path, headers=self.headers)
+            response = self.connection.getresponse()
+            response.read()
+            status = response.status
+            queries = db_queries(response.getheader('Server-Timing'))
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            status, queries = 0, None
+        return status, (time.perf_counter() - started) * 1000, queries
+
+    def close(self):
+        self.connection.close()
+
+
+def resolve_project_id(base_url, project, timeout):
+    client = Client(base_url, timeout)
+    try:
+        client.connection.request('GET', f'{client.prefix}/api/projects/by-name/{project}/')
+        response = client.connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f'/api/projects/by-name/{project}/ returned {response.status}')
+        return json.loads(body)['id']
+    finally:
+        client.close()
+
+
+def run(args):
+    """Warm up, then replay the sessions; returns the result document"""
+    project_id = resolve_project_id(args.base_url, args.project, args.timeout)
+    rng = random.Random(args.seed)
+    warmup = [build_session(rng, args.project, project_id) for _ in range(args.warmup)]
+    sessions = [build_session(rng, args.project, project_id) for _ in range(args.sessions)]
+
+    samples = []
+    lock = threading.Lock()
+    local = threading.local()
+
+    def replay(session, record):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client(args.base_url, args.timeout, args.timing_token)
+        for step, path in session:
+            status, elapsed, queries = client.get(path)
+            if record:
+                with lock:
+                    samples.append((step, status, elapsed, queries))
+
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        list(pool.map(lambda session: replay(session, False), warmup))
+        started = time.perf_counter()
+        list(pool.map(lambda session: replay(session, True), sessions))
+        wall = time.perf_counter() - started
+
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'config': {key: getattr(args, key) for key in
+                   ('base_url', 'project', 'users', 'sessions', 'warmup', 'seed')},
+        'wall_seconds': round(wall, 3),
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / wall, 1) if wall else None,
+        'steps': summarize(samples),
+    }
+
+
+def summarize(samples):
+    """Per-step latency percentiles, errors and DB queries"""
+    steps = {}
+    for step in dict.fromkeys(step for step, *_ in samples):
+        rows = [(status, elapsed, queries) for name, status, elapsed, queries in samples if name == step]
+        latencies = sorted(elapsed for _, elapsed, _ in rows)
+        queries = sorted(q for _, _, q in rows if q is not None)
+        summary = {
+            'count': len(rows),
+            'errors': sum(1 for status, _, _ in rows if not 200 <= status < 400),
+            'mean': round(sum(latencies) / len(latencies), 2),
+        }
+        for p in PERCENTILES:
+            summary[f'p{p}'] = round(percentile(latencies, p), 2)
+        summary['db_queries'] = percentile(queries, 50) if queries else None
+        steps[step] = summary
+    return steps
+
+
+def compare(current, baseline, metric='p95', threshold=0.2, min_ms=MIN_REGRESSION_MS):
+    """Steps whose metric regressed beyond threshold: [(step, before, after)]"""
+    regressions = []
+    for step, summary in current['steps'].items():
+        before = baseline.get('steps', {}).get(step, {}).get(metric)
+        after = summary.get(metric)
+        if before is None or after is None:
+            continue
+        if after > before * (1 + threshold) and after - before > min_ms:
+            regressions.append((step, before, after))
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latest_result():
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+    return paths[-1] if paths else None
+
+
+def print_report(result):
+    print(f'\n📊 {result["requests"]} requests in {result["wall_seconds"]}s '
+          f'({result["throughput_rps"]} req/s, {result["config"]["users"]} users)')
+    print(f'{"step":<20} {"count":>6} {"err":>4} {"p50":>8} {"p95":>8} {"p99":>8} {"mean":>8} {"queries":>8}')
+    for step, s in result['steps'].items():
+        queries = '-' if s['db_queries'] is None else f'{s["db_queries"]:g}'
+        print(f'{step:<20} {s["count"]:>6} {s["errors"]:>4} {s["p50"]:>8} {s["p95"]:>8} {s["p99"]:>8} '
+              f'{s["mean"]:>8} {queries:>8}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay visor sessions and measure API latency')
+    parser.add_argument('--base-url', default='http://localhost:8001')
+    parser.add_argument('--project', default='general', help='nombre_corto of the project to open')
+    parser.add_argument('--users', type=int, default=10, help='concurrent sessions')
+    parser.add_argument('--sessions', type=int, default=50, help='recorded sessions')
+    parser.add_argument('--warmup', type=int, default=5, help='sessions replayed before recording')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--timing-token', help='REQUEST_TIMING_TOKEN of the backend, to sample every request')
+    parser.add_argument('--output', help='result file (default: tests/benchmark_results/<time>-<commit>.json)')
+    parser.add_argument('--baseline', help='result file to compare against, or "latest"')
+    parser.add_argument('--metric', default='p95', choices=[f'p{p}' for p in PERCENTILES] + ['mean'])
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative growth (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    baseline_path = latest_result() if args.baseline == 'latest' else args.baseline
+
+    try:
+        result = run(args)
+    except (OSError, RuntimeError) as e:
+        print(f'❌ Cannot reach {args.base_url}: {e}')
+        return 2
+    print_report(result)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIR, f'{stamp}-{result["commit"] or "nogit"}.json')
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'💾 Results written to {output}')
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.metric, args.threshold)
+        print(f'\n🔍 Compared with {os.path.basename(baseline_path)} (commit {baseline.get("commit")}), '
+              f'{args.metric} threshold +{args.threshold:.0%}')
+        for step, before, after in regressions:
+            print(f'❌ {step}: {before} ms -> {after} ms')
+        if regressions:
+            return 1
+        print('✅ No regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Tests for the geometry normalization behind area aggregation (scripts/area_aggregation.py)
+
+Run with:
+    python3 -m unittest tests.test_area_aggregation
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from area_aggregation import bbox_polygon, geometry_hash, normalize_geometry
+
+SQUARE = [[-75.7, 6.1], [-75.4, 6.1], [-75.4, 6.4], [-75.7, 6.4], [-75.7, 6.1]]
+
+
+class NormalizeGeometryTests(unittest.TestCase):
+
+    def hash_of(self, geojson):
+        return geometry_hash(normalize_geometry(geojson))
+
+    def test_bbox_matches_drawn_polygon(self):
+        drawn = {'type': 'Polygon', 'coordinates': [SQUARE]}
+        self.assertEqual(self.hash_of(bbox_polygon('-75.7,6.1,-75.4,6.4')), self.hash_of(drawn))
+
+    def test_start_vertex_orientation_and_precision_do_not_matter(self):
+        rotated = SQUARE[2:-1] + SQUARE[:3]
+        clockwise = list(reversed(SQUARE))
+        noisy = [[x + 1e-9, y] for x, y in SQUARE]
+        expected = self.hash_of({'type': 'Polygon', 'coordinates': [SQUARE]})
+        for ring in (rotated, clockwise, noisy):
+            self.assertEqual(self.hash_of({'type': 'Polygon', 'coordinates': [ring]}), expected)
+
+    def test_feature_and_multipolygon_fold_together(self):
+        feature = {'type': 'Feature', 'properties': {}, 'geometry': {'type': 'Polygon', 'coordinates': [SQUARE]}}
+        multi = {'type': 'MultiPolygon', 'coordinates': [[SQUARE]]}
+        self.assertEqual(self.hash_of(feature), self.hash_of(multi))
+
+    def test_exterior_ring_is_counterclockwise(self):
+        ring = normalize_geometry({'type': 'Polygon', 'coordinates': [list(reversed(SQUARE))]})['coordinates'][0][0]
+        area = sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:]))
+        self.assertGreater(area, 0)
+        self.assertEqual(ring[0], ring[-1])
+
+    def test_rejects_invalid_input(self):
+        for geojson in ({'type': 'Point', 'coordinates': [0, 0]},
+                        {'type': 'Polygon', 'coordinates': [[[0, 0], [1, 1], [0, 0]]]},
+                        {'type': 'Polygon', 'coordinates': 'x'}):
+            with self.assertRaises(ValueError):
+                normalize_geometry(geojson)
+        with self.assertRaises(ValueError):
+            bbox_polygon('1,2,0,3')
+
+    def test_rejects_non_finite_coordinates(self):
+        for bbox in ('nan,0,1,1', '-inf,0,1,1', '0,0,inf,1'):
+            with self.assertRaises(ValueError):
+                bbox_polygon(bbox)
+        with self.assertRaises(ValueError):
+            normalize_geometry({'type': 'Polygon',
+                                'coordinates': [[[0, 0], [1, 0], [float('nan'), 1], [0, 1], [0, 0]]]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Tests for the columnar export helpers (scripts/arrow_export.py)
+
+Run with (needs pyarrow):
+    python3 -m unittest tests.test_arrow_export
+"""
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+import arrow_export
+
+WKB_POINT = bytes.fromhex('0101000000000000000000f03f0000000000000040')
+
+
+@unittest.skipUnless(arrow_export.available(), 'pyarrow not installed')
+class HexToBinaryTests(unittest.TestCase):
+
+    def test_decodes_hex_column(self):
+        pa = arrow_export.pa
+        column = pa.array([WKB_POINT.hex(), None, '', 'ff00'])
+        decoded = arrow_export.hex_to_binary(column)
+        self.assertEqual(decoded.type, pa.binary())
+        self.assertEqual(decoded.to_pylist(), [WKB_POINT, None, b'', b'\xff\x00'])
+
+    def test_decodes_sliced_column(self):
+        pa = arrow_export.pa
+        column = pa.array(['00', WKB_POINT.hex(), 'abcd'])[1:]
+        self.assertEqual(arrow_export.hex_to_binary(column).to_pylist(), [WKB_POINT, b'\xab\xcd'])
+
+    def test_csv_batches_round_trip_through_parquet(self):
+        pa = arrow_export.pa
+        source = io.BytesIO(f'codigo,registers,geom\n05001,10,{WKB_POINT.hex()}\n05002,,\n'.encode())
+        reader = arrow_export.pa_csv.open_csv(
+            source, convert_options=arrow_export.pa_csv.ConvertOptions(
+                column_types={'codigo': pa.string(), 'registers': pa.int64(), 'geom': pa.string()},
+                strings_can_be_null=True))
+        batch = reader.read_next_batch()
+        table = pa.Table.from_arrays(
+            [batch.column(0), batch.column(1), arrow_export.hex_to_binary(batch.column(2))],
+            names=['codigo', 'registers', 'geom'])
+
+        sink = io.BytesIO()
+        arrow_export.pq.write_table(table, sink)
+        result = arrow_export.pq.read_table(io.BytesIO(sink.getvalue()))
+        self.assertEqual(result.column('geom').to_pylist(), [WKB_POINT, None])
+        self.assertEqual(result.column('registers').to_pylist(), [10, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Tests for the in-process autocomplete index (scripts/autocomplete.py)
+
+Run with:
+    python3 -m unittest tests.test_autocomplete
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from autocomplete import AutocompleteIndex, normalize
+
+
+def entry(tipo, codigo, nombre, dpto_nombre=None):
+    return {'tipo': tipo, 'codigo': codigo, 'nombre': nombre, 'dpto_nombre': dpto_nombre,
+            'centroid': [-75.0, 6.0], 'bbox': [-75.5, 5.5, -74.5, 6.5]}
+
+
+ENTRIES = [
+    entry('departamento', '05', 'Antioquia'),
+    entry('departamento', '17', 'Caldas'),
+    entry('municipio', '05001', 'Medellín', 'Antioquia'),
+    entry('municipio', '05002', 'Abejorral', 'Antioquia'),
+    entry('municipio', '05004', 'Abriaquí', 'Antioquia'),
+    entry('municipio', '05658', 'San José de la Montaña', 'Antioquia'),
+    entry('municipio', '17665', 'San José', 'Caldas'),
+    entry('municipio', '95001', 'San José del Guaviare', 'Guaviare'),
+    entry('municipio', '05045', 'Apartadó', 'Antioquia'),
+]
+
+
+class AutocompleteIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.index = AutocompleteIndex(ENTRIES)
+
+    def names(self, q, limit=10):
+        return [result['nombre'] for result in self.index.search(q, limit)]
+
+    def test_normalize(self):
+        self.assertEqual(normalize('  San JOSÉ,  Caldas '), 'san jose caldas')
+
+    def test_accent_insensitive_prefix(self):
+        self.assertEqual(self.names('medel'), ['Medellín'])
+        self.assertEqual(self.names('ABRIAQUI'), ['Abriaquí'])
+
+    def test_exact_match_first(self):
+        self.assertEqual(self.names('san jose')[0], 'San José')
+
+    def test_inner_word_match(self):
+        self.assertEqual(self.names('guaviare'), ['San José del Guaviare'])
+
+    def test_municipio_departamento(self):
+        self.assertEqual(self.names('san jose, cal'), ['San José'])
+        self.assertEqual(self.names('san jose, antioquia'), ['San José de la Montaña'])
+
+    def test_departments_rank_before_municipalities(self):
+        self.assertEqual(self.names('a')[0], 'Antioquia')
+
+    def test_results_carry_centroid_and_limit(self):
+        results = self.index.search('a', limit=2)
+        self.assertEqual(len(results), 2)
+        self.assertIn('centroid', results[0])
+        self.assertIn('bbox', results[0])
+
+    def test_empty_query(self):
+        self.assertEqual(self.index.search('  '), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
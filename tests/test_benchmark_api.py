@@ -0,0 +1,68 @@
+"""
+Tests for the statistics helpers of the API benchmark harness (tests/benchmark_api.py)
+
+Run with:
+    python3 -m unittest tests.test_benchmark_api
+"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+from benchmark_api import build_session, compare, db_queries, parse_server_timing, percentile, summarize
+
+
+class PercentileTests(unittest.TestCase):
+
+    def test_interpolates(self):
+        values = [10, 20, 30, 40, 50]
+        self.assertEqual(percentile(values, 50), 30)
+        self.assertEqual(percentile(values, 0), 10)
+        self.assertEqual(percentile(values, 100), 50)
+        self.assertAlmostEqual(percentile(values, 95), 48)
+
+    def test_single_and_empty(self):
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+
+class ServerTimingTests(unittest.TestCase):
+
+    def test_parses_entries(self):
+        header = 'db;dur=12.5;desc="4 queries", app;dur=30, cache;desc="hit"'
+        metrics = parse_server_timing(header)
+        self.assertEqual(metrics['db'], {'dur': 12.5, 'desc': '4 queries'})
+        self.assertEqual(metrics['app'], {'dur': 30.0})
+        self.assertEqual(db_queries(header), 4)
+
+    def test_missing_header(self):
+        self.assertIsNone(db_queries(None))
+        self.assertIsNone(db_queries('app;dur=3'))
+
+
+class SummaryTests(unittest.TestCase):
+
+    def test_summary_and_regressions(self):
+        samples = [('search', 200, float(ms), 1) for ms in range(1, 101)] + [('tile', 500, 5.0, None)]
+        steps = summarize(samples)
+        self.assertEqual(steps['search']['count'], 100)
+        self.assertEqual(steps['search']['db_queries'], 1)
+        self.assertEqual(steps['tile']['errors'], 1)
+        self.assertIsNone(steps['tile']['db_queries'])
+
+        current = {'steps': steps}
+        baseline = {'steps': {'search': {'p95': 50.0}, 'tile': {'p95': 4.0}}}
+        # tile grew 25% but by only 1 ms: noise
+        self.assertEqual([step for step, *_ in compare(current, baseline)], ['search'])
+        self.assertEqual(compare(current, {'steps': {'search': {'p95': 95.0}}}), [])
+
+    def test_sessions_are_reproducible(self):
+        first = build_session(random.Random(3), 'general', 1)
+        second = build_session(random.Random(3), 'general', 1)
+        self.assertEqual(first, second)
+        self.assertIn(('layer_groups', '/api/projects/1/layer-groups/'), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+Tests for the export job parameters (scripts/export_jobs.py)
+
+Run with:
+    python3 -m unittest tests.test_export_jobs
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from export_jobs import job_params
+
+
+class JobParamsTests(unittest.TestCase):
+
+    def test_codigos_are_sorted_and_deduplicated(self):
+        params = job_params('mpio_queries', 'csv', ['05002', ' 05001 ', '05002', ''])
+        self.assertEqual(params['codigos'], ['05001', '05002'])
+
+    def test_string_codigos_are_split_on_commas(self):
+        self.assertEqual(job_params('mpio_queries', 'csv', '05001')['codigos'], ['05001'])
+        self.assertEqual(job_params('mpio_queries', 'csv', '05002,05001')['codigos'], ['05001', '05002'])
+
+    def test_other_codigos_types_are_rejected(self):
+        for codigos in (5, {'05001': True}):
+            with self.assertRaises(ValueError):
+                job_params('mpio_queries', 'csv', codigos)
+
+    def test_unknown_dataset_and_format(self):
+        with self.assertRaises(ValueError):
+            job_params('nope', 'csv')
+        with self.assertRaises(ValueError):
+            job_params('mpio_queries', 'xlsx')
+
+
+if __name__ == '__main__':
+    unittest.main()
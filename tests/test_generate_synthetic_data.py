@@ -0,0 +1,75 @@
+"""
+Tests for the deterministic synthetic data generator (scripts/generate_synthetic_data.py)
+
+Run with:
+    python3 -m unittest tests.test_generate_synthetic_data
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from generate_synthetic_data import Grid, area_code, area_stats, synthetic_structure
+
+
+def walk(structure, depth=1):
+    for config in structure.values():
+        yield depth, config
+        yield from walk(config['subgroups'], depth + 1)
+
+
+class StructureTests(unittest.TestCase):
+
+    def test_group_count_depth_and_determinism(self):
+        structure = synthetic_structure(7, 'synthetic-1', groups=500, depth=4, layers=3)
+        groups = list(walk(structure))
+        self.assertEqual(len(groups), 500)
+        self.assertLessEqual(max(depth for depth, _ in groups), 4)
+        self.assertGreater(max(depth for depth, _ in groups), 1)
+        self.assertEqual(structure, synthetic_structure(7, 'synthetic-1', groups=500, depth=4, layers=3))
+        self.assertNotEqual(structure, synthetic_structure(8, 'synthetic-1', groups=500, depth=4, layers=3))
+
+    def test_layer_names_are_unique(self):
+        structure = synthetic_structure(1, 'synthetic-2', groups=200, depth=3, layers=3)
+        names = [layer['nombre_geoserver'] for _, config in walk(structure) for layer in config['layers']]
+        self.assertEqual(len(names), len(set(names)))
+
+
+class AreaTests(unittest.TestCase):
+
+    def test_area_codes(self):
+        self.assertEqual(area_code(0), 'Z0000')
+        self.assertEqual(area_code(36), 'Z0010')
+        self.assertEqual(len({area_code(n) for n in range(5000)}), 5000)
+        with self.assertRaises(ValueError):
+            area_code(36 ** 4)
+
+    def test_neighbours_share_border_vertices(self):
+        grid = Grid(count=100, vertices=10, seed=3)
+        cell = grid.ring(2, 2)
+        right = grid.ring(3, 2)
+        above = grid.ring(2, 3)
+        self.assertEqual(cell[0], cell[-1])
+        self.assertEqual(len(set(cell) & set(right)), grid.vertices + 1)
+        self.assertEqual(len(set(cell) & set(above)), grid.vertices + 1)
+
+    def test_rings_are_counterclockwise(self):
+        ring = Grid(count=50, vertices=25, seed=1).ring(4, 1)
+        area = sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:]))
+        self.assertGreater(area, 0)
+
+    def test_stats_depend_only_on_seed_and_codigo(self):
+        first = area_stats(1, 'Z0001', ('c', 'e'))
+        self.assertEqual(first, area_stats(1, 'Z0001', ('c', 'e')))
+        self.assertNotEqual(first, area_stats(2, 'Z0001', ('c', 'e')))
+        for _, registers, species, exoticas, endemicas in first[0]:
+            self.assertLessEqual(species, registers)
+            self.assertLessEqual(exoticas + endemicas, species)
+
+    def test_queries_and_amenazas_share_tipos(self):
+        queries, amenazas = area_stats(1, 'Z0001', ('c', 'e', 'v'))
+        self.assertEqual([row[0] for row in queries], [row[0] for row in amenazas])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+"""
+Tests for the PostGIS-built GeoJSON fast path (scripts/geojson_features.py)
+
+Run with:
+    python3 -m unittest tests.test_geojson_features
+"""
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from geojson_features import features_query, iter_feature_collection
+
+FEATURE = '{"type":"Feature","geometry":{"type":"Point","coordinates":[-75.5,6.2]},"properties":{"codigo":"%s"}}'
+
+
+class FeatureCollectionTests(unittest.TestCase):
+
+    def collection(self, chunks):
+        return json.loads(''.join(iter_feature_collection(iter(chunks))))
+
+    def test_batches_are_joined_into_one_collection(self):
+        chunks = [','.join(FEATURE % c for c in ('05001', '05002')), '', FEATURE % '05004']
+        result = self.collection(chunks)
+        self.assertEqual(result['type'], 'FeatureCollection')
+        self.assertEqual([f['properties']['codigo'] for f in result['features']], ['05001', '05002', '05004'])
+
+    def test_empty_collection(self):
+        self.assertEqual(self.collection([]), {'type': 'FeatureCollection', 'features': []})
+
+
+class FeaturesQueryTests(unittest.TestCase):
+
+    def test_params_follow_placeholders(self):
+        sql, params = features_query('mpio_queries', ['05001'], 'total', 5, level=2, bbox=(-76, 5, -75, 7))
+        self.assertEqual(sql.count('%s'), len(params))
+        self.assertEqual(params, [5, 'municipios', 2, ['05001'], 'total', -76, 5, -75, 7])
+        self.assertIn('COALESCE(s.geom, t.geom) AS geom', sql)
+
+    def test_original_geometry_without_level(self):
+        sql, params = features_query('dpto_amenazas')
+        self.assertEqual(params, [6])
+        self.assertNotIn('simplified_geoms', sql)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Tests for the bulk project structure importer (scripts/import_project_structure.py)
+
+Run inside the backend container:
+    docker exec visor_i2d_backend python manage.py test tests.test_import_project_structure
+"""
+import os
+import sys
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../visor-geografico-I2D-backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from applications.projects.models import Project, LayerGroup, Layer
+from import_project_structure import import_structure
+
+
+def make_structure(width, layers_per_group, depth=2):
+    """Nested structure with `width` groups per level"""
+    def level(d, prefix):
+        groups = {}
+        for w in range(width):
+            name = f'{prefix}{w}'
+            config = {
+                'orden': w,
+                'layers': [
+                    {'nombre_geoserver': f'{name}_capa_{i}', 'nombre_display': f'Capa {name}-{i}',
+                     'store_geoserver': 'test', 'orden': i}
+                    for i in range(layers_per_group)
+                ]
+            }
+            if d > 1:
+                config['subgroups'] = level(d - 1, f'{name}.')
+            groups[name] = config
+        return groups
+    return level(depth, 'G')
+
+
+class ImportProjectStructureTests(TestCase):
+
+    def setUp(self):
+        self.project = Project.objects.create(
+            nombre_corto='test_import',
+            nombre='Test Import Project',
+            coordenada_central_x=-74.0,
+            coordenada_central_y=4.6
+        )
+        self.project_data = {'nombre_corto': 'test_import'}
+
+    def test_creates_tree_with_queries_independent_of_row_count(self):
+        """Query count depends on nesting depth only, not on rows"""
+        counts = []
+        for width in (2, 6):
+            LayerGroup.objects.filter(proyecto=self.project).delete()
+            with CaptureQueriesContext(connection) as queries:
+                import_structure(self.project_data, make_structure(width, layers_per_group=5), verbose=False)
+            counts.append(len(queries))
+            self.assertEqual(LayerGroup.objects.filter(proyecto=self.project).count(), width + width * width)
+            self.assertEqual(Layer.objects.filter(grupo__proyecto=self.project).count(), 5 * (width + width * width))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_reimport_is_noop(self):
+        structure = make_structure(3, layers_per_group=2)
+        import_structure(self.project_data, structure, verbose=False)
+        diff = import_structure(self.project_data, structure, verbose=False)
+        self.assertTrue(diff.is_empty)
+
+    def test_updates_changed_fields_in_bulk(self):
+        structure = make_structure(2, layers_per_group=2)
+        import_structure(self.project_data, structure, verbose=False)
+
+        structure['G0']['orden'] = 10
+        structure['G0']['layers'][0]['nombre_display'] = 'Renombrada'
+        diff = import_structure(self.project_data, structure, verbose=False)
+
+        self.assertEqual(len(diff.groups_to_update), 1)
+        self.assertEqual(len(diff.layers_to_update), 1)
+        self.assertEqual(LayerGroup.objects.get(proyecto=self.project, nombre='G0').orden, 10)
+        self.assertTrue(Layer.objects.filter(nombre_display='Renombrada').exists())
+
+    def test_dry_run_writes_nothing(self):
+        diff = import_structure(self.project_data, make_structure(2, 2), dry_run=True, verbose=False)
+        self.assertEqual(len(diff.groups_to_create), 6)
+        self.assertFalse(LayerGroup.objects.filter(proyecto=self.project).exists())
+
+    def test_no_update_keeps_existing_rows(self):
+        structure = make_structure(1, layers_per_group=1, depth=1)
+        import_structure(self.project_data, structure, verbose=False)
+        structure['G0']['layers'][0]['store_geoserver'] = 'otro'
+        diff = import_structure(self.project_data, structure, update=False, verbose=False)
+        self.assertTrue(diff.is_empty)
+        self.assertEqual(Layer.objects.get(nombre_geoserver='G0_capa_0').store_geoserver, 'test')
+
+    def test_prune_removes_missing_rows(self):
+        structure = make_structure(2, layers_per_group=2, depth=1)
+        import_structure(self.project_data, structure, verbose=False)
+        del structure['G1']
+        structure['G0']['layers'].pop()
+        import_structure(self.project_data, structure, prune=True, verbose=False)
+        self.assertEqual(list(LayerGroup.objects.filter(proyecto=self.project).values_list('nombre', flat=True)), ['G0'])
+        self.assertEqual(Layer.objects.filter(grupo__proyecto=self.project).count(), 1)
@@ -0,0 +1,85 @@
+"""
+Query-count tests for the layer tree assembler (scripts/layer_tree.py)
+Verifies the tree is loaded in a constant number of queries whatever its
+depth/width, and that the payload matches the recursive serializer byte for byte
+
+Run inside the backend container:
+    docker exec visor_i2d_backend python manage.py test tests.test_layer_tree_queries
+"""
+import os
+import sys
+
+from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../visor-geografico-I2D-backend'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from applications.projects.models import Project, LayerGroup, Layer
+from applications.projects.serializers import LayerGroupSerializer
+from layer_tree import fetch_layer_tree
+
+
+class LayerTreeQueryCountTests(TestCase):
+    """The layer tree must cost two queries regardless of its shape"""
+
+    def setUp(self):
+        self.project = Project.objects.create(
+            nombre_corto='test_tree',
+            nombre='Test Tree Project',
+            coordenada_central_x=-74.0,
+            coordenada_central_y=4.6
+        )
+
+    def build_tree(self, depth, width, layers_per_group=2):
+        """Create `width` children per group down to `depth` levels"""
+        level = [None]
+        for d in range(depth):
+            next_level = []
+            for parent in level:
+                for w in range(width):
+                    group = LayerGroup.objects.create(
+                        proyecto=self.project,
+                        nombre=f'Grupo {d}-{w}',
+                        orden=width - w,
+                        fold_state='close',
+                        parent_group=parent,
+                        color='bg-warning' if parent is None else 'bg-success'
+                    )
+                    for i in range(layers_per_group):
+                        Layer.objects.create(
+                            grupo=group,
+                            nombre_geoserver=f'capa_{group.id}_{i}',
+                            nombre_display=f'Capa {group.id}-{i}',
+                            store_geoserver='test',
+                            estado_inicial=False,
+                            orden=i
+                        )
+                    next_level.append(group)
+            level = next_level
+
+    def serializer_payload(self):
+        roots = LayerGroup.objects.filter(
+            proyecto=self.project, parent_group__isnull=True
+        ).order_by('orden', 'id')
+        return JSONRenderer().render(LayerGroupSerializer(roots, many=True).data)
+
+    def test_query_count_constant_as_tree_grows(self):
+        """Deeper and wider trees must not add queries"""
+        for depth, width in [(1, 1), (2, 3), (4, 3)]:
+            LayerGroup.objects.filter(proyecto=self.project).delete()
+            self.build_tree(depth, width)
+            with self.assertNumQueries(2):
+                tree = fetch_layer_tree(self.project.id)
+            self.assertEqual(len(tree), width)
+
+    def test_payload_matches_serializer(self):
+        """The assembled tree renders exactly like the recursive serializer"""
+        self.build_tree(depth=4, width=2)
+        self.assertEqual(
+            JSONRenderer().render(fetch_layer_tree(self.project.id)),
+            self.serializer_payload()
+        )
+
+    def test_empty_project(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(fetch_layer_tree(self.project.id), [])
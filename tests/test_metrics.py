@@ -0,0 +1,42 @@
+"""
+Tests for the Prometheus metrics helpers (scripts/metrics.py)
+
+Run with:
+    python3 -m unittest tests.test_metrics
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+import metrics
+
+
+class RouteGroupTests(unittest.TestCase):
+
+    def test_project_routes(self):
+        self.assertEqual(metrics.route_group('/api/projects/by-name/general/'), 'projects')
+        self.assertEqual(metrics.route_group('/api/projects/3/'), 'projects')
+        self.assertEqual(metrics.route_group('/api/projects/3/layer-groups/'), 'layer_groups')
+
+    def test_gis_routes(self):
+        self.assertEqual(metrics.route_group('/api/search/municipios'), 'search')
+        self.assertEqual(metrics.route_group('/api/autocomplete'), 'search')
+        self.assertEqual(metrics.route_group('/api/areas/mpio/05001/stats'), 'stats')
+        self.assertEqual(metrics.route_group('/api/identify'), 'stats')
+        self.assertEqual(metrics.route_group('/api/export/jobs/4'), 'export')
+        self.assertEqual(metrics.route_group('/api/tiles/municipios/8/75/120.mvt'), 'tiles')
+        self.assertEqual(metrics.route_group('/api/metrics'), 'metrics')
+
+    def test_unknown_paths_share_one_label(self):
+        self.assertEqual(metrics.route_group('/admin/login/'), 'other')
+        self.assertEqual(metrics.route_group('/api/unknown/123'), 'other')
+
+    def test_status_class(self):
+        self.assertEqual(metrics.status_class(200), '2xx')
+        self.assertEqual(metrics.status_class(304), '3xx')
+        self.assertEqual(metrics.status_class(503), '5xx')
+
+
+if __name__ == '__main__':
+    unittest.main()
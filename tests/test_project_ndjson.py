@@ -0,0 +1,35 @@
+"""
+Tests for the NDJSON project export keys (scripts/project_ndjson.py)
+
+Run with:
+    python3 -m unittest tests.test_project_ndjson
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+import project_ndjson
+
+
+class GroupKeyTests(unittest.TestCase):
+
+    def test_keys_are_name_paths_from_the_project(self):
+        used = set()
+        root = project_ndjson.group_key('ecoreservas', 'Biodiversidad', used)
+        self.assertEqual(root, 'ecoreservas/Biodiversidad')
+        self.assertEqual(project_ndjson.group_key(root, 'Aves', used), 'ecoreservas/Biodiversidad/Aves')
+
+    def test_repeated_sibling_names_get_a_suffix(self):
+        used = set()
+        keys = [project_ndjson.group_key('ecoreservas', 'Capas', used) for _ in range(3)]
+        self.assertEqual(keys, ['ecoreservas/Capas', 'ecoreservas/Capas #2', 'ecoreservas/Capas #3'])
+
+    def test_same_name_under_different_parents(self):
+        used = set()
+        self.assertEqual(project_ndjson.group_key('p/A', 'Aves', used), 'p/A/Aves')
+        self.assertEqual(project_ndjson.group_key('p/B', 'Aves', used), 'p/B/Aves')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Tests for the request timing helpers (scripts/request_timing.py)
+
+Run with:
+    python3 -m unittest tests.test_request_timing
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+sys.path.insert(0, os.path.dirname(__file__))
+import request_timing
+from benchmark_api import db_queries, parse_server_timing
+
+
+class ServerTimingTests(unittest.TestCase):
+
+    def test_unsampled_header_only_has_total(self):
+        self.assertEqual(request_timing.server_timing(12.345), 'app;dur=12.3')
+
+    def test_sampled_header_round_trips_through_benchmark_parser(self):
+        timing = request_timing.RequestTiming()
+        timing.queries = 5
+        timing.db_seconds = 0.0124
+        timing.add('render', 0.003)
+        header = request_timing.server_timing(31.7, timing, 'HIT')
+        metrics = parse_server_timing(header)
+        self.assertEqual(db_queries(header), 5)
+        self.assertEqual(metrics['db']['dur'], 12.4)
+        self.assertEqual(metrics['render']['dur'], 3.0)
+        self.assertEqual(metrics['cache']['desc'], 'HIT')
+        self.assertEqual(metrics['app']['dur'], 31.7)
+
+
+class RequestTimingTests(unittest.TestCase):
+
+    def test_execute_wrapper_counts_queries(self):
+        timing = request_timing.RequestTiming()
+        result = timing(lambda sql, params, many, context: 'rows', 'SELECT 1', None, False, {})
+        self.assertEqual(result, 'rows')
+        with self.assertRaises(ValueError):
+            timing(lambda *args: (_ for _ in ()).throw(ValueError()), 'SELECT x', None, False, {})
+        self.assertEqual(timing.queries, 2)
+        self.assertGreaterEqual(timing.db_seconds, 0)
+
+    def test_span_accumulates_only_while_sampled(self):
+        with request_timing.span('serialize'):
+            pass
+        timing = request_timing.RequestTiming()
+        token = request_timing._current.set(timing)
+        try:
+            for _ in range(2):
+                with request_timing.span('serialize'):
+                    pass
+        finally:
+            request_timing._current.reset(token)
+        self.assertEqual(list(timing.spans), ['serialize'])
+        self.assertGreaterEqual(timing.spans['serialize'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Tests for the slow query helpers (scripts/slow_queries.py)
+
+Run with:
+    python3 -m unittest tests.test_slow_queries
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+import slow_queries
+
+
+class NormalizeTests(unittest.TestCase):
+
+    def test_literals_and_placeholders_collapse(self):
+        orm = 'SELECT "a"."id" FROM "a" WHERE "a"."codigo" = %s LIMIT 21'
+        raw = "SELECT \"a\".\"id\" FROM \"a\" WHERE \"a\".\"codigo\" = '05001' LIMIT 50"
+        self.assertEqual(slow_queries.normalize(orm), slow_queries.normalize(raw))
+        self.assertEqual(slow_queries.normalize(orm), 'SELECT "a"."id" FROM "a" WHERE "a"."codigo" = ? LIMIT ?')
+
+    def test_in_lists_of_any_length_share_a_fingerprint(self):
+        short = slow_queries.normalize('SELECT * FROM t WHERE id IN (%s, %s)')
+        long = slow_queries.normalize('SELECT * FROM t WHERE id IN (1, 2, 3, 4)')
+        self.assertEqual(short, long)
+        self.assertEqual(slow_queries.fingerprint(short), slow_queries.fingerprint(long))
+
+    def test_identifiers_and_comments(self):
+        sql = slow_queries.normalize("SELECT t1.col2 -- note\nFROM t1 /* hint */ WHERE x = 'it''s'")
+        self.assertEqual(sql, 'SELECT t1.col2 FROM t1 WHERE x = ?')
+
+
+class ExplainTests(unittest.TestCase):
+
+    def test_only_read_only_statements_are_explained(self):
+        self.assertTrue(slow_queries.explainable('SELECT 1'))
+        self.assertTrue(slow_queries.explainable('WITH x AS (SELECT 1) SELECT * FROM x'))
+        self.assertFalse(slow_queries.explainable('UPDATE t SET a = 1'))
+        self.assertFalse(slow_queries.explainable('WITH x AS (DELETE FROM t RETURNING *) SELECT * FROM x'))
+        self.assertFalse(slow_queries.explainable('SELECT * FROM t FOR UPDATE SKIP LOCKED'))
+
+    def test_plan_summary_collects_seq_scans(self):
+        explain = [{
+            'Plan': {
+                'Node Type': 'Hash Join', 'Shared Hit Blocks': 120, 'Shared Read Blocks': 8,
+                'Plans': [
+                    {'Node Type': 'Seq Scan', 'Relation Name': 'mpio_politico'},
+                    {'Node Type': 'Hash', 'Plans': [
+                        {'Node Type': 'Index Scan', 'Relation Name': 'mpio_queries'},
+                    ]},
+                ],
+            },
+            'Planning Time': 0.4,
+            'Execution Time': 312.5,
+        }]
+        summary = slow_queries.plan_summary(explain)
+        self.assertEqual(summary['seq_scans'], ['mpio_politico'])
+        self.assertEqual(summary['execution_ms'], 312.5)
+        self.assertEqual(summary['shared_read_blocks'], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Tests for the disk tile store (scripts/tile_cache.py)
+
+Run with:
+    python3 -m unittest tests.test_tile_cache
+"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from tile_cache import DiskTileStore, tile_range, valid_tipo
+
+
+class DiskTileStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = DiskTileStore(root=self.tmp.name, max_bytes=1000, ttl=60)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        self.assertIsNone(self.store.get('municipios:all:1:5:9:15'))
+        self.store.set('municipios:all:1:5:9:15', b'tile')
+        self.assertEqual(self.store.get('municipios:all:1:5:9:15'), b'tile')
+
+    def test_expired_tiles_are_misses(self):
+        self.store.set('departamentos:all:1:0:0:0', b'tile')
+        path = self.store.path('departamentos:all:1:0:0:0')
+        old = time.time() - 120
+        os.utime(path, (old, old))
+        self.assertIsNone(self.store.get('departamentos:all:1:0:0:0'))
+        self.assertFalse(os.path.exists(path))
+
+    def test_evicts_least_recently_used_first(self):
+        for i in range(5):
+            key = f'departamentos:all:1:3:{i}:0'
+            self.store.set(key, b'x' * 300)
+            stamp = time.time() - 50 + i
+            os.utime(self.store.path(key), (stamp, stamp))
+        self.store.get('departamentos:all:1:3:0:0')
+
+        self.store.evict()
+
+        usage = self.store.usage()
+        self.assertLessEqual(usage['bytes'], 900)
+        self.assertIsNotNone(self.store.get('departamentos:all:1:3:0:0'))
+        self.assertIsNone(self.store.get('departamentos:all:1:3:1:0'))
+
+    def test_keys_cannot_escape_the_root(self):
+        with self.assertRaises(ValueError):
+            self.store.path('municipios:../../../../../../tmp/pwned:1:5:9:15')
+        with self.assertRaises(ValueError):
+            self.store.set('municipios:/tmp/pwned:1:5:9:15', b'tile')
+
+    def test_tipo_validation(self):
+        self.assertTrue(valid_tipo(None))
+        self.assertTrue(valid_tipo('aves'))
+        self.assertFalse(valid_tipo('../../tmp/pwned'))
+        self.assertFalse(valid_tipo('a' * 33))
+        self.assertFalse(valid_tipo('aves\n'))
+
+
+class TileRangeTests(unittest.TestCase):
+
+    def test_colombia_ranges(self):
+        bounds = (-81.8, -4.3, -66.8, 13.6)
+        self.assertEqual(tile_range(bounds, 0), (range(0, 1), range(0, 1)))
+        xs, ys = tile_range(bounds, 5)
+        self.assertEqual((xs.start, xs.stop - 1), (8, 10))
+        self.assertEqual((ys.start, ys.stop - 1), (14, 16))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Tests for the TopoJSON encoder (scripts/topojson_builder.py)
+
+Run with:
+    python3 -m unittest tests.test_topojson_builder
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../scripts'))
+from topojson_builder import build_topology
+
+
+def square(x, y, size=1.0):
+    return [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+
+def polygon(*rings):
+    return {'type': 'Polygon', 'coordinates': list(rings)}
+
+
+def decode_ring(topology, ring_arcs):
+    """Absolute quantized points of a ring, following (possibly reversed) arcs"""
+    arcs = []
+    for deltas in topology['arcs']:
+        x = y = 0
+        points = []
+        for dx, dy in deltas:
+            x, y = x + dx, y + dy
+            points.append((x, y))
+        arcs.append(points)
+
+    points = []
+    for index in ring_arcs:
+        arc = arcs[index] if index >= 0 else arcs[~index][::-1]
+        points.extend(arc if not points else arc[1:])
+    return points
+
+
+def to_grid(topology, ring):
+    (sx, sy), (tx, ty) = topology['transform']['scale'], topology['transform']['translate']
+    return [(round((x - tx) / sx), round((y - ty) / sy)) for x, y in ring]
+
+
+def same_ring(a, b):
+    """Same closed ring regardless of start point"""
+    a, b = a[:-1], b[:-1]
+    if len(a) != len(b):
+        return False
+    doubled = a + a
+    return any(doubled[i:i + len(b)] == b for i in range(len(a)))
+
+
+class BuildTopologyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.features = [
+            ({'codigo': 'A'}, polygon(square(0, 0))),
+            ({'codigo': 'B'}, polygon(square(1, 0))),
+            ({'codigo': 'C'}, polygon(square(3, 0, 2), square(3.5, 0.5, 1)[::-1])),
+            ({'codigo': 'D'}, polygon(square(3.5, 0.5, 1))),
+        ]
+        self.topology = build_topology(self.features, 'municipios', quantization=101)
+        self.geometries = self.topology['objects']['municipios']['geometries']
+
+    def test_rings_round_trip(self):
+        for (properties, geometry), encoded in zip(self.features, self.geometries):
+            self.assertEqual(encoded['properties'], properties)
+            for ring, ring_arcs in zip(geometry['coordinates'], encoded['arcs']):
+                self.assertTrue(same_ring(decode_ring(self.topology, ring_arcs), to_grid(self.topology, ring)))
+
+    def test_shared_border_is_stored_once(self):
+        a_arcs = {i if i >= 0 else ~i for i in self.geometries[0]['arcs'][0]}
+        b_arcs = {i if i >= 0 else ~i for i in self.geometries[1]['arcs'][0]}
+        self.assertEqual(len(a_arcs & b_arcs), 1)
+
+    def test_enclave_reuses_hole_reversed(self):
+        hole = self.geometries[2]['arcs'][1]
+        enclave = self.geometries[3]['arcs'][0]
+        self.assertEqual(len(hole), 1)
+        self.assertEqual(hole, [~enclave[0]])
+
+    def test_empty_geometry(self):
+        topology = build_topology([({'codigo': 'X'}, None)])
+        self.assertEqual(topology['objects']['features']['geometries'], [{'type': None, 'properties': {'codigo': 'X'}}])
+
+
+if __name__ == '__main__':
+    unittest.main()